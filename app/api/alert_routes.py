@@ -1,28 +1,64 @@
-from fastapi import APIRouter
+import asyncio
+from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
+from app.dependencies import get_alert_service
 from app.errors.models import ErrorDetails
+from app.models.alert_models import Subscriber, SubscriberFilters, SubscribersResponse
 from app.models.success_response import SuccessResponse
-from app.services.alert_service import AlertService
 from app.errors.handlers import error_types
 
 # Initialize the router
 router = APIRouter()
 
-# Initialize the alert service
-alert_service = AlertService()
-
 
 @router.get('/alert/fuel')
-async def send_fuel_alert():
-    """Endpoint to send a fuel price alert via Telegram"""
+async def send_fuel_alert(full: bool = False, alert_service=Depends(get_alert_service)):
+    """Endpoint to send a fuel price alert via Telegram, only for prices that moved unless full is set"""
     try:
-        # Run the async fuel alert service
-        await alert_service.send_fuel_price_alert()
-        return SuccessResponse(status=200, message="Fuel price alert sent!")
+        if full:
+            # Run the async fuel alert service
+            await alert_service.send_fuel_price_alert()
+            return SuccessResponse(status=200, message="Fuel price alert queued!")
+
+        changes = await alert_service.send_price_change_alert()
+        if not changes:
+            return SuccessResponse(status=200, message="No fuel price changes, alert skipped.")
+        return SuccessResponse(status=200, message=f"Fuel price alert queued for {changes} changes!")
     except Exception as e:
         error_response = ErrorDetails(
-            type=error_types['internal_server']['status'],
-            message=e.message,
+            type=error_types['internal_server']['type'],
+            message=str(e),
             status=500
         )
-        return JSONResponse(status_code=error_types['internal_server']['status'], content=error_response.model_dump())
\ No newline at end of file
+        return JSONResponse(status_code=error_types['internal_server']['status'], content=error_response.model_dump())
+
+
+@router.get('/alert/subscribers')
+async def get_subscribers(alert_service=Depends(get_alert_service)):
+    """Endpoint to list the alert subscribers and their filters"""
+    rows = await asyncio.to_thread(alert_service.get_subscribers)
+    return SubscribersResponse(
+        data=[Subscriber(chat_id=chat_id, fuel_types=fuel_types, providers=providers)
+              for chat_id, fuel_types, providers in rows],
+        status=200
+    )
+
+
+@router.put('/alert/subscribers/{chat_id}')
+async def save_subscriber(chat_id: str, filters: SubscriberFilters, alert_service=Depends(get_alert_service)):
+    """Endpoint to subscribe a chat to alerts, or change its fuel type and provider filters"""
+    await asyncio.to_thread(alert_service.save_subscriber, chat_id, filters.fuel_types, filters.providers)
+    return SuccessResponse(status=200, message=f"Chat {chat_id} subscribed.")
+
+
+@router.delete('/alert/subscribers/{chat_id}')
+async def remove_subscriber(chat_id: str, alert_service=Depends(get_alert_service)):
+    """Endpoint to unsubscribe a chat from alerts"""
+    if not await asyncio.to_thread(alert_service.remove_subscriber, chat_id):
+        error_response = ErrorDetails(
+            type=error_types['not_found']['type'],
+            message=f"Chat {chat_id} is not subscribed.",
+            status=error_types['not_found']['status']
+        )
+        return JSONResponse(status_code=error_types['not_found']['status'], content=error_response.model_dump())
+    return SuccessResponse(status=200, message=f"Chat {chat_id} unsubscribed.")
@@ -0,0 +1,20 @@
+from datetime import date
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from app.api.history_routes import invalid_range
+from app.dependencies import get_backfill_service
+
+# Initialize the router
+router = APIRouter()
+
+
+@router.get('/fuel/export')
+async def export_prices(start: date, end: date, backfill_service=Depends(get_backfill_service)):
+    """Endpoint to stream the prices of a date range as CSV straight from COPY"""
+    if start > end:
+        return invalid_range(start, end)
+    return StreamingResponse(
+        backfill_service.export_prices(start, end),
+        media_type='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="fuel_prices_{start}_{end}.csv"'}
+    )
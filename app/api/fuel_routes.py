@@ -1,26 +1,35 @@
 # app/api/routes.py
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
+from app.dependencies import get_fuel_service, get_price_service
 from app.errors.handlers import DatabaseException, error_types
 from app.errors.models import ErrorDetails
+from app.models.fuel_models import AllFuelsResponse, FuelData
 from app.models.success_response import SuccessResponse
-from app.services.fuel_service import FuelDataService
+from db.fuel_repo import DEFAULT_FUEL_TYPES
 
 # Initialize router
 router = APIRouter()
 
-# Initialize the fuel service
-fuel_service = FuelDataService()
-
 
 @router.get("/scrape/fuel")
-async def scrape_all_fuel():
+async def scrape_all_fuel(fuel_service=Depends(get_fuel_service)):
     """Endpoint to scrape data from all fuel providers"""
     try:
-
-        fuel_service.run()
-        return SuccessResponse(status=200, message=f"Fuel data inserted successfully.")
+        fuel_data = await fuel_service.run_async()
+        report = fuel_service.last_report.as_dict()
+        counts = report['counts']
+        if counts['failed']:
+            message = f"Fuel data inserted for {counts['done']} providers, {counts['failed']} failed."
+        elif not fuel_data:
+            message = "Fuel data unchanged, nothing to insert."
+        else:
+            message = "Fuel data inserted successfully."
+        return SuccessResponse(status=200, message=message, data=report)
     except DatabaseException as e:
         error_response = ErrorDetails(
             type=e.error_type,
@@ -30,3 +39,42 @@ async def scrape_all_fuel():
         return JSONResponse(status_code=error_types['conflict']['status'], content=error_response.model_dump())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/scrape/checkpoints")
+async def get_scrape_checkpoints(day: Optional[date] = Query(None, alias='date'),
+                                 fuel_service=Depends(get_fuel_service)):
+    """Endpoint to read the per-provider scrape state of a day, today by default"""
+    day = day or date.today()
+    try:
+        rows = await asyncio.to_thread(fuel_service.get_checkpoints, day.isoformat())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    data = {}
+    for source, provider, status, rows_written, error, updated_at in rows:
+        data.setdefault(source, {})[provider] = {
+            'status': status, 'rows': rows_written, 'error': error, 'updated_at': updated_at.isoformat()}
+    return SuccessResponse(status=200, message=f"Scrape checkpoints for {day}.", data=data)
+
+
+@router.get("/fuel/prices")
+async def get_fuel_prices(request: Request, type: Optional[List[str]] = Query(None),
+                          price_service=Depends(get_price_service)):
+    """Endpoint to read today's fuel prices, served from the price cache"""
+    fuel_type = tuple(type) if type else DEFAULT_FUEL_TYPES
+    try:
+        entry = price_service.get_cached_fuel_prices(fuel_type)
+        if entry is None:
+            entry = await asyncio.to_thread(price_service.get_fuel_prices, fuel_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    etag = f'"{entry.etag}"'
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={'ETag': etag})
+
+    response = AllFuelsResponse(
+        data=[FuelData(provider=provider, type=name, price=float(price)) for provider, name, price in entry.rows],
+        status=200
+    )
+    return JSONResponse(content=response.model_dump(), headers={'ETag': etag})
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from app.errors.handlers import error_types
+from app.errors.models import ErrorDetails
+from app.dependencies import get_fuel_service
+from app.models.success_response import SuccessResponse
+from db.db_pool import get_pool
+
+# Initialize the router
+router = APIRouter()
+
+
+@router.get('/health/db')
+async def database_pool_health():
+    """Endpoint to report database connection pool usage"""
+    pool = get_pool()
+    if pool is None:
+        error_response = ErrorDetails(
+            type=error_types['not_found']['type'],
+            message="Database connection pool is not initialized.",
+            status=error_types['not_found']['status']
+        )
+        return JSONResponse(status_code=error_types['not_found']['status'], content=error_response.model_dump())
+    return SuccessResponse(status=200, message="Database connection pool stats.", data=pool.stats())
+
+
+@router.get('/health/fetch')
+async def fetch_cache_health(fuel_service=Depends(get_fuel_service)):
+    """Endpoint to report upstream fetch cache counters per source"""
+    data = {source.name: source.fetcher.stats for source in fuel_service.sources}
+    return SuccessResponse(status=200, message="Fetch cache stats.", data=data)
+
+
+@router.get('/health/sources')
+async def source_timings(fuel_service=Depends(get_fuel_service)):
+    """Endpoint to report per-source fetch and parse timings of the last scrape"""
+    return SuccessResponse(status=200, message="Source timings.", data=fuel_service.source_timings)
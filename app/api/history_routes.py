@@ -0,0 +1,183 @@
+import asyncio
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.dependencies import get_history_service
+from app.errors.handlers import error_types
+from app.errors.models import ErrorDetails
+from app.services.history_service import decode_cursor, encode_cursor
+from app.models.fuel_models import (
+    DailySummary, DailySummaryResponse, NamesResponse, PriceDelta, PriceDeltasResponse, PricePoint,
+    PriceRank, PriceRanksResponse, PriceSeriesResponse, PriceSpread, PriceSpreadsResponse, PriceStats,
+    PriceStatsResponse)
+
+# Initialize the router
+router = APIRouter()
+
+
+def invalid_range(start: date, end: date):
+    """Error response for a date range that ends before it starts"""
+    error_response = ErrorDetails(
+        type=error_types['bad_request']['type'],
+        message=f"Start date {start} is after end date {end}.",
+        status=error_types['bad_request']['status']
+    )
+    return JSONResponse(status_code=error_types['bad_request']['status'], content=error_response.model_dump())
+
+
+async def run_query(method, *args):
+    """Run a blocking history query off the event loop"""
+    try:
+        return await asyncio.to_thread(method, *args)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def invalid_cursor(e: ValueError):
+    """Error response for a pagination cursor that doesn't decode"""
+    error_response = ErrorDetails(
+        type=error_types['bad_request']['type'],
+        message=str(e),
+        status=error_types['bad_request']['status']
+    )
+    return JSONResponse(status_code=error_types['bad_request']['status'], content=error_response.model_dump())
+
+
+@router.get('/fuel/history')
+async def get_price_series(start: date, end: date, provider: Optional[str] = None,
+                           type: Optional[str] = Query(None), limit: Optional[int] = Query(None, ge=1, le=10000),
+                           after: Optional[str] = Query(None),
+                           history_service=Depends(get_history_service)):
+    """Endpoint to read daily prices over a date range, a page at a time when limit is given"""
+    if start > end:
+        return invalid_range(start, end)
+    try:
+        after_row = decode_cursor(after) if after else None
+    except ValueError as e:
+        return invalid_cursor(e)
+    rows = await run_query(history_service.get_price_series, start, end, provider, type, after_row, limit)
+    next_cursor = None
+    if limit is not None and len(rows) == limit:
+        day, name, fuel_type, _ = rows[-1]
+        next_cursor = encode_cursor(name, fuel_type, day)
+    return PriceSeriesResponse(
+        data=[PricePoint(date=day, provider=name, type=fuel_type, price=float(price))
+              for day, name, fuel_type, price in rows],
+        status=200,
+        next=next_cursor
+    )
+
+
+@router.get('/fuel/history/stream')
+async def stream_price_series(start: date, end: date, provider: Optional[str] = None,
+                              type: Optional[str] = Query(None), after: Optional[str] = Query(None),
+                              format: Literal['ndjson', 'csv'] = Query('ndjson'),
+                              history_service=Depends(get_history_service)):
+    """Endpoint to stream daily prices over a date range as NDJSON or CSV, resuming after a cursor"""
+    if start > end:
+        return invalid_range(start, end)
+    try:
+        after_row = decode_cursor(after) if after else None
+    except ValueError as e:
+        return invalid_cursor(e)
+    chunks = history_service.export_price_series(start, end, provider, type, after_row, format)
+    media_type = 'application/x-ndjson' if format == 'ndjson' else 'text/csv'
+    return StreamingResponse(chunks, media_type=media_type)
+
+
+@router.get('/fuel/history/deltas')
+async def get_daily_deltas(start: date, end: date, provider: Optional[str] = None,
+                           type: Optional[str] = Query(None),
+                           history_service=Depends(get_history_service)):
+    """Endpoint to read day-over-day price changes over a date range"""
+    if start > end:
+        return invalid_range(start, end)
+    rows = await run_query(history_service.get_daily_deltas, start, end, provider, type)
+    return PriceDeltasResponse(
+        data=[PriceDelta(date=day, provider=name, type=fuel_type, price=float(price),
+                         change=None if change is None else float(change))
+              for day, name, fuel_type, price, change in rows],
+        status=200
+    )
+
+
+@router.get('/fuel/history/stats')
+async def get_price_stats(start: date, end: date, type: Optional[str] = Query(None),
+                          history_service=Depends(get_history_service)):
+    """Endpoint to read min/max/avg prices per provider over a date range"""
+    if start > end:
+        return invalid_range(start, end)
+    rows = await run_query(history_service.get_price_stats, start, end, type)
+    return PriceStatsResponse(
+        data=[PriceStats(provider=name, type=fuel_type, min=float(low), max=float(high), avg=float(avg), days=days)
+              for name, fuel_type, low, high, avg, days in rows],
+        status=200
+    )
+
+
+@router.get('/fuel/analytics/rankings')
+async def get_rankings(type: str, day: Optional[date] = Query(None, alias='date'),
+                       history_service=Depends(get_history_service)):
+    """Endpoint to rank providers of a fuel type by price on a date, the latest scraped day by default"""
+    day, rows = await run_query(history_service.get_rankings, day, type)
+    return PriceRanksResponse(
+        date=day,
+        data=[PriceRank(rank=rank, provider=name, price=float(price))
+              for rank, (name, price) in enumerate(rows, start=1)],
+        status=200
+    )
+
+
+@router.get('/fuel/analytics/spreads')
+async def get_spreads(day: Optional[date] = Query(None, alias='date'), history_service=Depends(get_history_service)):
+    """Endpoint to show the cheapest and dearest provider per fuel type on a date, the latest scraped day by default"""
+    day, rows = await run_query(history_service.get_spreads, day)
+    return PriceSpreadsResponse(
+        date=day,
+        data=[PriceSpread(type=fuel_type, cheapest=cheapest, lowest=float(lowest), dearest=dearest,
+                          highest=float(highest), spread=float(spread))
+              for fuel_type, cheapest, lowest, dearest, highest, spread in rows],
+        status=200
+    )
+
+
+def summary_response(rows):
+    """Response of fuel_daily_summary rows"""
+    return DailySummaryResponse(
+        data=[DailySummary(date=day, type=fuel_type, providers=providers, cheapest=cheapest, lowest=float(lowest),
+                           dearest=dearest, highest=float(highest), avg=float(avg), spread=float(spread),
+                           lowest_change=None if lowest_change is None else float(lowest_change),
+                           avg_change=None if avg_change is None else float(avg_change))
+              for day, fuel_type, providers, cheapest, lowest, dearest, highest, avg, spread, lowest_change,
+              avg_change in rows],
+        status=200
+    )
+
+
+@router.get('/fuel/summary')
+async def get_daily_summary(day: Optional[date] = Query(None, alias='date'), type: Optional[str] = Query(None),
+                            history_service=Depends(get_history_service)):
+    """Endpoint to read the precomputed per-type summary of a date, the latest summarized day by default"""
+    return summary_response(await run_query(history_service.get_daily_summary, day, type))
+
+
+@router.get('/fuel/summary/history')
+async def get_summary_range(start: date, end: date, type: Optional[str] = Query(None),
+                            history_service=Depends(get_history_service)):
+    """Endpoint to read the precomputed per-type summaries over a date range"""
+    if start > end:
+        return invalid_range(start, end)
+    return summary_response(await run_query(history_service.get_summary_range, start, end, type))
+
+
+@router.get('/fuel/providers')
+async def get_providers(history_service=Depends(get_history_service)):
+    """Endpoint to list known fuel providers"""
+    return NamesResponse(data=await run_query(history_service.get_providers), status=200)
+
+
+@router.get('/fuel/types')
+async def get_fuel_types(history_service=Depends(get_history_service)):
+    """Endpoint to list known fuel types"""
+    return NamesResponse(data=await run_query(history_service.get_fuel_types), status=200)
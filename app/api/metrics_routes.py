@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.errors.handlers import error_types
+from app.errors.models import ErrorDetails
+from metrics import registry
+
+# Initialize the router
+router = APIRouter()
+
+
+@router.get('/metrics', include_in_schema=False)
+async def get_metrics():
+    """Endpoint exposing the collected metrics in the Prometheus text format"""
+    if not registry.enabled:
+        error_response = ErrorDetails(
+            type=error_types['not_found']['type'],
+            message="Metrics are disabled.",
+            status=error_types['not_found']['status']
+        )
+        return JSONResponse(status_code=error_types['not_found']['status'], content=error_response.model_dump())
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from app.dependencies import get_scheduler
+from app.models.success_response import SuccessResponse
+
+# Initialize the router
+router = APIRouter()
+
+
+@router.get('/scheduler')
+async def get_scheduler_status(scheduler=Depends(get_scheduler)):
+    """Endpoint to show the next and last scheduled pipeline runs"""
+    return SuccessResponse(status=200, message="Scheduler status.", data=scheduler.status())
+
+
+@router.post('/scheduler/run')
+async def run_pipeline(scheduler=Depends(get_scheduler)):
+    """Endpoint to run the scrape and alert pipeline now"""
+    run = await scheduler.run_once('manual')
+    if run is None:
+        return SuccessResponse(status=200, message="Pipeline is already running.", data=scheduler.status())
+    return SuccessResponse(status=200, message=f"Pipeline run {run['status']}.", data=run)
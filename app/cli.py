@@ -0,0 +1,56 @@
+# app/cli.py
+#
+# Bulk import and export of price data, run from the repository root:
+#   python -m app.cli import raw/archive/ dumps/2023.csv.gz
+#   python -m app.cli export --start 2023-01-01 --end 2023-12-31 --output prices.csv
+#   python -m app.cli reparse --start 2023-01-01 --end 2023-12-31
+
+import argparse
+import sys
+from datetime import date
+from app.services.backfill_service import BackfillService
+from app.services.sources import SOURCE_REGISTRY
+from my_env import reprocess_workers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description='Fuel price bulk data tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser(
+        'import', help='COPY HTML snapshots, CSV or JSONL dumps (optionally .gz) into fuel_prices')
+    import_parser.add_argument('paths', nargs='+', help='files or directories to import')
+    import_parser.add_argument('--source', default='kapook', choices=sorted(SOURCE_REGISTRY),
+                               help='source whose parser reads HTML snapshots')
+
+    export_parser = commands.add_parser('export', help='COPY the prices of a date range out as CSV')
+    export_parser.add_argument('--start', required=True, type=date.fromisoformat)
+    export_parser.add_argument('--end', required=True, type=date.fromisoformat)
+    export_parser.add_argument('--output', help='file to write, standard output by default')
+
+    reparse_parser = commands.add_parser(
+        'reparse', help='rebuild the fuel_prices rows of a date range from the snapshot archive')
+    reparse_parser.add_argument('--start', required=True, type=date.fromisoformat)
+    reparse_parser.add_argument('--end', required=True, type=date.fromisoformat)
+    reparse_parser.add_argument('--workers', type=int, default=reprocess_workers,
+                                help='parse processes, REPROCESS_WORKERS or all CPU cores by default')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        totals = BackfillService(args.source).import_files(args.paths)
+        print(f"Imported {totals['files']} files: {totals['rows']} rows read, {totals['inserted']} inserted")
+    elif args.command == 'reparse':
+        totals = BackfillService().reparse(args.start, args.end, args.workers)
+        print(f"Re-parsed {totals['snapshots']} snapshots: {totals['inserted']} rows rebuilt")
+    else:
+        service = BackfillService()
+        if args.output:
+            with open(args.output, 'wb') as file:
+                service.export_to_file(file, args.start, args.end)
+        else:
+            service.export_to_file(sys.stdout.buffer, args.start, args.end)
+
+
+if __name__ == '__main__':
+    main()
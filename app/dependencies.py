@@ -0,0 +1,63 @@
+# app/dependencies.py
+
+from functools import lru_cache
+
+# Process-wide services, each built on first use and shared by every request.
+# Route handlers receive them through Depends(); the lifespan only shuts down
+# the ones that were built. Service modules are imported here lazily too, so
+# importing the app doesn't pull in their dependencies.
+
+
+@lru_cache(maxsize=None)
+def get_fuel_service():
+    from app.services.fuel_service import FuelDataService
+    return FuelDataService()
+
+
+@lru_cache(maxsize=None)
+def get_price_service():
+    from app.services.price_service import PriceService
+    return PriceService()
+
+
+@lru_cache(maxsize=None)
+def get_alert_service():
+    from app.services.alert_service import AlertService
+    return AlertService()
+
+
+@lru_cache(maxsize=None)
+def get_history_service():
+    from app.services.history_service import HistoryService
+    return HistoryService()
+
+
+@lru_cache(maxsize=None)
+def get_backfill_service():
+    from app.services.backfill_service import BackfillService
+    return BackfillService()
+
+
+@lru_cache(maxsize=None)
+def get_scheduler():
+    """The pipeline scheduler over the shared fuel and alert services, started from the lifespan when enabled"""
+    from app.services.coordination import LeaderElection
+    from app.services.pipeline import FuelPipeline
+    from app.services.scheduler import PipelineScheduler
+    from my_env import coordination_enabled, scheduler_config
+    pipeline = FuelPipeline(get_fuel_service(), get_alert_service())
+    leader = LeaderElection() if coordination_enabled else None  # Several workers, one runs the schedule
+    return PipelineScheduler(job=pipeline.run, leader=leader, **scheduler_config)
+
+
+@lru_cache(maxsize=None)
+def get_price_listener():
+    """Listener dropping this worker's price caches when another worker commits a scrape"""
+    from app.services.coordination import PriceUpdateListener
+    from my_env import coordination_config
+    return PriceUpdateListener(**coordination_config)
+
+
+def is_built(getter):
+    """Whether a service getter has already built its service"""
+    return getter.cache_info().currsize > 0
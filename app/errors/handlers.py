@@ -1,6 +1,10 @@
 from typing import Any, Dict, Optional
 
 error_types = {
+    "bad_request": {
+        "type": "Bad Request",
+        "status": 400
+    },
     "not_found": {
         "type": "Not Found",
         "status": 404
@@ -1,16 +1,91 @@
 # app/main.py
 
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from starlette.routing import Match
 from app.api.fuel_routes import router as fuel_router
 from app.api.alert_routes import router as alert_router
+from app.api.backfill_routes import router as backfill_router
+from app.api.health_routes import router as health_router
+from app.api.history_routes import router as history_router
+from app.api.metrics_routes import router as metrics_router
+from app.api.scheduler_routes import router as scheduler_router
+from app.dependencies import get_alert_service, get_fuel_service, get_price_listener, get_scheduler, is_built
+from app.services.workers import shutdown_executors
+from db.db_pool import close_pool, init_pool
+from metrics import http_request_duration, registry
+from my_env import coordination_enabled, scheduler_enabled
 
-# Initialize the FastAPI app
-app = FastAPI()
 
-# Include routes for fuel scraping
-app.include_router(fuel_router, prefix="/api", tags=["Fuel Scraper"])
-app.include_router(alert_router, prefix="/api", tags=["Fuel Alerts"])
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open shared resources on startup and release them on shutdown.
+    # Services are built on first use, only the ones with work left over start here.
+    pool = init_pool(connect=False)
+    warmup = asyncio.create_task(asyncio.to_thread(pool.open))  # Serve while the first connections open
+    get_alert_service().delivery.start()  # Deliver messages left queued by a previous run
+    if coordination_enabled:
+        get_price_listener().start()
+    if scheduler_enabled:
+        get_scheduler().start()
+    yield
+    if is_built(get_price_listener):
+        await get_price_listener().stop()
+    if is_built(get_scheduler):
+        await get_scheduler().stop()
+    if is_built(get_fuel_service):
+        await get_fuel_service().aclose()
+    if is_built(get_alert_service):
+        await get_alert_service().aclose()
+    await warmup
+    shutdown_executors()
+    close_pool()
 
-@app.get("/")
-async def root():
-    return {"message": "Fuel Scraper API is running!"}
+
+def create_app():
+    """Build the FastAPI app with every router, without constructing any service"""
+    app = FastAPI(lifespan=lifespan)
+
+    # Include routes for fuel scraping
+    app.include_router(fuel_router, prefix="/api", tags=["Fuel Scraper"])
+    app.include_router(alert_router, prefix="/api", tags=["Fuel Alerts"])
+    app.include_router(history_router, prefix="/api", tags=["Fuel History"])
+    app.include_router(backfill_router, prefix="/api", tags=["Fuel Bulk Data"])
+    app.include_router(scheduler_router, prefix="/api", tags=["Scheduler"])
+    app.include_router(health_router, prefix="/api", tags=["Health"])
+    app.include_router(metrics_router)
+
+    if registry.enabled:
+        app.middleware("http")(record_request_latency)
+
+    @app.get("/")
+    async def root():
+        return {"message": "Fuel Scraper API is running!"}
+
+    return app
+
+
+def route_template(request: Request):
+    """Path template of the matched route, keeping metric labels bounded"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return 'unmatched'
+
+
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_request_duration.observe(time.perf_counter() - start, method=request.method,
+                                      route=route_template(request), status=str(status))
+
+
+app = create_app()
@@ -0,0 +1,15 @@
+# app/models/alert_models.py
+
+from pydantic import BaseModel
+from typing import List, Optional
+
+class SubscriberFilters(BaseModel):
+    fuel_types: Optional[List[str]] = None
+    providers: Optional[List[str]] = None
+
+class Subscriber(SubscriberFilters):
+    chat_id: str
+
+class SubscribersResponse(BaseModel):
+    data: List[Subscriber]
+    status: int
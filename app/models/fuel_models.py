@@ -1,7 +1,8 @@
 # app/models/fuel_models.py
 
+import datetime
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class FuelData(BaseModel):
     provider: str
@@ -10,4 +11,78 @@ class FuelData(BaseModel):
 
 class AllFuelsResponse(BaseModel):
     data: List[FuelData]
-    status: int
\ No newline at end of file
+    status: int
+
+class PricePoint(BaseModel):
+    date: datetime.date
+    provider: str
+    type: str
+    price: float
+
+class PriceDelta(PricePoint):
+    change: Optional[float] = None
+
+class PriceStats(BaseModel):
+    provider: str
+    type: str
+    min: float
+    max: float
+    avg: float
+    days: int
+
+class PriceRank(BaseModel):
+    rank: int
+    provider: str
+    price: float
+
+class PriceSpread(BaseModel):
+    type: str
+    cheapest: str
+    lowest: float
+    dearest: str
+    highest: float
+    spread: float
+
+class DailySummary(BaseModel):
+    date: datetime.date
+    type: str
+    providers: int
+    cheapest: str
+    lowest: float
+    dearest: str
+    highest: float
+    avg: float
+    spread: float
+    lowest_change: Optional[float] = None
+    avg_change: Optional[float] = None
+
+class PriceSeriesResponse(BaseModel):
+    data: List[PricePoint]
+    status: int
+    next: Optional[str] = None  # Cursor of the next page, None on the last one
+
+class PriceDeltasResponse(BaseModel):
+    data: List[PriceDelta]
+    status: int
+
+class PriceStatsResponse(BaseModel):
+    data: List[PriceStats]
+    status: int
+
+class PriceRanksResponse(BaseModel):
+    date: Optional[datetime.date] = None
+    data: List[PriceRank]
+    status: int
+
+class PriceSpreadsResponse(BaseModel):
+    date: Optional[datetime.date] = None
+    data: List[PriceSpread]
+    status: int
+
+class DailySummaryResponse(BaseModel):
+    data: List[DailySummary]
+    status: int
+
+class NamesResponse(BaseModel):
+    data: List[str]
+    status: int
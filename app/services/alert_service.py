@@ -1,49 +1,195 @@
 # alert_service.py
 
+import asyncio
 from collections import defaultdict
-from telegram import Bot
-from my_env import telegram_bot_config
-from db.fuel_repo import FuelRepository
+from decimal import Decimal
+from my_env import alert_default_threshold, alert_template, alert_thresholds, telegram_bot_config, telegram_delivery_config
+from app.services.alert_templates import TEMPLATES, alert_renderer
+from app.services.price_cache import price_cache, price_key
+from app.services.telegram_delivery import MessageQueue, TelegramSender
+from db.fuel_repo import DEFAULT_FUEL_TYPES, FuelRepository
 from db.db_context import DatabaseContext
+from db.subscriber_repo import SubscriberRepository
+from db.summary_repo import SummaryRepository
+from metrics import price_read_duration
 
 class AlertService:
     def __init__(self):
         self.db_context = DatabaseContext()
         self.fuel_repo = FuelRepository(self.db_context)
+        self.summary_repo = SummaryRepository(self.db_context)
+        self.subscriber_repo = SubscriberRepository(self.db_context)
         self.telegram_token = telegram_bot_config['token']
         self.chat_id = telegram_bot_config['chat_id']
+        self.thresholds = alert_thresholds
+        self.default_threshold = alert_default_threshold
+        self.template = TEMPLATES[alert_template]
+        self.renderer = alert_renderer
+        config = dict(telegram_delivery_config)
+        # Messages go through a persistent queue drained by a background sender
+        self.delivery = TelegramSender(MessageQueue(config.pop('queue_path')), self.telegram_token, **config)
 
-    def get_fuel_prices(self):
+    def load_fuel_prices(self, fuel_type=DEFAULT_FUEL_TYPES):
         """Query fuel prices from the database."""
+        with price_read_duration.time(query='prices'):
+            self.db_context.connect()
+            try:
+                return self.fuel_repo.get_fuel_prices(fuel_type)
+            finally:
+                self.db_context.close()
+
+    def get_fuel_prices(self, fuel_type=DEFAULT_FUEL_TYPES):
+        """Return today's fuel prices, reading through the shared price cache."""
+        return price_cache.get_or_load(price_key(fuel_type), lambda: self.load_fuel_prices(fuel_type)).rows
+
+    def load_price_changes(self, fuel_type=DEFAULT_FUEL_TYPES):
+        """Query today's prices next to the previous recorded price from the database."""
+        with price_read_duration.time(query='changes'):
+            self.db_context.connect()
+            try:
+                return self.fuel_repo.get_price_changes(fuel_type)
+            finally:
+                self.db_context.close()
+
+    def get_price_changes(self, fuel_type=DEFAULT_FUEL_TYPES):
+        """Return today's prices with their previous price, reading through the shared price cache."""
+        key = price_key(fuel_type) + ('changes',)
+        return price_cache.get_or_load(key, lambda: self.load_price_changes(fuel_type)).rows
+
+    def load_daily_summary(self, date):
+        """Query a day's precomputed per-type summary from the database."""
+        with price_read_duration.time(query='summary'):
+            self.db_context.connect()
+            try:
+                return self.summary_repo.get_daily_summary(date)
+            finally:
+                self.db_context.close()
+
+    def get_daily_summary(self, fuel_type=DEFAULT_FUEL_TYPES):
+        """Return today's summary rows of the given fuel types, reading through the shared price cache."""
+        key = price_key(()) + ('summary',)
+        rows = price_cache.get_or_load(key, lambda: self.load_daily_summary(key[0])).rows
+        return [row for row in rows if row[1] in fuel_type]
+
+    def run_subscriber_query(self, method, *args):
+        """Run a subscriber query on a pooled connection, creating the table if needed."""
         self.db_context.connect()
-        return self.fuel_repo.get_fuel_prices()
+        try:
+            self.subscriber_repo.create_subscriber_table()
+            return method(*args)
+        finally:
+            self.db_context.close()
+
+    def get_subscribers(self):
+        return self.run_subscriber_query(self.subscriber_repo.get_subscribers)
+
+    def save_subscriber(self, chat_id, fuel_types=None, providers=None):
+        self.run_subscriber_query(self.subscriber_repo.save_subscriber, chat_id, fuel_types, providers)
+
+    def remove_subscriber(self, chat_id):
+        """Remove a subscriber, returns whether it existed."""
+        return bool(self.run_subscriber_query(self.subscriber_repo.delete_subscriber, chat_id))
+
+    def get_subscriber_groups(self):
+        """Group the subscribers by filters, so chats subscribed alike share one rendered message.
+
+        Returns {(fuel_types, providers): [chat_id, ...]}, providers None meaning all of them.
+        Without subscribers the configured chat gets the default fuel types."""
+        subscribers = self.get_subscribers()
+        if not subscribers and self.chat_id:
+            subscribers = [(self.chat_id, None, None)]
+
+        groups = defaultdict(list)
+        for chat_id, fuel_types, providers in subscribers:
+            key = (tuple(sorted(fuel_types)) if fuel_types else DEFAULT_FUEL_TYPES,
+                   tuple(sorted(providers)) if providers else None)
+            groups[key].append(chat_id)
+        return groups
+
+    @staticmethod
+    def subscribed_fuel_types(groups):
+        """Every fuel type wanted by any subscriber, for one query covering them all."""
+        return tuple(sorted({fuel_type for fuel_types, _ in groups for fuel_type in fuel_types}))
+
+    @staticmethod
+    def select_rows(rows, fuel_types, providers):
+        """Rows starting with (provider, type) that match a subscriber's filters."""
+        return [row for row in rows if row[1] in fuel_types and (providers is None or row[0] in providers)]
+
+    async def fan_out(self, groups, render):
+        """Render one message per distinct filter set and queue it for every chat in the set.
+
+        render(fuel_types, providers) returns the message, or None to skip the set. Returns the chats queued."""
+        messages = []
+        for (fuel_types, providers), chat_ids in groups.items():
+            message = render(set(fuel_types), None if providers is None else set(providers))
+            if message:
+                messages.extend((chat_id, message) for chat_id in chat_ids)
+        await self.delivery.enqueue_many(messages, self.template.parse_mode)
+        return len(messages)
+
+    def filter_price_changes(self, rows):
+        """Keep the rows whose price moved by at least the threshold of their fuel type."""
+        changes = []
+        for provider, fuel_type, price, previous in rows:
+            if previous is None:
+                changes.append((provider, fuel_type, price, None))  # First price recorded
+                continue
+            delta = Decimal(str(price)) - Decimal(str(previous))
+            threshold = Decimal(str(self.thresholds.get(fuel_type, self.default_threshold)))
+            if delta != 0 and abs(delta) >= threshold:
+                changes.append((provider, fuel_type, price, delta))
+        return changes
+
+    def format_price_changes(self, changes):
+        """Format the changed prices with their deltas, grouped by type."""
+        return self.renderer.render(self.template, 'changes', changes)
+
+    def format_daily_summary(self, summary):
+        """Format the cheapest provider and spread per type from the precomputed summary."""
+        return self.renderer.render(self.template, 'summary', summary)
 
     def format_fuel_prices(self, prices):
         """Format the fuel prices by grouping them by type."""
-        if not prices:
-            return "No fuel prices available for today."
+        return self.renderer.render(self.template, 'prices', prices)
 
-        grouped_data = defaultdict(list)
-        for provider, fuel_type, price in prices:
-            grouped_data[fuel_type].append((provider, price))
+    async def send_to_telegram(self, message):
+        """Queue the formatted message for delivery to Telegram, returns the number of parts queued."""
+        return await self.delivery.enqueue(self.chat_id, message, self.template.parse_mode)
 
-        # Create a formatted message
-        message = "🚗 Fuel Prices for Today:\n\n"
-        for fuel_type, entries in grouped_data.items():
-            message += f"🔹 {fuel_type}:\n"
-            for provider, price in entries:
-                message += f"  - {provider}: {price:.2f} THB\n"
-            message += "\n"
+    async def send_price_change_alert(self):
+        """Send every subscriber the prices that moved since the previous day, returns the number of changes."""
+        groups = await asyncio.to_thread(self.get_subscriber_groups)
+        fuel_types = self.subscribed_fuel_types(groups)
+        rows = await asyncio.to_thread(self.get_price_changes, fuel_types)
+        changes = self.filter_price_changes(rows)
+        if not changes:
+            return 0  # Nothing moved, skip the network send
+        summary = await asyncio.to_thread(self.get_daily_summary, fuel_types)
 
-        return message
+        def render(fuel_types, providers):
+            selected = self.select_rows(changes, fuel_types, providers)
+            if not selected:
+                return None  # Nothing this subscriber follows moved
+            return self.format_price_changes(selected) + self.format_daily_summary(
+                [row for row in summary if row[1] in fuel_types])
 
-    async def send_to_telegram(self, message):
-        """Send the formatted message to Telegram."""
-        bot = Bot(token=self.telegram_token)
-        await bot.send_message(chat_id=self.chat_id, text=message)
+        await self.fan_out(groups, render)
+        return len(changes)
+
+    async def aclose(self):
+        """Stop the background sender, leaving undelivered messages queued for the next start."""
+        await self.delivery.aclose()
 
     async def send_fuel_price_alert(self):
-        """Main function to send the fuel price alert to Telegram."""
-        prices = self.get_fuel_prices()
-        formatted_message = self.format_fuel_prices(prices)
-        await self.send_to_telegram(formatted_message)
+        """Main function to send every subscriber the fuel price alert on Telegram."""
+        groups = await asyncio.to_thread(self.get_subscriber_groups)
+        fuel_types = self.subscribed_fuel_types(groups)
+        prices = await asyncio.to_thread(self.get_fuel_prices, fuel_types)
+        summary = await asyncio.to_thread(self.get_daily_summary, fuel_types)
+
+        def render(fuel_types, providers):
+            return self.format_fuel_prices(self.select_rows(prices, fuel_types, providers)) + \
+                self.format_daily_summary([row for row in summary if row[1] in fuel_types])
+
+        await self.fan_out(groups, render)
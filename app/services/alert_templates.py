@@ -0,0 +1,209 @@
+# app/services/alert_templates.py
+
+import html
+import operator
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+
+# Characters Telegram's MarkdownV2 wants escaped outside of entities
+MARKDOWN_SPECIAL = str.maketrans({char: '\\' + char for char in '_*[]()~`>#+-=|{}.!\\'})
+
+# Fields each format receives, in the order the render methods pass them
+FIELDS = {
+    'no_prices': (),
+    'prices_header': (),
+    'changes_header': (),
+    'group': ('fuel_type', 'entries'),
+    'price': ('provider', 'price'),
+    'change': ('provider', 'price', 'change'),
+    'summary_block': ('entries',),
+    'summary': ('fuel_type', 'cheapest', 'lowest', 'spread', 'change'),
+    'summary_change': ('change',),
+}
+
+
+# Provider and fuel type names repeat across rows and messages, escape each once
+@lru_cache(maxsize=4096)
+def escape_markdown(text: str):
+    return text.translate(MARKDOWN_SPECIAL)
+
+
+@lru_cache(maxsize=4096)
+def escape_html(text: str):
+    return html.escape(text, quote=False)
+
+
+def no_escape(text: str):
+    return text
+
+
+def compile_format(text: str, fields: tuple):
+    """Turn {name} placeholders into a %-pattern called with a tuple of values in the order of fields"""
+    order = []
+
+    def placeholder(match):
+        order.append(fields.index(match.group(1)))
+        return '%s'
+
+    pattern = re.sub(r'\{(\w+)\}', placeholder, text.replace('%', '%%'))
+    if order == list(range(len(fields))):
+        return pattern.__mod__
+    pick = operator.itemgetter(*order) if order else (lambda values: ())
+    if len(order) == 1:
+        return lambda values: pattern % (pick(values),)
+    return lambda values: pattern % pick(values)
+
+
+class AlertTemplate:
+    """A message layout with its formats compiled once, rendered with join in a single pass
+
+    Every entry is a format string over already-escaped values. Groups hold one fuel type,
+    their entries joined by entry_separator. Markup never spans a line break, so splitting
+    a long message on lines for Telegram's length limit keeps every part well-formed."""
+
+    def __init__(self, id: str, parse_mode=None, escape=no_escape, entry_separator: str = '\n', **formats):
+        self.id = id
+        self.parse_mode = parse_mode  # Telegram parse_mode sent along with the text
+        self.escape = escape
+        self.entry_separator = entry_separator
+        self.formats = {name: compile_format(text, FIELDS[name]) for name, text in formats.items()}
+        self.texts = formats
+
+    def render_prices(self, prices):
+        """(provider, type, price) rows grouped by type"""
+        if not prices:
+            return self.texts['no_prices']
+        escape, price_format = self.escape, self.formats['price']
+        groups = defaultdict(list)
+        for provider, fuel_type, price in prices:
+            groups[fuel_type].append(price_format((escape(provider), escape('%.2f' % price))))
+        return self._groups(self.texts['prices_header'], groups)
+
+    def render_changes(self, changes):
+        """(provider, type, price, delta) rows grouped by type, a None delta being a first price"""
+        escape, change_format = self.escape, self.formats['change']
+        new = escape('new')
+        groups = defaultdict(list)
+        for provider, fuel_type, price, delta in changes:
+            groups[fuel_type].append(change_format((
+                escape(provider), escape('%.2f' % price), new if delta is None else escape('%+.2f' % delta))))
+        return self._groups(self.texts['changes_header'], groups)
+
+    def render_summary(self, summary):
+        """Cheapest provider and spread per type from fuel_daily_summary rows"""
+        if not summary:
+            return ''
+        escape, line_format, change_format = self.escape, self.formats['summary'], self.formats['summary_change']
+        lines = [line_format((escape(fuel_type), escape(cheapest), escape('%.2f' % lowest), escape('%.2f' % spread),
+                              '' if min_change is None else change_format((escape('%+.2f' % min_change),))))
+                 for _, fuel_type, _, cheapest, lowest, _, _, _, spread, min_change, _ in summary]
+        return self.formats['summary_block']((self.entry_separator.join(lines),))
+
+    def _groups(self, header: str, groups: dict):
+        escape, group_format, separator = self.escape, self.formats['group'], self.entry_separator
+        parts = [header]
+        parts.extend(group_format((escape(fuel_type), separator.join(entries)))
+                     for fuel_type, entries in groups.items())
+        return ''.join(parts)
+
+
+TEMPLATES = {template.id: template for template in (
+    AlertTemplate(
+        'plain',
+        no_prices='No fuel prices available for today.',
+        prices_header='🚗 Fuel Prices for Today:\n\n',
+        changes_header='🚗 Fuel Price Changes for Today:\n\n',
+        group='🔹 {fuel_type}:\n{entries}\n\n',
+        price='  - {provider}: {price} THB',
+        change='  - {provider}: {price} THB ({change})',
+        summary_block='📊 Cheapest Today:\n{entries}\n',
+        summary='  - {fuel_type}: {cheapest} {lowest} THB (spread {spread}{change})',
+        summary_change=', {change} vs previous day',
+    ),
+    AlertTemplate(
+        'markdown', parse_mode='MarkdownV2', escape=escape_markdown,
+        no_prices='No fuel prices available for today\\.',
+        prices_header='🚗 *Fuel Prices for Today:*\n\n',
+        changes_header='🚗 *Fuel Price Changes for Today:*\n\n',
+        group='🔹 *{fuel_type}:*\n{entries}\n\n',
+        price='  \\- {provider}: *{price}* THB',
+        change='  \\- {provider}: *{price}* THB \\({change}\\)',
+        summary_block='📊 *Cheapest Today:*\n{entries}\n',
+        summary='  \\- {fuel_type}: {cheapest} *{lowest}* THB \\(spread {spread}{change}\\)',
+        summary_change=', {change} vs previous day',
+    ),
+    AlertTemplate(
+        'html', parse_mode='HTML', escape=escape_html,
+        no_prices='No fuel prices available for today.',
+        prices_header='🚗 <b>Fuel Prices for Today:</b>\n\n',
+        changes_header='🚗 <b>Fuel Price Changes for Today:</b>\n\n',
+        group='🔹 <b>{fuel_type}:</b>\n{entries}\n\n',
+        price='  - {provider}: <b>{price}</b> THB',
+        change='  - {provider}: <b>{price}</b> THB ({change})',
+        summary_block='📊 <b>Cheapest Today:</b>\n{entries}\n',
+        summary='  - {fuel_type}: {cheapest} <b>{lowest}</b> THB (spread {spread}{change})',
+        summary_change=', {change} vs previous day',
+    ),
+    # One line per fuel type
+    AlertTemplate(
+        'compact', entry_separator=', ',
+        no_prices='No fuel prices today.',
+        prices_header='🚗 Prices today\n',
+        changes_header='🚗 Changes today\n',
+        group='🔹 {fuel_type}: {entries}\n',
+        price='{provider} {price}',
+        change='{provider} {price} ({change})',
+        summary_block='📊 Cheapest: {entries}\n',
+        summary='{fuel_type} {cheapest} {lowest}{change}',
+        summary_change=' ({change})',
+    ),
+)}
+
+
+class MessageRenderer:
+    """Render alert messages through a template, memoizing the text per snapshot
+
+    The memo key is the template id, the kind of message and the rows themselves, so a
+    snapshot rendered for many subscribers or alerts is formatted once. Least recently
+    used entries are dropped past maxsize."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def render(self, template: AlertTemplate, kind: str, rows):
+        snapshot = tuple(rows)
+        key = (template.id, kind, snapshot)
+        try:
+            hash(key)
+        except TypeError:
+            return self._render(template, kind, snapshot)  # Unhashable rows, nothing to key on
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return text
+            self.stats['misses'] += 1
+        text = self._render(template, kind, snapshot)
+        with self._lock:
+            self._entries[key] = text
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return text
+
+    @staticmethod
+    def _render(template: AlertTemplate, kind: str, rows):
+        return getattr(template, f'render_{kind}')(rows)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide renderer shared by every alert
+alert_renderer = MessageRenderer()
@@ -0,0 +1,235 @@
+# backfill_service.py
+
+import csv
+import gzip
+import json
+import os
+import queue
+import re
+import threading
+from collections import Counter
+from itertools import groupby
+from app.services.coordination import WORKER_ID
+from app.services.price_cache import price_cache
+from app.services.price_store import price_store
+from app.services.reprocessor import Reprocessor
+from app.services.snapshot_archive import snapshot_archive
+from app.services.sources import SOURCE_REGISTRY
+from db.bulk_repo import BulkRepository
+from db.coordination_repo import CoordinationRepository
+from db.db_context import DatabaseContext
+from metrics import rows_written
+from my_env import coordination_config, reprocess_workers
+
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+IMPORT_SUFFIXES = ('.html', '.htm', '.csv', '.jsonl')
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ChunkQueueWriter:
+    """File-like sink handing COPY TO output to a consumer through a bounded queue"""
+
+    def __init__(self, maxsize: int = 16):
+        self.chunks = queue.Queue(maxsize=maxsize)
+        self.cancelled = threading.Event()
+
+    def put(self, item):
+        # Block while the consumer is behind, so memory stays bounded
+        while True:
+            if self.cancelled.is_set():
+                raise ExportCancelled("Export consumer went away")
+            try:
+                self.chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data):
+        self.put(data)
+        return len(data)
+
+
+def open_text(path: str):
+    """Open a dump for reading as text, transparently decompressing .gz files"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def import_kind(path: str):
+    name = path[:-3] if path.endswith('.gz') else path
+    return os.path.splitext(name)[1].lower()
+
+
+class BackfillService:
+    def __init__(self, source: str = 'kapook'):
+        self.db_context = DatabaseContext()
+        self.bulk_repo = BulkRepository(self.db_context)
+        self.coordination_repo = CoordinationRepository(self.db_context)
+        self.source = source  # Registered source whose parser reads HTML snapshots
+        self.archive = snapshot_archive
+
+    def read_snapshot(self, path: str):
+        """Rows of an archived HTML page, dated by the YYYY-MM-DD in its file name."""
+        match = DATE_PATTERN.search(os.path.basename(path))
+        if match is None:
+            raise ValueError(f"No YYYY-MM-DD date in snapshot file name {path}")
+        with open_text(path) as file:
+            parsed = SOURCE_REGISTRY[self.source]().parse(file.read())
+        for fuel_data in parsed.values():
+            for entry in fuel_data:
+                yield match.group(1), entry['provider'], entry['type'], entry['price']
+
+    def read_csv(self, path: str):
+        """Rows of a CSV dump with a date,provider,type,price header."""
+        with open_text(path) as file:
+            for record in csv.DictReader(file):
+                yield record['date'], record['provider'], record['type'], record['price']
+
+    def read_jsonl(self, path: str):
+        """Rows of a JSON Lines dump with date, provider, type and price keys."""
+        with open_text(path) as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record['date'], record['provider'], record['type'], record['price']
+
+    def read_rows(self, path: str):
+        kind = import_kind(path)
+        if kind in ('.html', '.htm'):
+            return self.read_snapshot(path)
+        if kind == '.csv':
+            return self.read_csv(path)
+        if kind == '.jsonl':
+            return self.read_jsonl(path)
+        raise ValueError(f"Unsupported import file {path}")
+
+    @staticmethod
+    def collect_files(paths: list):
+        """Expand directories into their importable files, in name order."""
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in sorted(os.walk(path)):
+                    files.extend(os.path.join(root, name) for name in sorted(names)
+                                 if import_kind(name) in IMPORT_SUFFIXES)
+            else:
+                files.append(path)
+        return files
+
+    def import_file(self, path: str):
+        """COPY one file into the database, returns (rows read, rows inserted)."""
+        self.db_context.connect()
+        try:
+            return self.bulk_repo.copy_prices(self.read_rows(path))
+        finally:
+            self.db_context.close()
+
+    def import_files(self, paths: list, progress=print):
+        """Import snapshots and dumps file by file, one transaction each."""
+        files = self.collect_files(paths)
+        totals = {'files': 0, 'rows': 0, 'inserted': 0}
+        for index, path in enumerate(files, start=1):
+            rows, inserted = self.import_file(path)
+            rows_written.inc(inserted)
+            totals['files'] += 1
+            totals['rows'] += rows
+            totals['inserted'] += inserted
+            progress(f"[{index}/{len(files)}] {path}: {rows} rows read, {inserted} inserted "
+                     f"({totals['inserted']} inserted in total)")
+        if totals['inserted']:
+            self.prices_changed('import')
+        return totals
+
+    def prices_changed(self, reason: str):
+        """Drop this worker's cached prices and tell the other workers to drop theirs"""
+        price_cache.invalidate()
+        price_store.invalidate()
+        self.db_context.connect()
+        try:
+            self.coordination_repo.notify(coordination_config['channel'], {'worker': WORKER_ID, 'reason': reason})
+        finally:
+            self.db_context.close()
+
+    def reparse(self, start_date, end_date, workers: int = reprocess_workers, progress=print):
+        """Rebuild the stored rows of a date range from the snapshot archive.
+
+        Pages are parsed across worker processes by the Reprocessor, workers=0 parses inline,
+        and each month is replaced in its own transaction as its rows stream back."""
+        if self.archive is None:
+            raise ValueError("The snapshot archive is disabled")
+
+        snapshots = []
+        extractors = {}
+        for (day, source), digest in self.archive.daily_snapshots(str(start_date), str(end_date)).items():
+            if source not in SOURCE_REGISTRY:
+                print(f"Skipping {day} {source} snapshot, the source is no longer registered")
+                continue
+            if source not in extractors:
+                extractors[source] = SOURCE_REGISTRY[source]().extract_function()
+            snapshots.append((day, source, digest))
+        month_sizes = Counter(day[:7] for day, _, _ in snapshots)
+
+        # Workers get the compressed blobs, read from disk only as work units are submitted
+        pages = ((day, source, self.archive.load_compressed(digest)) for day, source, digest in snapshots)
+        reprocessor = Reprocessor(workers)
+        results = reprocessor.run(pages, extractors)
+
+        totals = {'snapshots': 0, 'rows': 0, 'inserted': 0}
+        for index, (month, parsed) in enumerate(groupby(results, key=lambda result: result[0][:7]), start=1):
+            rows = ((day,) + row for day, day_rows in parsed for row in day_rows)
+            self.db_context.connect()
+            try:
+                count, inserted = self.bulk_repo.copy_prices(rows, replace=True)
+            finally:
+                self.db_context.close()
+            totals['snapshots'] += month_sizes[month]
+            totals['rows'] += count
+            totals['inserted'] += inserted
+            progress(f"[{index}/{len(month_sizes)}] {month}: {month_sizes[month]} snapshots, {inserted} rows rebuilt")
+
+        if totals['inserted']:
+            self.prices_changed('reparse')
+        return totals
+
+    def export_to_file(self, file, start_date, end_date):
+        """Write the prices between two dates to a file-like object as CSV."""
+        self.db_context.connect()
+        try:
+            self.bulk_repo.copy_prices_to(file, start_date, end_date)
+        finally:
+            self.db_context.close()
+
+    def export_prices(self, start_date, end_date, maxsize: int = 16):
+        """Yield CSV chunks of the prices between two dates as COPY produces them."""
+        writer = ChunkQueueWriter(maxsize)
+        done = object()
+        errors = []
+
+        def produce():
+            try:
+                self.export_to_file(writer, start_date, end_date)
+            except ExportCancelled:
+                pass
+            except Exception as e:
+                errors.append(e)
+            try:
+                writer.put(done)
+            except ExportCancelled:
+                pass
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                chunk = writer.chunks.get()
+                if chunk is done:
+                    break
+                yield chunk
+            if errors:
+                raise errors[0]
+        finally:
+            writer.cancelled.set()  # Stop the COPY if the client disconnected
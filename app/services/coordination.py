@@ -0,0 +1,166 @@
+# app/services/coordination.py
+
+import asyncio
+import json
+import os
+import socket
+import threading
+import psycopg2
+from app.services.price_cache import price_cache
+from db.coordination_repo import lock_key
+from my_env import db_params
+
+# Identifies this process in notifications, so a worker skips its own
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+# Advisory lock names shared by every worker
+STORE_LOCK = 'fuel_store'
+SCHEDULER_LOCK = 'scheduler_leader'
+
+
+class LeaderElection:
+    """Leadership among workers through a session-level advisory lock on a dedicated connection
+
+    The first worker to ask takes the lock and keeps it while its session lives, so a
+    crashed or disconnected leader hands over to the next worker that asks."""
+
+    def __init__(self, name: str = SCHEDULER_LOCK, db_params: dict = db_params):
+        self.key = lock_key(name)
+        self.db_params = db_params
+        self.conn = None
+        self.held = False
+        self.lock = threading.Lock()
+
+    def is_leader(self):
+        """Whether this worker leads, taking the lock when it's free"""
+        with self.lock:
+            try:
+                if self.conn is None or self.conn.closed:
+                    self.conn = psycopg2.connect(**self.db_params)
+                    self.conn.autocommit = True
+                    self.held = False
+                with self.conn.cursor() as cursor:
+                    if self.held:
+                        cursor.execute('SELECT 1;')  # The lock lives as long as this session
+                    else:
+                        cursor.execute('SELECT pg_try_advisory_lock(%s);', (self.key,))
+                        self.held = cursor.fetchone()[0]
+            except psycopg2.Error as e:
+                print(f"Leader election failed: {e}")
+                self._close()
+            return self.held
+
+    def _close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except psycopg2.Error:
+                pass
+        self.conn = None
+        self.held = False
+
+    def release(self):
+        """Step down, closing the session releases the lock"""
+        with self.lock:
+            self._close()
+
+
+def invalidate_prices(update: dict):
+    """Drop cached prices after another worker committed a scrape and apply its day to the price store"""
+    from app.dependencies import get_history_service
+    price_cache.invalidate()
+    get_history_service().refresh_price_store(update.get('date'))
+
+
+class PriceUpdateListener:
+    """LISTEN for committed scrapes on a dedicated connection and hand them to on_update
+
+    Notifications sent by this worker are skipped. After a reconnect on_update is called
+    once with an empty update, since notifications sent while disconnected are lost.
+    on_update runs in a worker thread, so it may query the database."""
+
+    def __init__(self, channel: str, on_update=invalidate_prices, reconnect_interval: float = 5.0,
+                 db_params: dict = db_params):
+        self.channel = channel
+        self.on_update = on_update
+        self.reconnect_interval = reconnect_interval
+        self.db_params = db_params
+        self.conn = None
+        self.task = None
+        self.connections = 0
+        self.received = 0
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.db_params)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}";')
+        return conn
+
+    def handle(self, payload: str):
+        """Apply one notification payload, JSON with the sending worker"""
+        try:
+            update = json.loads(payload)
+        except ValueError:
+            update = {}
+        if update.get('worker') == WORKER_ID:
+            return  # This worker already applied its own scrape
+        self.received += 1
+        self._update(update)
+
+    def _update(self, update: dict):
+        try:
+            self.on_update(update)
+        except Exception as e:  # A failed update must not end the listener
+            print(f"Price update failed: {e}")
+
+    async def _listen(self):
+        self.conn = await asyncio.to_thread(self._connect)
+        if self.connections:
+            await asyncio.to_thread(self._update, {})  # Catch up on whatever was committed while disconnected
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        fileno = self.conn.fileno()
+        loop.add_reader(fileno, readable.set)
+        try:
+            while True:
+                await readable.wait()
+                readable.clear()
+                self.conn.poll()  # Raises once the connection is lost
+                while self.conn.notifies:
+                    await asyncio.to_thread(self.handle, self.conn.notifies.pop(0).payload)
+        finally:
+            loop.remove_reader(fileno)
+
+    async def run(self):
+        """Listen until cancelled, reconnecting after connection errors"""
+        while True:
+            try:
+                await self._listen()
+            except (psycopg2.Error, OSError) as e:
+                print(f"Price update listener disconnected: {e}")
+            self._close()
+            await asyncio.sleep(self.reconnect_interval)
+
+    def _close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except psycopg2.Error:
+                pass
+            self.conn = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self._close()
@@ -0,0 +1,220 @@
+# app/services/fuel_parser.py
+
+import html
+import re
+from html.parser import HTMLParser
+
+
+class FuelPageParser(HTMLParser):
+    """Event-driven parser that collects every provider block in one pass"""
+
+    def __init__(self, class_map: dict):
+        super().__init__(convert_charrefs=True)
+        # Reverse lookup: article class attribute -> provider name
+        self.providers = {class_name: provider for provider, class_name in class_map.items()}
+        self.results = {}
+        self._provider = None
+        self._article_depth = 0
+        self._field = None
+        self._buffer = []
+        self._fuel_type = None
+        self._fuel_price = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'article':
+            if self._provider is not None:
+                self._article_depth += 1
+                return
+            provider = self.providers.get(dict(attrs).get('class'))
+            if provider is not None:
+                self._provider = provider
+                self._article_depth = 1
+                self.results.setdefault(provider, [])
+            return
+
+        if self._provider is None:
+            return
+
+        if tag == 'li':
+            self._fuel_type = None
+            self._fuel_price = None
+        elif self._field is None:
+            # Only the first <span>/<em> of an entry counts, like soup.find()
+            if tag == 'span' and self._fuel_type is None:
+                self._field = 'span'
+                self._buffer = []
+            elif tag == 'em' and self._fuel_price is None:
+                self._field = 'em'
+                self._buffer = []
+
+    def handle_endtag(self, tag):
+        if self._provider is None:
+            return
+
+        if tag == 'article':
+            self._article_depth -= 1
+            if self._article_depth == 0:
+                self._provider = None
+        elif tag == self._field:
+            text = ''.join(self._buffer).strip()
+            if tag == 'span':
+                self._fuel_type = text
+            else:
+                self._fuel_price = text
+            self._field = None
+        elif tag == 'li':
+            self._emit()
+
+    def handle_data(self, data):
+        if self._field is not None:
+            self._buffer.append(data)
+
+    def _emit(self):
+        """Append the current <li> entry to its provider's records"""
+        if self._fuel_type is None or self._fuel_price is None:
+            raise ValueError(f"Malformed fuel entry for provider {self._provider}")
+
+        self.results[self._provider].append(
+            (self._provider, self._fuel_type, float(self._fuel_price)))
+        self._fuel_type = None
+        self._fuel_price = None
+
+
+def _extract_htmlparser(html_content: str, class_map: dict):
+    """Zero-dependency backend built on html.parser events"""
+    parser = FuelPageParser(class_map)
+    parser.feed(html_content)
+    parser.close()
+    return parser.results
+
+
+ARTICLE_PATTERN = re.compile(r'<article\s+class="([^"]*)"[^>]*>(.*?)</article>', re.S | re.I)
+ENTRY_PATTERN = re.compile(
+    r'<li[^>]*>.*?<span[^>]*>(.*?)</span>.*?<em[^>]*>(.*?)</em>.*?</li>', re.S | re.I)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def _clean_text(fragment: str):
+    return html.unescape(TAG_PATTERN.sub('', fragment)).strip()
+
+
+def _extract_regex(html_content: str, class_map: dict):
+    """Selector-free backend for the flat <article>/<li><span>/<em> layout of the page"""
+    providers = {class_name: provider for provider, class_name in class_map.items()}
+    results = {}
+    for match in ARTICLE_PATTERN.finditer(html_content):
+        provider = providers.get(match.group(1))
+        if provider is None or provider in results:
+            continue
+        results[provider] = [
+            (provider, _clean_text(fuel_type), float(_clean_text(fuel_price)))
+            for fuel_type, fuel_price in ENTRY_PATTERN.findall(match.group(2))
+        ]
+    return results
+
+
+def _extract_lxml(html_content: str, class_map: dict):
+    """Compiled tree builder backend, requires lxml"""
+    import lxml.html
+
+    tree = lxml.html.fromstring(html_content)
+    results = {}
+    for provider, class_name in class_map.items():
+        articles = tree.xpath('//article[@class=$name]', name=class_name)
+        if not articles:
+            continue
+        fuel_data = []
+        for li in articles[0].iter('li'):
+            span = li.find('.//span')
+            em = li.find('.//em')
+            if span is None or em is None:
+                raise ValueError(f"Malformed fuel entry for provider {provider}")
+            fuel_data.append(
+                (provider, span.text_content().strip(), float(em.text_content().strip())))
+        results[provider] = fuel_data
+    return results
+
+
+def _extract_bs4(html_content: str, class_map: dict):
+    """BeautifulSoup backend that builds one tree for all providers"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+    results = {}
+    for provider, class_name in class_map.items():
+        article = soup.find('article', class_=class_name)
+        if article is None:
+            continue
+        results[provider] = [
+            (provider, li.find('span').text.strip(), float(li.find('em').text.strip()))
+            for li in article.find_all('li')
+        ]
+    return results
+
+
+PARSER_BACKENDS = {
+    'htmlparser': _extract_htmlparser,
+    'regex': _extract_regex,
+    'lxml': _extract_lxml,
+    'bs4': _extract_bs4,
+}
+
+
+def lxml_available():
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_parser_backend(name: str = 'auto'):
+    """Resolve a backend name, 'auto' picks lxml when installed and html.parser otherwise"""
+    if not name or name == 'auto':
+        return 'lxml' if lxml_available() else 'htmlparser'
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown fuel parser backend {name}")
+    if name == 'lxml' and not lxml_available():
+        raise ValueError("Fuel parser backend lxml requires the lxml package")
+    return name
+
+
+def extract_fuel_tuples(html_content, class_map: dict, backend: str = 'auto'):
+    """Extract (provider, type, price) tuples for every provider in class_map"""
+    if isinstance(html_content, bytes):
+        html_content = html_content.decode('utf-8', errors='replace')
+
+    results = PARSER_BACKENDS[resolve_parser_backend(backend)](html_content, class_map)
+
+    for provider, class_name in class_map.items():
+        if provider not in results:
+            raise ValueError(f"No article found with class name {class_name}")
+
+    return {provider: results[provider] for provider in class_map}
+
+
+def parse_fuel_page(html_content, class_map: dict, backend: str = 'auto'):
+    """Parse all providers in class_map from a single pass over the HTML content"""
+    return {
+        provider: [{'provider': p, 'type': fuel_type, 'price': price} for p, fuel_type, price in entries]
+        for provider, entries in extract_fuel_tuples(html_content, class_map, backend).items()
+    }
+
+
+def parse_fuel_page_partial(html_content, class_map: dict, backend: str = 'auto'):
+    """Parse all providers in class_map, isolating the ones that fail
+
+    Returns ({provider: [records]}, {provider: error}). A clean page takes the single pass;
+    otherwise each provider is parsed on its own so one bad block doesn't lose the rest."""
+    try:
+        return parse_fuel_page(html_content, class_map, backend), {}
+    except ValueError:
+        pass
+
+    parsed, errors = {}, {}
+    for provider, class_name in class_map.items():
+        try:
+            parsed.update(parse_fuel_page(html_content, {provider: class_name}, backend))
+        except ValueError as e:
+            errors[provider] = str(e)
+    return parsed, errors
@@ -1,82 +1,258 @@
-from bs4 import BeautifulSoup
-import requests
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
 from app.errors.handlers import DatabaseException
+from app.services.coordination import STORE_LOCK, WORKER_ID
+from app.services.price_cache import price_cache
+from app.services.price_store import price_store
+from app.services.sources import HostRateLimiter, build_sources
+from app.services.workers import get_parse_executor
+from db.checkpoint_repo import CheckpointRepository
+from db.coordination_repo import CoordinationRepository
 from db.db_context import DatabaseContext
 from db.fuel_repo import FuelRepository
-from my_env import debug, fuel_data_scraper_url
+from db.summary_repo import SummaryRepository
+from metrics import parse_duration, rows_parsed, rows_written, scrape_errors, store_duration
+from my_env import coordination_config, fuel_sources, source_concurrency, source_host_interval
+
+
+@dataclass
+class ScrapeReport:
+    """Outcome of a scrape run per source and per provider
+
+    Provider statuses are done (written by this run), skipped (already stored for the
+    day) and failed; a source is done, unchanged (page already stored) or failed."""
+    date: str
+    sources: dict = field(default_factory=dict)  # source -> timing and status
+    providers: dict = field(default_factory=dict)  # source -> {provider: {'status', 'rows', 'error'}}
+    fuel_data: list = field(default_factory=list)  # Rows written by this run
+
+    def record(self, source: str, provider: str, status: str, rows: int = 0, error: str = None):
+        self.providers.setdefault(source, {})[provider] = {'status': status, 'rows': rows, 'error': error}
+
+    def counts(self):
+        """Number of providers per status"""
+        counts = {'done': 0, 'skipped': 0, 'failed': 0}
+        for providers in self.providers.values():
+            for state in providers.values():
+                counts[state['status']] += 1
+        return counts
+
+    def checkpoints(self):
+        """(source, provider, status, rows, error) of every provider this run tried to write"""
+        return [(source, provider, state['status'], state['rows'], state['error'])
+                for source, providers in self.providers.items()
+                for provider, state in providers.items() if state['status'] != 'skipped']
+
+    def as_dict(self):
+        return {'date': self.date, 'counts': self.counts(), 'sources': self.sources, 'providers': self.providers}
 
 
 class FuelDataService:
     def __init__(self):
-        self.url = fuel_data_scraper_url
         self.db_manager = DatabaseContext()  # Initialize DatabaseContext
         self.fuel_repo = FuelRepository(
             self.db_manager)  # Fuel-specific DB manager
+        self.summary_repo = SummaryRepository(self.db_manager)
+        self.checkpoint_repo = CheckpointRepository(self.db_manager)
+        self.coordination_repo = CoordinationRepository(self.db_manager)
+        self.sources = build_sources(fuel_sources)
+        self.run_lock = asyncio.Lock()  # One async scrape at a time
+        self.semaphore = asyncio.Semaphore(source_concurrency)  # Bound concurrent source scrapes
+        self.rate_limiter = HostRateLimiter(source_host_interval)
+        self.source_timings = {}  # Per-source timing of the last run
+        self.last_report = None  # ScrapeReport of the last run
+
+    def save_fuel_data(self, fuel_data: list, date: str = None):
+        """Save parsed fuel data for all providers into the database"""
+        return self.fuel_repo.insert_fuel_data(
+            fuel_data, date)  # Use fuel-specific DB manager
+
+    def write_new_providers(self, report: ScrapeReport, scraped: list):
+        """Insert the providers not yet stored for the day and checkpoint all of them, returns (inserted, rows)
+
+        Prices, summary, checkpoints and the notification commit together, so a failure part way
+        leaves nothing behind for the next run to wrongly skip."""
+        today = report.date
+        with self.db_manager.transaction():
+            stored = self.fuel_repo.get_stored_providers(today)
+
+            pending = []
+            for source, parsed, errors in scraped:
+                for provider, error in errors.items():
+                    report.record(source.name, provider, 'failed', error=error)
+                for provider, fuel_data in parsed.items():
+                    if provider in stored:
+                        report.record(source.name, provider, 'skipped')
+                    else:
+                        report.record(source.name, provider, 'done', rows=len(fuel_data))
+                        pending.extend(fuel_data)
+
+            inserted = 0
+            if pending:
+                try:
+                    inserted = self.save_fuel_data(pending, today)
+                except DatabaseException:
+                    # Another run stored the same providers in the meantime
+                    for providers in report.providers.values():
+                        for state in providers.values():
+                            if state['status'] == 'done':
+                                state.update(status='skipped', rows=0)
+                    pending = []
+                else:
+                    self.summary_repo.refresh_summary(today, today)
+            self.checkpoint_repo.save_checkpoints(today, report.checkpoints())
+            if pending:
+                # Delivered when the transaction commits
+                self.coordination_repo.notify(coordination_config['channel'],
+                                              {'worker': WORKER_ID, 'date': today})
+        return inserted, pending
+
+    def store_fuel_data(self, report: ScrapeReport, scraped: list):
+        """Write the providers of every scraped source not yet stored today in a single transaction,
+        checkpoint each provider and precompute the day's summary
+
+        scraped holds (source, {provider: [records]}, {provider: error}) per parsed source.
+        Providers already stored for the day are skipped, so a rerun resumes where the last one failed.
+        The check and the insert run under an advisory lock, so concurrent workers never store a provider twice."""
+        today = report.date
+        with store_duration.time():
+            self.db_manager.connect()  # Check out a database connection
+            try:
+                self.fuel_repo.create_fuel_table()  # Create fuel table
+                self.summary_repo.create_summary_table()
+                self.checkpoint_repo.create_checkpoint_table()
+                # Other workers wait here, so the providers one of them stored are skipped by the rest
+                with self.coordination_repo.hold(STORE_LOCK):
+                    inserted, pending = self.write_new_providers(report, scraped)
+            finally:
+                self.db_manager.close()  # Return the connection to the pool
+        rows_written.inc(inserted)
+        report.fuel_data = pending
+
+        if pending:
+            price_cache.invalidate()  # New prices are committed
+            price_store.apply(datetime.strptime(today, '%Y-%m-%d').date(), pending)
 
-    def fetch_data(self):
-        """Fetch HTML content from the URL"""
-
-        if debug:
-            print('Using ./raw/gasprice.html as a sample html file...')
-            with open('./raw/gasprice.html', 'r', encoding='utf-8') as file:
-                html_content = file.read()
-            return html_content
-        response = requests.get(self.url)
-        if response.status_code != 200:
-            raise Exception(f"Failed to load page {self.url}")
-        return response.content
-
-    def parse_fuel_data(self, html_content: str, class_name: str, provider: str):
-        """Parse HTML content to extract fuel prices"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        article = soup.find('article', class_=class_name)
-
-        if article is None:
-            raise ValueError(f"No article found with class name {class_name}")
-
-        # Extract the fuel types and prices
-        fuel_data = []
-        for li in article.find_all('li'):
-            fuel_type = li.find('span').text.strip()
-            fuel_price = float(li.find('em').text.strip()
-                               )  # Convert price to float
-            fuel_data.append({
-                'provider': provider,
-                'type': fuel_type,
-                'price': fuel_price
-            })
-
-        return fuel_data
-
-    def save_fuel_data(self, fuel_data: list, provider: str):
-        """Save parsed fuel data into the database"""
-        self.fuel_repo.insert_fuel_data(
-            fuel_data, provider)  # Use fuel-specific DB manager
+        for source, _, errors in scraped:
+            if not errors:
+                source.mark_stored(today)  # A page with failed providers is parsed again on the next run
+        return inserted
+
+    @staticmethod
+    def record_parsed(source, parsed: dict):
+        """Count the parsed rows of a source per provider"""
+        for provider, fuel_data in parsed.items():
+            rows_parsed.inc(len(fuel_data), source=source.name, provider=provider)
+
+    def finish_run(self, report: ScrapeReport, scraped: list, failures: list):
+        """Store what was scraped, raising only when every source failed"""
+        self.last_report = report
+        self.source_timings = report.sources
+        if failures and len(failures) == len(self.sources):
+            raise failures[0]
+        if not any(parsed or errors for _, parsed, errors in scraped):
+            return []
+
+        self.store_fuel_data(report, scraped)
+        return report.fuel_data
 
     def run(self):
-        """Scrape data from all fuel providers"""
-        self.db_manager.connect()  # Connect to the database
-        self.fuel_repo.create_fuel_table()  # Create fuel table
-        html_content = self.fetch_data()
-
-        # Provider-class map
-        class_map = {
-            "ptt": "gasprice ptt",
-            "bcp": "gasprice bcp",
-            "shell": "gasprice shell",
-            "esso": "gasprice esso",
-            "caltex": "gasprice caltex",
-            "pt": "gasprice pt",
-            "susco": "gasprice susco"
-        }
-
-        all_fuel_data = []
-
-        # Scrape all providers
-        for provider, class_name in class_map.items():
-            fuel_data = self.parse_fuel_data(
-                html_content, class_name, provider)
-            self.save_fuel_data(fuel_data, provider)
-            all_fuel_data.extend(fuel_data)
-
-        return all_fuel_data
\ No newline at end of file
+        """Scrape data from all fuel sources one after another, returns the rows written"""
+        report = ScrapeReport(datetime.now().strftime('%Y-%m-%d'))
+        scraped = []
+        failures = []
+
+        for source in self.sources:
+            try:
+                html_content = source.fetch()
+                if source.is_up_to_date(report.date):
+                    print(f'{source.name} page unchanged since the last scrape, skipping...')
+                    report.sources[source.name] = {'status': 'unchanged'}
+                    continue
+                with parse_duration.time(source=source.name):
+                    parsed, errors = source.parse_partial(html_content)
+            except Exception as e:
+                print(f'{source.name} scrape failed: {e}')
+                report.sources[source.name] = {'status': 'failed', 'error': str(e)}
+                scrape_errors.inc(source=source.name)
+                failures.append(e)
+                continue
+            self.record_parsed(source, parsed)
+            report.sources[source.name] = {'status': 'done', 'rows': sum(len(rows) for rows in parsed.values())}
+            scraped.append((source, parsed, errors))
+
+        return self.finish_run(report, scraped, failures)
+
+    async def scrape_source(self, source, report: ScrapeReport):
+        """Fetch and parse one source, returns its parsed records and per-provider errors"""
+        async with self.semaphore:
+            await self.rate_limiter.wait(source.host)
+            timing = {'status': 'running', 'rows': 0}
+            report.sources[source.name] = timing
+
+            start = time.perf_counter()
+            try:
+                html_content = await source.fetch_async()
+                timing['fetch_ms'] = round((time.perf_counter() - start) * 1000, 2)
+                if source.is_up_to_date(report.date):
+                    timing['status'] = 'unchanged'
+                    return {}, {}
+
+                start = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                parsed, errors = await loop.run_in_executor(
+                    get_parse_executor(), source.partial_parse_function(), html_content)
+                parse_seconds = time.perf_counter() - start
+                timing['parse_ms'] = round(parse_seconds * 1000, 2)
+            except Exception as e:
+                timing['status'] = 'failed'
+                timing['error'] = str(e)
+                scrape_errors.inc(source=source.name)
+                raise
+
+            parse_duration.observe(parse_seconds, source=source.name)
+            self.record_parsed(source, parsed)
+
+            timing['status'] = 'done'
+            timing['rows'] = sum(len(rows) for rows in parsed.values())
+            return parsed, errors
+
+    async def run_async(self):
+        """Scrape all fuel sources concurrently and write their new providers in one batch, returns the rows written"""
+        async with self.run_lock:
+            report = ScrapeReport(datetime.now().strftime('%Y-%m-%d'))
+            self.source_timings = report.sources
+            results = await asyncio.gather(
+                *(self.scrape_source(source, report) for source in self.sources), return_exceptions=True)
+
+            scraped = []
+            failures = []
+            for source, result in zip(self.sources, results):
+                if isinstance(result, Exception):
+                    print(f'{source.name} scrape failed: {result}')
+                    failures.append(result)
+                elif isinstance(result, BaseException):
+                    raise result
+                elif result[0] or result[1]:
+                    scraped.append((source, *result))
+
+            if not scraped and not failures:
+                print('Fuel pages unchanged since the last scrape, skipping...')
+            # psycopg2 releases the GIL while waiting on the server
+            return await asyncio.to_thread(self.finish_run, report, scraped, failures)
+
+    def get_checkpoints(self, date: str):
+        """Per-provider scrape state recorded for a day"""
+        self.db_manager.connect()
+        try:
+            self.checkpoint_repo.create_checkpoint_table()
+            return self.checkpoint_repo.get_checkpoints(date)
+        finally:
+            self.db_manager.close()
+
+    async def aclose(self):
+        """Close the shared HTTP clients of every source"""
+        for source in self.sources:
+            await source.aclose()
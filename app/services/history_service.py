@@ -0,0 +1,139 @@
+# history_service.py
+
+import base64
+import csv
+import datetime
+import io
+import json
+from app.services.price_store import price_store
+from db.db_context import DatabaseContext
+from db.history_repo import HistoryRepository
+from db.summary_repo import SummaryRepository
+from my_env import price_store_enabled
+
+# Rows per chunk of a streamed export
+EXPORT_CHUNK_ROWS = 500
+
+
+def encode_cursor(provider: str, fuel_type: str, day):
+    """Opaque keyset cursor for the row after (provider, type, date)"""
+    raw = json.dumps([provider, fuel_type, str(day)], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """(provider, type, date) of a cursor, raising ValueError when it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        provider, fuel_type, day = json.loads(raw)
+        return str(provider), str(fuel_type), datetime.date.fromisoformat(day)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor {cursor}") from e
+
+
+def ndjson_lines(rows):
+    for day, provider, fuel_type, price in rows:
+        yield json.dumps({'date': str(day), 'provider': provider, 'type': fuel_type, 'price': float(price)},
+                         ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('date', 'provider', 'type', 'price'))
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+EXPORT_FORMATS = {'ndjson': ndjson_lines, 'csv': csv_lines}
+
+
+class HistoryService:
+    def __init__(self):
+        self.db_context = DatabaseContext()
+        self.history_repo = HistoryRepository(self.db_context)
+        self.summary_repo = SummaryRepository(self.db_context)
+
+    def _query(self, method, *args):
+        """Run a repository query on a pooled connection."""
+        self.db_context.connect()
+        try:
+            return method(*args)
+        finally:
+            self.db_context.close()
+
+    def get_price_series(self, start_date, end_date, provider=None, fuel_type=None, after=None, limit=None):
+        """Daily prices over a date range, limit rows after the (provider, type, date) of after when given."""
+        return self._query(self.history_repo.get_price_series, start_date, end_date, provider, fuel_type, after, limit)
+
+    def export_price_series(self, start_date, end_date, provider=None, fuel_type=None, after=None, format='ndjson'):
+        """Yield daily prices over a date range as NDJSON or CSV text chunks, streamed from a server-side cursor."""
+        rows = self.history_repo.iter_price_series(start_date, end_date, provider, fuel_type, after)
+        chunk = []
+        for line in EXPORT_FORMATS[format](rows):
+            chunk.append(line)
+            if len(chunk) == EXPORT_CHUNK_ROWS:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+    def get_daily_deltas(self, start_date, end_date, provider=None, fuel_type=None):
+        """Day-over-day price changes over a date range."""
+        return self._query(self.history_repo.get_daily_deltas, start_date, end_date, provider, fuel_type)
+
+    def get_price_store(self):
+        """The columnar price store, loaded from the database on first use."""
+        price_store.ensure_loaded(self.history_repo.get_all_prices)
+        return price_store
+
+    def refresh_price_store(self, day=None):
+        """Bring the price store up to date with a scrape another worker committed on day.
+
+        Only that day's rows are read and applied; without a day a loaded store is reloaded
+        here, so the next analytics request doesn't pay for it."""
+        if day:
+            day = datetime.date.fromisoformat(str(day))
+            rows = self._query(self.history_repo.get_price_series, day, day)
+            price_store.apply(day, [{'provider': provider, 'type': fuel_type, 'price': price}
+                                    for _, provider, fuel_type, price in rows])
+        else:
+            loaded = price_store.loaded
+            price_store.invalidate()
+            if loaded:
+                self.get_price_store()
+
+    def get_price_stats(self, start_date, end_date, fuel_type=None):
+        """Min/max/avg prices per provider over a date range."""
+        if price_store_enabled:
+            return self.get_price_store().stats(start_date, end_date, fuel_type)
+        return self._query(self.history_repo.get_price_stats, start_date, end_date, fuel_type)
+
+    def get_rankings(self, day, fuel_type):
+        """Providers of a fuel type ranked by price on a date, the latest stored day by default."""
+        store = self.get_price_store()
+        day = day or store.latest_date()
+        return day, store.rankings(day, fuel_type) if day else []
+
+    def get_spreads(self, day):
+        """Cheapest and dearest provider per fuel type on a date, the latest stored day by default."""
+        store = self.get_price_store()
+        day = day or store.latest_date()
+        return day, store.spreads(day) if day else []
+
+    def get_daily_summary(self, day=None, fuel_type=None):
+        """Precomputed per-type summary of a date, the latest summarized day by default."""
+        return self._query(self.summary_repo.get_daily_summary, day, fuel_type)
+
+    def get_summary_range(self, start_date, end_date, fuel_type=None):
+        """Precomputed per-type summaries over a date range."""
+        return self._query(self.summary_repo.get_summary_range, start_date, end_date, fuel_type)
+
+    def get_providers(self):
+        return self._query(self.history_repo.get_providers)
+
+    def get_fuel_types(self):
+        return self._query(self.history_repo.get_fuel_types)
@@ -0,0 +1,145 @@
+# app/services/page_fetcher.py
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class FetchResult:
+    content: bytes
+    changed: bool
+    status: int
+    encoding: str = 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class PageFetcher:
+    """Fetch a page over keep-alive clients with ETag/Last-Modified revalidation and a disk cache"""
+
+    def __init__(self, url: str, cache_dir: str, timeout: float = 30.0):
+        self.url = url
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.client = None  # httpx.Client, created on first sync fetch
+        self.async_client = None  # httpx.AsyncClient, created on first async fetch
+        self.stats = {
+            'requests': 0,
+            'hits': 0,
+            'misses': 0,
+            'not_modified': 0,
+            'bytes_downloaded': 0,
+            'bytes_saved': 0,
+        }
+
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        self.meta_path = os.path.join(cache_dir, f'{key}.json')
+        self.body_path = os.path.join(cache_dir, f'{key}.html')
+        self.meta = {}
+        self.body = None
+        self._load()
+
+    def _load(self):
+        """Restore the cached body and validators from disk"""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            with open(self.body_path, 'rb') as file:
+                body = file.read()
+        except (OSError, ValueError):
+            return
+        if hashlib.sha256(body).hexdigest() == meta.get('content_hash'):
+            self.meta = meta
+            self.body = body
+
+    def _save(self, write_body: bool = False):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if write_body and self.body is not None:
+            tmp_path = f'{self.body_path}.tmp'
+            with open(tmp_path, 'wb') as file:
+                file.write(self.body)
+            os.replace(tmp_path, self.body_path)
+        tmp_path = f'{self.meta_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.meta, file)
+        os.replace(tmp_path, self.meta_path)
+
+    def _headers(self):
+        """Conditional request headers from the last successful response"""
+        headers = {}
+        if self.body is not None:
+            if self.meta.get('etag'):
+                headers['If-None-Match'] = self.meta['etag']
+            if self.meta.get('last_modified'):
+                headers['If-Modified-Since'] = self.meta['last_modified']
+        return headers
+
+    def _handle(self, response: 'httpx.Response'):
+        """Turn a response into a FetchResult and update the cache and counters"""
+        self.stats['requests'] += 1
+
+        if response.status_code == 304 and self.body is not None:
+            self.stats['hits'] += 1
+            self.stats['not_modified'] += 1
+            self.stats['bytes_saved'] += len(self.body)
+            return FetchResult(self.body, False, 304, self.meta.get('encoding') or 'utf-8')
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to load page {self.url}")
+
+        content = response.content
+        self.stats['bytes_downloaded'] += len(response.content)
+        content_hash = hashlib.sha256(content).hexdigest()
+        changed = content_hash != self.meta.get('content_hash')
+        self.stats['misses' if changed else 'hits'] += 1
+
+        self.meta.update({
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': content_hash,
+            'encoding': response.encoding or 'utf-8',
+        })
+        if changed:
+            self.body = content
+            self.meta['stored_date'] = None  # New content has not been persisted yet
+        self._save(write_body=changed)
+
+        return FetchResult(content, changed, 200, self.meta['encoding'])
+
+    def fetch(self):
+        """Fetch the page, revalidating against the cached copy"""
+        if self.client is None:
+            import httpx  # Deferred, it is slow to import and only needed once a scrape runs
+            self.client = httpx.Client(timeout=self.timeout, follow_redirects=True)
+        return self._handle(self.client.get(self.url, headers=self._headers()))
+
+    async def fetch_async(self):
+        """Fetch the page without blocking the event loop, revalidating against the cached copy"""
+        if self.async_client is None:
+            import httpx
+            self.async_client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        return self._handle(await self.async_client.get(self.url, headers=self._headers()))
+
+    def is_stored(self, date: str):
+        """Whether the cached content was already persisted for the given date"""
+        return self.body is not None and self.meta.get('stored_date') == date
+
+    def mark_stored(self, date: str):
+        """Record that the cached content has been persisted for the given date"""
+        self.meta['stored_date'] = date
+        self._save()
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    async def aclose(self):
+        self.close()
+        if self.async_client is not None:
+            await self.async_client.aclose()
+            self.async_client = None
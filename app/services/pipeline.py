@@ -0,0 +1,37 @@
+# app/services/pipeline.py
+
+from app.errors.handlers import DatabaseException
+
+
+class FuelPipeline:
+    """Scrape, persist and alert as one in-process run
+
+    Once rows are stored the alert stays pending until it goes out, so a retry after a
+    failed alert sends it even though the scrape itself has nothing new to store."""
+
+    def __init__(self, fuel_service, alert_service):
+        self.fuel_service = fuel_service
+        self.alert_service = alert_service
+        self.alert_pending = False
+
+    async def run(self):
+        try:
+            fuel_data = await self.fuel_service.run_async()
+        except DatabaseException as e:
+            # Today's prices are already stored, nothing new to alert on
+            print(e.message)
+            if not self.alert_pending:
+                return {'rows': 0, 'changes': 0, 'message': e.message}
+            fuel_data = []
+
+        report = self.fuel_service.last_report
+        providers = report.counts() if report is not None else {}
+        if fuel_data:
+            self.alert_pending = True
+        elif not self.alert_pending:
+            return {'rows': 0, 'changes': 0, 'providers': providers, 'message': "Fuel data unchanged."}
+
+        changes = await self.alert_service.send_price_change_alert()
+        self.alert_pending = False
+        message = "Fuel data inserted successfully." if fuel_data else "Pending price change alert sent."
+        return {'rows': len(fuel_data), 'changes': changes, 'providers': providers, 'message': message}
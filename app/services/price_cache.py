@@ -0,0 +1,70 @@
+# app/services/price_cache.py
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from my_env import price_cache_ttl
+
+
+@dataclass
+class PriceCacheEntry:
+    rows: list
+    etag: str
+    expires_at: float
+
+
+class PriceCache:
+    """In-process read cache for price queries, keyed by (date, fuel_type tuple)"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped by invalidate(), so loads started before it aren't cached
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, key: tuple):
+        """Return the live entry for key, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                self._entries.pop(key, None)
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            return entry
+
+    def set(self, key: tuple, rows: list, generation: int = None):
+        """Cache rows for key, unless they were loaded before an invalidation since generation"""
+        etag = hashlib.sha1(repr((key, rows)).encode('utf-8')).hexdigest()
+        entry = PriceCacheEntry(rows, etag, time.monotonic() + self.ttl)
+        with self._lock:
+            if generation is None or generation == self.generation:
+                self._entries[key] = entry
+        return entry
+
+    def get_or_load(self, key: tuple, loader):
+        """Read-through lookup, calling loader() to fill a miss"""
+        generation = self.generation
+        entry = self.get(key)
+        if entry is None:
+            entry = self.set(key, loader(), generation)
+        return entry
+
+    def invalidate(self):
+        """Drop every entry, called after new prices are committed"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.stats['invalidations'] += 1
+
+
+def price_key(fuel_type: tuple, date: str = None):
+    """Cache key for a price query, defaulting to today"""
+    return (date or datetime.now().strftime('%Y-%m-%d'), tuple(fuel_type))
+
+
+# Process-wide cache shared by the alert and price services
+price_cache = PriceCache(price_cache_ttl)
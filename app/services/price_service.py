@@ -0,0 +1,31 @@
+# price_service.py
+
+from app.services.price_cache import price_cache, price_key
+from db.db_context import DatabaseContext
+from db.fuel_repo import DEFAULT_FUEL_TYPES, FuelRepository
+from metrics import price_read_duration
+
+
+class PriceService:
+    def __init__(self):
+        self.db_context = DatabaseContext()
+        self.fuel_repo = FuelRepository(self.db_context)
+
+    def load_fuel_prices(self, key: tuple):
+        """Query the prices for a cache key from the database."""
+        date, fuel_type = key
+        with price_read_duration.time(query='prices'):
+            self.db_context.connect()
+            try:
+                return self.fuel_repo.get_fuel_prices(fuel_type, date)
+            finally:
+                self.db_context.close()
+
+    def get_cached_fuel_prices(self, fuel_type=DEFAULT_FUEL_TYPES):
+        """Return today's cached prices entry without touching the database, or None."""
+        return price_cache.get(price_key(fuel_type))
+
+    def get_fuel_prices(self, fuel_type=DEFAULT_FUEL_TYPES):
+        """Return today's prices entry, reading through the cache."""
+        key = price_key(fuel_type)
+        return price_cache.get_or_load(key, lambda: self.load_fuel_prices(key))
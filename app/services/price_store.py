@@ -0,0 +1,202 @@
+# app/services/price_store.py
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date as Date
+from decimal import ROUND_HALF_UP, Decimal
+
+
+def to_cents(price):
+    """Fixed-point cents of a float or Decimal price"""
+    return int((Decimal(str(price)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+class PriceSeries:
+    """Prices of one provider and fuel type as parallel int32 columns sorted by date"""
+
+    __slots__ = ('dates', 'prices')
+
+    def __init__(self):
+        self.dates = array('i')  # Date ordinals
+        self.prices = array('i')  # Cents
+
+    def add(self, ordinal: int, cents: int):
+        """Add a day's price, ignoring a day already present like ON CONFLICT DO NOTHING"""
+        if not self.dates or ordinal > self.dates[-1]:
+            self.dates.append(ordinal)
+            self.prices.append(cents)
+            return True
+        index = bisect_left(self.dates, ordinal)
+        if index < len(self.dates) and self.dates[index] == ordinal:
+            return False
+        self.dates.insert(index, ordinal)
+        self.prices.insert(index, cents)
+        return True
+
+    def window(self, start: int, end: int):
+        """Prices between two date ordinals inclusive, as an array slice"""
+        return self.prices[bisect_left(self.dates, start):bisect_right(self.dates, end)]
+
+    def price_on(self, ordinal: int):
+        """Price on a date ordinal, or None"""
+        index = bisect_left(self.dates, ordinal)
+        if index < len(self.dates) and self.dates[index] == ordinal:
+            return self.prices[index]
+        return None
+
+
+class ColumnarPriceStore:
+    """Compact in-memory copy of fuel_prices for analytics.
+
+    Providers and fuel types are dictionary-encoded to small ints, and every
+    (provider, type) pair holds a PriceSeries of int32 date ordinals and prices
+    in cents. The store loads lazily on first use and is kept current by apply().
+
+    Reads and updates hold the lock. A (re)load builds a new copy without it and swaps
+    it in whole, so after invalidate() readers keep the previous copy until the new one is in."""
+
+    # Attributes making up one copy of the data, swapped in together
+    DATA = ('providers', 'types', 'provider_codes', 'type_codes', 'series', 'rows')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()  # One load at a time
+        self.loaded = False
+        self.generation = 0  # Bumped by invalidate(), a load started before it is thrown away
+        self.applied = None  # apply() calls made while a load runs, replayed onto the loaded copy
+        self._reset()
+
+    def _reset(self):
+        self.providers = []  # Code -> name
+        self.types = []
+        self.provider_codes = {}  # Name -> code
+        self.type_codes = {}
+        self.series = {}  # (provider code, type code) -> PriceSeries
+        self.rows = 0
+
+    def _code(self, name: str, names: list, codes: dict):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def _add(self, provider: str, fuel_type: str, day: Date, price):
+        key = (self._code(provider, self.providers, self.provider_codes),
+               self._code(fuel_type, self.types, self.type_codes))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = PriceSeries()
+        if series.add(day.toordinal(), to_cents(price)):
+            self.rows += 1
+
+    def _add_scrape(self, day: Date, fuel_data: list):
+        for entry in fuel_data:
+            self._add(entry['provider'], entry['type'], day, entry['price'])
+
+    def ensure_loaded(self, loader):
+        """Load every stored row through loader() unless loaded; loader yields (provider, type, date, price)"""
+        if self.loaded:
+            return
+        with self.load_lock:
+            while True:
+                with self.lock:
+                    if self.loaded:
+                        return
+                    generation = self.generation
+                    self.applied = []
+                staged = ColumnarPriceStore()
+                for provider, fuel_type, day, price in loader():
+                    staged._add(provider, fuel_type, day, price)
+                with self.lock:
+                    applied, self.applied = self.applied, None
+                    if self.generation != generation:
+                        continue  # Invalidated while loading, load again
+                    for day, fuel_data in applied:
+                        staged._add_scrape(day, fuel_data)  # Committed after the loader's snapshot, maybe
+                    for name in self.DATA:
+                        setattr(self, name, getattr(staged, name))
+                    self.loaded = True
+                    return
+
+    def apply(self, day: Date, fuel_data: list):
+        """Add a scrape's rows to a loaded store; an unloaded store picks them up when it loads"""
+        with self.lock:
+            if self.applied is not None:
+                self.applied.append((day, fuel_data))
+            if self.loaded:
+                self._add_scrape(day, fuel_data)
+
+    def invalidate(self):
+        """Reload on next use, after bulk changes to fuel_prices; the current copy is served until then"""
+        with self.lock:
+            self.loaded = False
+            self.generation += 1
+
+    def _select(self, fuel_type=None):
+        """Series of one fuel type, or of all, as (provider, type, series) in name order, lock held"""
+        type_code = None
+        if fuel_type is not None:
+            type_code = self.type_codes.get(fuel_type)
+            if type_code is None:
+                return []
+        selected = [(self.providers[p], self.types[t], series) for (p, t), series in self.series.items()
+                    if type_code is None or t == type_code]
+        return sorted(selected, key=lambda item: (item[0], item[1]))
+
+    def stats(self, start: Date, end: Date, fuel_type=None):
+        """(provider, type, min, max, avg, days) per series between two dates, like the SQL stats query"""
+        results = []
+        with self.lock:
+            for provider, name, series in self._select(fuel_type):
+                window = series.window(start.toordinal(), end.toordinal())
+                if window:
+                    average = (Decimal(sum(window)) / len(window)).quantize(Decimal(1), ROUND_HALF_UP)
+                    results.append((provider, name, from_cents(min(window)), from_cents(max(window)),
+                                    from_cents(average), len(window)))
+        return results
+
+    def latest_date(self):
+        """Most recent date with any stored price, or None when empty"""
+        with self.lock:
+            ordinals = [series.dates[-1] for series in self.series.values() if series.dates]
+        return Date.fromordinal(max(ordinals)) if ordinals else None
+
+    def rankings(self, day: Date, fuel_type: str):
+        """(provider, price) of a fuel type on a date, cheapest first"""
+        ordinal = day.toordinal()
+        with self.lock:
+            prices = [(price, provider) for provider, _, series in self._select(fuel_type)
+                      if (price := series.price_on(ordinal)) is not None]
+        return [(provider, from_cents(price)) for price, provider in sorted(prices)]
+
+    def spreads(self, day: Date):
+        """(type, cheapest provider, lowest, dearest provider, highest, spread) per fuel type on a date"""
+        ordinal = day.toordinal()
+        by_type = {}
+        with self.lock:
+            for provider, name, series in self._select():
+                price = series.price_on(ordinal)
+                if price is not None:
+                    by_type.setdefault(name, []).append((price, provider))
+        results = []
+        for name in sorted(by_type):
+            prices = by_type[name]
+            low, high = min(prices), max(prices)
+            results.append((name, low[1], from_cents(low[0]), high[1], from_cents(high[0]),
+                            from_cents(high[0] - low[0])))
+        return results
+
+    def nbytes(self):
+        """Bytes held by the price and date columns"""
+        with self.lock:
+            return sum(series.dates.itemsize * len(series.dates) * 2 for series in self.series.values())
+
+
+# Process-wide store behind the analytics endpoints
+price_store = ColumnarPriceStore()
@@ -0,0 +1,73 @@
+# app/services/reprocessor.py
+
+import gzip
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from my_env import reprocess_chunk_size, reprocess_workers
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def parse_chunk(extractors: dict, chunk: list):
+    """Parse a work unit of (key, source, content) pages on a worker process.
+
+    Content arrives as raw or gzipped bytes and leaves as compact (provider, type, price) tuples."""
+    results = []
+    for key, source, content in chunk:
+        if content[:2] == GZIP_MAGIC:
+            content = gzip.decompress(content)
+        parsed = extractors[source](content)
+        results.append((key, [row for rows in parsed.values() for row in rows]))
+    return results
+
+
+def _chunks(pages, size: int):
+    pages = iter(pages)
+    while True:
+        chunk = list(islice(pages, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Reprocessor:
+    """Fan page parsing out over worker processes and stream the rows back in input order"""
+
+    def __init__(self, workers: int = reprocess_workers, chunk_size: int = reprocess_chunk_size,
+                 max_pending: int = None):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = max(chunk_size, 1)
+        # Chunks in flight; bounds memory while keeping every worker busy
+        self.max_pending = max_pending or max(self.workers, 1) * 2
+        self.stats = {'pages': 0, 'rows': 0, 'chunks': 0}
+
+    def _record(self, results: list):
+        self.stats['chunks'] += 1
+        self.stats['pages'] += len(results)
+        self.stats['rows'] += sum(len(rows) for _, rows in results)
+        return results
+
+    def run(self, pages, extractors: dict):
+        """Yield (key, rows) for every (key, source, content) page, in the order given.
+
+        extractors maps a source name to its picklable extract function. Pages are read
+        from the iterable only as work units are submitted; workers=0 parses inline."""
+        if self.workers == 0:
+            for chunk in _chunks(pages, self.chunk_size):
+                yield from self._record(parse_chunk(extractors, chunk))
+            return
+
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        pending = deque()
+        try:
+            for chunk in _chunks(pages, self.chunk_size):
+                pending.append(executor.submit(parse_chunk, extractors, chunk))
+                if len(pending) >= self.max_pending:
+                    yield from self._record(pending.popleft().result())
+            while pending:
+                yield from self._record(pending.popleft().result())
+        finally:
+            # Also reached when the consumer stops early
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,162 @@
+# app/services/scheduler.py
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+
+class CronSchedule:
+    """Five-field cron expression: minute hour day-of-month month day-of-week"""
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression {expression}")
+        self.expression = expression
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}  # 7 is Sunday too
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = end = int(part)
+                if step > 1:
+                    end = high
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Invalid cron field {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime):
+        day_match = moment.day in self.days
+        weekday_match = (moment.isoweekday() % 7) in self.weekdays
+        # Like cron, a restricted day-of-month and day-of-week match either
+        if self.any_day:
+            return weekday_match
+        if self.any_weekday:
+            return day_match
+        return day_match or weekday_match
+
+    def next_after(self, moment: datetime):
+        """First matching minute strictly after moment"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression {self.expression} never matches")
+
+
+class PipelineScheduler:
+    """Run an async job on a cron schedule with jitter, retries and single-flight locking
+
+    With a leader (anything with is_leader()) scheduled runs only happen in the leading worker,
+    manual runs happen wherever they are triggered."""
+
+    def __init__(self, schedule: str, job, jitter: float = 0.0, max_retries: int = 3, backoff: float = 30.0,
+                 leader=None):
+        self.schedule = CronSchedule(schedule)
+        self.job = job
+        self.jitter = jitter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.leader = leader
+        self.is_leader = leader is None
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.next_run = None
+        self.last_run = None
+
+    async def run_once(self, trigger: str = 'manual'):
+        """Run the job now unless a run is already in progress"""
+        if self.lock.locked():
+            return None  # Single flight, the running job covers this trigger
+
+        async with self.lock:
+            started_at = datetime.now()
+            start = time.perf_counter()
+            run = {'trigger': trigger, 'started_at': started_at.isoformat(), 'attempts': 0}
+            for attempt in range(self.max_retries + 1):
+                run['attempts'] = attempt + 1
+                try:
+                    run['result'] = await self.job()
+                    run['status'] = 'success'
+                    run.pop('error', None)
+                    break
+                except Exception as e:
+                    run['status'] = 'failed'
+                    run['error'] = str(e)
+                    if attempt == self.max_retries:
+                        break
+                    delay = self.backoff * 2 ** attempt
+                    print(f"Scheduled run failed ({e}), retrying in {delay:.0f}s...")
+                    await asyncio.sleep(delay)
+            run['finished_at'] = datetime.now().isoformat()
+            run['duration_s'] = round(time.perf_counter() - start, 3)
+            self.last_run = run
+            return run
+
+    async def _loop(self):
+        while True:
+            self.next_run = self.schedule.next_after(datetime.now())
+            delay = (self.next_run - datetime.now()).total_seconds() + random.uniform(0, self.jitter)
+            await asyncio.sleep(max(delay, 0))
+            try:
+                if self.leader is not None:
+                    self.is_leader = await asyncio.to_thread(self.leader.is_leader)
+                    if not self.is_leader:
+                        continue  # Another worker runs this one
+                await self.run_once('schedule')
+            except Exception as e:
+                print(f"Scheduled run crashed: {e}")
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+            self.next_run = None
+        if self.leader is not None:
+            await asyncio.to_thread(self.leader.release)
+            self.is_leader = False
+
+    def status(self):
+        return {
+            'schedule': self.schedule.expression,
+            'running': self.lock.locked(),
+            'enabled': self.task is not None,
+            'leader': self.is_leader,
+            'next_run': self.next_run.isoformat() if self.next_run else None,
+            'last_run': self.last_run,
+        }
@@ -0,0 +1,102 @@
+# app/services/snapshot_archive.py
+
+import gzip
+import hashlib
+import os
+import threading
+from datetime import datetime
+from my_env import snapshot_archive_dir
+
+
+class SnapshotArchive:
+    """Content-addressed store of fetched pages with a per-month index by fetch time.
+
+    Blobs live at objects/<hash[:2]>/<hash>.gz, so an unchanged page is stored once.
+    Index lines in index/<YYYY-MM>.tsv are "<fetched_at>\\t<source>\\t<hash>", written
+    only when a source's page differs from the last one indexed for that day."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.lock = threading.Lock()
+        self.last_indexed = {}  # source -> (date, hash) of the last index line
+        self._load_last_indexed()
+
+    def blob_path(self, digest: str):
+        return os.path.join(self.root, 'objects', digest[:2], f'{digest}.gz')
+
+    def index_path(self, month: str):
+        return os.path.join(self.root, 'index', f'{month}.tsv')
+
+    def _load_last_indexed(self):
+        index_dir = os.path.join(self.root, 'index')
+        if not os.path.isdir(index_dir):
+            return
+        months = sorted(name[:-4] for name in os.listdir(index_dir) if name.endswith('.tsv'))
+        if months:
+            for fetched_at, source, digest in self._read_month(months[-1]):
+                self.last_indexed[source] = (fetched_at[:10], digest)
+
+    def store(self, source: str, content: bytes, digest: str = None, fetched_at: datetime = None):
+        """Archive a fetched page, returns its content hash"""
+        digest = digest or hashlib.sha256(content).hexdigest()
+        fetched_at = fetched_at or datetime.now()
+        day = fetched_at.strftime('%Y-%m-%d')
+
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+
+        with self.lock:
+            if self.last_indexed.get(source) != (day, digest):
+                index_path = self.index_path(fetched_at.strftime('%Y-%m'))
+                os.makedirs(os.path.dirname(index_path), exist_ok=True)
+                with open(index_path, 'a', encoding='utf-8') as file:
+                    file.write(f'{fetched_at.isoformat(timespec="seconds")}\t{source}\t{digest}\n')
+                self.last_indexed[source] = (day, digest)
+        return digest
+
+    def load(self, digest: str):
+        with gzip.open(self.blob_path(digest), 'rb') as file:
+            return file.read()
+
+    def load_compressed(self, digest: str):
+        """The gzipped blob as stored, for shipping to a worker that decompresses it"""
+        with open(self.blob_path(digest), 'rb') as file:
+            return file.read()
+
+    def _read_month(self, month: str):
+        try:
+            with open(self.index_path(month), 'r', encoding='utf-8') as file:
+                for line in file:
+                    fields = line.rstrip('\n').split('\t')
+                    if len(fields) == 3:
+                        yield tuple(fields)
+        except FileNotFoundError:
+            return
+
+    def entries(self, start_date: str, end_date: str, source: str = None):
+        """Index entries fetched between two dates inclusive, in fetch order"""
+        month = start_date[:7]
+        while month <= end_date[:7]:
+            for fetched_at, entry_source, digest in self._read_month(month):
+                if start_date <= fetched_at[:10] <= end_date and source in (None, entry_source):
+                    yield fetched_at, entry_source, digest
+            year, number = int(month[:4]), int(month[5:])
+            month = f'{year + number // 12}-{number % 12 + 1:02d}'
+
+    def daily_snapshots(self, start_date: str, end_date: str, source: str = None):
+        """The first snapshot of each day per source, as the daily scrape stored it
+
+        Returns {(date, source): hash} in date order."""
+        snapshots = {}
+        for fetched_at, entry_source, digest in self.entries(start_date, end_date, source):
+            snapshots.setdefault((fetched_at[:10], entry_source), digest)
+        return snapshots
+
+
+# Process-wide archive written by every source fetch, None when disabled
+snapshot_archive = SnapshotArchive(snapshot_archive_dir) if snapshot_archive_dir else None
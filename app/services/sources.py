@@ -0,0 +1,171 @@
+# app/services/sources.py
+
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+from app.services.fuel_parser import extract_fuel_tuples, parse_fuel_page, parse_fuel_page_partial
+from app.services.page_fetcher import PageFetcher
+from app.services.snapshot_archive import snapshot_archive
+from metrics import fetch_bytes, fetch_duration
+from my_env import debug, fetch_cache_dir, fetch_timeout, fuel_data_scraper_url, fuel_parser_backend
+
+# Source name -> FuelSource subclass, filled by @register_source
+SOURCE_REGISTRY = {}
+
+
+def register_source(cls):
+    """Class decorator adding a source plugin to the registry"""
+    SOURCE_REGISTRY[cls.name] = cls
+    return cls
+
+
+class FuelSource(ABC):
+    """An upstream price page with its own fetcher and parser, subclasses provide parse_function"""
+
+    name = None
+    url = None
+    sample_path = None  # Local page used instead of the network in debug mode
+
+    def __init__(self, parser_backend: str = fuel_parser_backend):
+        self.parser_backend = parser_backend
+        self.fetcher = PageFetcher(self.url, fetch_cache_dir, fetch_timeout)
+        self.last_fetch = None  # FetchResult of the last network fetch
+
+    @property
+    def host(self):
+        return urlparse(self.url).netloc
+
+    def read_sample(self):
+        """Read the sample HTML file used in debug mode"""
+        print(f'Using {self.sample_path} as a sample html file...')
+        with open(self.sample_path, 'r', encoding='utf-8') as file:
+            html_content = file.read()
+        return html_content
+
+    def fetch(self):
+        """Fetch HTML content from the URL"""
+        if debug and self.sample_path:
+            return self.read_sample()
+
+        with fetch_duration.time(source=self.name):
+            self.last_fetch = self.fetcher.fetch()
+        fetch_bytes.inc(len(self.last_fetch.content), source=self.name)
+        self.archive_page()
+        return self.last_fetch.text
+
+    async def fetch_async(self):
+        """Fetch HTML content from the URL without blocking the event loop"""
+        if debug and self.sample_path:
+            return await asyncio.to_thread(self.read_sample)
+
+        with fetch_duration.time(source=self.name):
+            self.last_fetch = await self.fetcher.fetch_async()
+        fetch_bytes.inc(len(self.last_fetch.content), source=self.name)
+        await asyncio.to_thread(self.archive_page)
+        return self.last_fetch.text
+
+    def archive_page(self):
+        """Keep the fetched page in the snapshot archive so it can be re-parsed later"""
+        if snapshot_archive is not None:
+            snapshot_archive.store(self.name, self.last_fetch.content)
+
+    def is_up_to_date(self, date: str):
+        """Whether the last fetched page is unchanged and already stored for date"""
+        if self.last_fetch is None or self.last_fetch.changed:
+            return False
+        return self.fetcher.is_stored(date)
+
+    def mark_stored(self, date: str):
+        if self.last_fetch is not None:
+            self.fetcher.mark_stored(date)
+
+    @abstractmethod
+    def parse_function(self):
+        """Picklable callable turning page content into {provider: [records]}, run on a parse worker"""
+
+    def partial_parse_function(self):
+        """Picklable callable turning page content into ({provider: [records]}, {provider: error})
+
+        By default any parse error fails the whole source."""
+        return functools.partial(_parse_all, self.parse_function())
+
+    def extract_function(self):
+        """Picklable callable turning page content into {provider: [(provider, type, price)]}"""
+        return functools.partial(_records_to_tuples, self.parse_function())
+
+    def parse(self, html_content):
+        return self.parse_function()(html_content)
+
+    def parse_partial(self, html_content):
+        return self.partial_parse_function()(html_content)
+
+    async def aclose(self):
+        await self.fetcher.aclose()
+
+
+def _parse_all(parse, html_content):
+    return parse(html_content), {}
+
+
+def _records_to_tuples(parse, html_content):
+    return {
+        provider: [(entry['provider'], entry['type'], entry['price']) for entry in fuel_data]
+        for provider, fuel_data in parse(html_content).items()
+    }
+
+
+@register_source
+class KapookSource(FuelSource):
+    """gasprice.kapook.com, one article.gasprice block per provider"""
+
+    name = 'kapook'
+    url = fuel_data_scraper_url
+    sample_path = './raw/gasprice.html'
+
+    # Provider-class map
+    class_map = {
+        "ptt": "gasprice ptt",
+        "bcp": "gasprice bcp",
+        "shell": "gasprice shell",
+        "esso": "gasprice esso",
+        "caltex": "gasprice caltex",
+        "pt": "gasprice pt",
+        "susco": "gasprice susco"
+    }
+
+    def parse_function(self):
+        return functools.partial(parse_fuel_page, class_map=self.class_map, backend=self.parser_backend)
+
+    def partial_parse_function(self):
+        return functools.partial(parse_fuel_page_partial, class_map=self.class_map, backend=self.parser_backend)
+
+    def extract_function(self):
+        return functools.partial(extract_fuel_tuples, class_map=self.class_map, backend=self.parser_backend)
+
+
+def build_sources(names: list):
+    """Instantiate the configured sources by registry name"""
+    sources = []
+    for name in names:
+        if name not in SOURCE_REGISTRY:
+            raise ValueError(f"Unknown fuel source {name}")
+        sources.append(SOURCE_REGISTRY[name]())
+    return sources
+
+
+class HostRateLimiter:
+    """Space out requests to the same host by a minimum interval"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.next_allowed = {}
+
+    async def wait(self, host: str):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        # Reserve the slot before sleeping so concurrent callers queue up
+        ready = max(now, self.next_allowed.get(host, now))
+        self.next_allowed[host] = ready + self.min_interval
+        if ready > now:
+            await asyncio.sleep(ready - now)
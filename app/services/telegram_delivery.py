@@ -0,0 +1,388 @@
+# app/services/telegram_delivery.py
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from metrics import telegram_messages, telegram_send_duration
+
+# Telegram rejects longer sendMessage texts
+MESSAGE_LIMIT = 4096
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT):
+    """Split a message into parts of at most limit characters, on line breaks where possible"""
+    parts = []
+    current = ''
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ''
+            parts.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            parts.append(current)
+            current = ''
+        current += line
+    if current or not parts:
+        parts.append(current)
+    return parts
+
+
+class TokenBucket:
+    """Token bucket allowing rate sends per second with bursts of capacity"""
+
+    def __init__(self, rate: float, capacity: float = 1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_in(self):
+        """Seconds until a token is available, 0 when one is"""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """Hold every token back for seconds, after the server asked to slow down"""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class MessageQueue:
+    """SQLite-backed outbox of messages waiting for delivery, surviving restarts.
+
+    Delivered messages are deleted; messages out of attempts are kept as failed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = None  # Opened on first use
+
+    def _connect(self):
+        if self.connection is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL;')
+            connection.executescript('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT,
+                parse_mode TEXT
+            );
+            CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, id);
+            ''')
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(outbox);')]
+            if 'parse_mode' not in columns:
+                # Outboxes from before formatted alerts hold plain text only
+                connection.execute('ALTER TABLE outbox ADD COLUMN parse_mode TEXT;')
+            self.connection = connection
+        return self.connection
+
+    def enqueue(self, messages: list, parse_mode: str = None):
+        """Queue (chat_id, text) messages in order, in one transaction
+
+        The parse_mode the texts were rendered for is stored with them, so messages queued
+        before a template change are still sent the way they were written."""
+        now = time.time()
+        with self.lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('BEGIN;')
+                connection.executemany(
+                    'INSERT INTO outbox (chat_id, text, next_attempt_at, parse_mode) VALUES (?, ?, ?, ?);',
+                    [(str(chat_id), text, now, parse_mode) for chat_id, text in messages])
+
+    def pending(self, limit: int = 500):
+        """Oldest pending messages as (id, chat_id, text, attempts, next_attempt_at, parse_mode)"""
+        with self.lock:
+            return self._connect().execute('''
+            SELECT id, chat_id, text, attempts, next_attempt_at, parse_mode FROM outbox
+            WHERE status = 'pending' ORDER BY id LIMIT ?;
+            ''', (limit,)).fetchall()
+
+    def _update(self, query: str, params: list):
+        with self.lock:
+            self._connect().executemany(query, params)
+
+    def ack(self, ids: list):
+        self._update('DELETE FROM outbox WHERE id = ?;', [(id,) for id in ids])
+
+    def retry(self, ids: list, delay: float, error: str):
+        """Count an attempt and hold the messages back for delay seconds"""
+        next_attempt_at = time.time() + delay
+        self._update('UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, error = ? WHERE id = ?;',
+                     [(next_attempt_at, error, id) for id in ids])
+
+    def fail(self, ids: list, error: str):
+        self._update("UPDATE outbox SET attempts = attempts + 1, status = 'failed', error = ? WHERE id = ?;",
+                     [(error, id) for id in ids])
+
+    def counts(self):
+        """Number of messages per status"""
+        with self.lock:
+            rows = self._connect().execute('SELECT status, COUNT(*) FROM outbox GROUP BY status;').fetchall()
+        return {'pending': 0, 'failed': 0, **dict(rows)}
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+def coalesce(rows: list, limit: int = MESSAGE_LIMIT):
+    """Merge consecutive queued messages of one chat into as few sends as fit the limit
+
+    Only messages sharing a parse_mode are merged. Yields (ids, text, attempts, parse_mode) per send."""
+    ids, texts, size, attempts, parse_mode = [], [], 0, 0, None
+    for id, _, text, row_attempts, _, row_parse_mode in rows:
+        joined = size + len(text) + (1 if texts else 0)
+        if texts and (joined > limit or row_parse_mode != parse_mode):
+            yield ids, '\n'.join(texts), attempts, parse_mode
+            ids, texts, size, attempts = [], [], 0, 0
+            joined = len(text)
+        ids.append(id)
+        texts.append(text)
+        size = joined
+        attempts = max(attempts, row_attempts)
+        parse_mode = row_parse_mode
+    if texts:
+        yield ids, '\n'.join(texts), attempts, parse_mode
+
+
+def retry_after(response, default: float):
+    """Seconds a 429 reply asks to wait, from Telegram's JSON body, a Retry-After header or default"""
+    try:
+        return float(response.json()['parameters']['retry_after'])
+    except (ValueError, KeyError, TypeError):
+        pass  # Not Telegram's JSON, e.g. a proxy's error page
+    try:
+        return float(response.headers['Retry-After'])
+    except (ValueError, KeyError):
+        return default
+
+
+class TelegramSender:
+    """Background sender draining the message queue through the Bot API.
+
+    One keep-alive HTTP client is shared by every send. A global token bucket and one
+    per chat keep within Telegram's flood limits, 429 responses pause sending for the
+    requested time and other failures are retried with exponential backoff."""
+
+    def __init__(self, queue: MessageQueue, token: str, api_url: str = 'https://api.telegram.org',
+                 rate: float = 25, chat_rate: float = 1, group_rate: float = 1 / 3,
+                 max_attempts: int = 8, backoff: float = 2.0, concurrency: int = 8, timeout: float = 30.0,
+                 transport=None):
+        self.queue = queue
+        self.token = token
+        self.api_url = api_url.rstrip('/')
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate  # Group chats have negative ids and stricter limits
+        self.chat_buckets = {}
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.concurrency = concurrency  # Chats sent to at once
+        self.timeout = timeout
+        self.transport = transport  # Custom httpx transport, used by tests
+        self.client = None  # httpx.AsyncClient, created on first send
+        self.task = None
+        self.wakeup = None  # asyncio.Event of the sender's loop
+
+    def chat_bucket(self, chat_id: str):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            rate = self.group_rate if chat_id.startswith('-') else self.chat_rate
+            bucket = self.chat_buckets[chat_id] = TokenBucket(rate)
+        return bucket
+
+    async def enqueue(self, chat_id, message: str, parse_mode: str = None):
+        """Queue a message for a chat, split to Telegram's size limit, and wake the sender"""
+        return await self.enqueue_many([(chat_id, message)], parse_mode)
+
+    async def enqueue_many(self, messages: list, parse_mode: str = None):
+        """Queue (chat_id, message) pairs in one write and wake the sender, returns the number of parts queued.
+
+        parse_mode is MarkdownV2 or HTML for formatted messages, None for plain text.
+        Chats sharing a message share its split, so fanning one text out stays cheap."""
+        splits = {}
+        parts = []
+        for chat_id, message in messages:
+            if message not in splits:
+                splits[message] = split_message(message)
+            parts.extend((chat_id, part) for part in splits[message])
+        if parts:
+            await asyncio.to_thread(self.queue.enqueue, parts, parse_mode)
+            self.start()
+            self.wakeup.set()
+        return len(parts)
+
+    async def _post(self, chat_id: str, text: str, parse_mode: str = None):
+        if self.client is None:
+            import httpx  # Deferred, it is slow to import and only needed once a message is sent
+            self.client = httpx.AsyncClient(timeout=self.timeout, transport=self.transport)
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        return await self.client.post(f'{self.api_url}/bot{self.token}/sendMessage', json=payload)
+
+    async def deliver(self, chat_id: str, ids: list, text: str, attempts: int, parse_mode: str = None):
+        """Send one coalesced message and record the outcome in the queue, True when sent"""
+        import httpx
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            response = await self._post(chat_id, text, parse_mode)
+            status = 'ok' if response.status_code == 200 else str(response.status_code)
+        except httpx.HTTPError as e:
+            response = None
+            error = f'{type(e).__name__}: {e}'
+        finally:
+            telegram_send_duration.observe(time.perf_counter() - start, status=status)
+
+        if response is not None:
+            if response.status_code == 200:
+                await asyncio.to_thread(self.queue.ack, ids)
+                telegram_messages.inc(len(ids), status='sent')
+                return True
+            error = f'{response.status_code}: {response.text[:200]}'
+            if response.status_code == 429:
+                delay = retry_after(response, self.backoff)
+                self.bucket.pause(delay)
+                await asyncio.to_thread(self.queue.retry, ids, delay, error)
+                telegram_messages.inc(len(ids), status='throttled')
+                return False
+            if response.status_code < 500 and response.status_code != 408:
+                # Bad request, blocked bot or unknown chat, retrying won't help
+                print(f'Dropping Telegram message to {chat_id}: {error}')
+                await asyncio.to_thread(self.queue.fail, ids, error)
+                telegram_messages.inc(len(ids), status='failed')
+                return False
+
+        await self.retry(chat_id, ids, attempts, error)
+        return False
+
+    async def retry(self, chat_id: str, ids: list, attempts: int, error: str):
+        """Count a failed attempt, backing off exponentially until max_attempts"""
+        if attempts + 1 >= self.max_attempts:
+            print(f'Giving up on Telegram message to {chat_id} after {attempts + 1} attempts: {error}')
+            await asyncio.to_thread(self.queue.fail, ids, error)
+            telegram_messages.inc(len(ids), status='failed')
+        else:
+            await asyncio.to_thread(self.queue.retry, ids, self.backoff * 2 ** attempts, error)
+            telegram_messages.inc(len(ids), status='retried')
+
+    async def drain_chat(self, chat_id: str, rows: list, semaphore: asyncio.Semaphore):
+        """Send a chat's due messages in order, returns seconds until the rest are due or None when done"""
+        # A held back message holds back the chat's later messages too
+        wait = rows[0][4] - time.time()
+        async with semaphore:
+            for ids, text, attempts, parse_mode in coalesce(rows):
+                if wait > 0:
+                    return wait
+                wait = max(self.bucket.ready_in(), self.chat_bucket(chat_id).ready_in())
+                if wait > 1:
+                    return wait  # Leave a slow chat to a later round instead of holding a sender
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.bucket.take()
+                self.chat_bucket(chat_id).take()
+                try:
+                    sent = await self.deliver(chat_id, ids, text, attempts, parse_mode)
+                except Exception as e:
+                    # Count the attempt, so a message that keeps failing is given up on
+                    print(f'Telegram delivery error for {chat_id}: {e}')
+                    await self.retry(chat_id, ids, attempts, f'{type(e).__name__}: {e}')
+                    sent = False
+                if not sent:
+                    return self.backoff
+                wait = 0
+        return None
+
+    async def drain(self, limit: int = 500):
+        """Send every message that is due over a bounded number of chats at once
+
+        Returns seconds until the next message is due, or None when nothing is pending."""
+        rows = await asyncio.to_thread(self.queue.pending, limit)
+        by_chat = {}
+        for row in rows:
+            by_chat.setdefault(row[1], []).append(row)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Every chat finishes its round before the next page is read, so no row is sent twice
+        results = await asyncio.gather(*(self.drain_chat(chat_id, chat_rows, semaphore)
+                                         for chat_id, chat_rows in by_chat.items()), return_exceptions=True)
+        waits = []
+        for chat_id, result in zip(by_chat, results):
+            if isinstance(result, BaseException):
+                print(f'Telegram delivery error for {chat_id}: {result}')
+                result = self.backoff
+            if result is not None:
+                waits.append(result)
+        if len(rows) == limit and len(waits) < len(by_chat):
+            return 0  # Sent some of a full page, more may be waiting behind it
+        return min(waits) if waits else None
+
+    async def run(self):
+        """Drain the queue until cancelled, sleeping until a message is due or queued"""
+        while True:
+            self.wakeup.clear()
+            try:
+                next_due = await self.drain()
+            except Exception as e:
+                print(f'Telegram delivery error: {e}')
+                next_due = self.backoff
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=next_due)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the background sender, also picking up messages left from a previous run"""
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.wakeup = asyncio.Event()
+            self.task = loop.create_task(self.run())
+
+    async def flush(self, timeout: float = 10.0):
+        """Wait until nothing is pending or timeout seconds pass, returns the pending count"""
+        deadline = time.monotonic() + timeout
+        while True:
+            pending = (await asyncio.to_thread(self.queue.counts))['pending']
+            if not pending or time.monotonic() >= deadline:
+                return pending
+            self.wakeup.set()
+            await asyncio.sleep(0.05)
+
+    async def aclose(self):
+        """Stop the sender and its HTTP client; queued messages stay on disk"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+        self.queue.close()
@@ -0,0 +1,25 @@
+# app/services/workers.py
+
+from concurrent.futures import ProcessPoolExecutor
+from my_env import parse_workers
+
+# Process pool for CPU-bound page parsing, created on first use
+_parse_executor = None
+
+
+def get_parse_executor():
+    """Return the shared parsing process pool, or None to parse on the default thread pool"""
+    global _parse_executor
+    if parse_workers <= 0:
+        return None
+    if _parse_executor is None:
+        _parse_executor = ProcessPoolExecutor(max_workers=parse_workers)
+    return _parse_executor
+
+
+def shutdown_executors():
+    """Stop the parsing workers, called on application shutdown"""
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=True, cancel_futures=True)
+        _parse_executor = None
@@ -0,0 +1,60 @@
+# benchmarks/bench_alert_render.py
+#
+# Alert message rendering per template as the snapshot grows: the previous
+# string concatenation, a cold render through the compiled template and a
+# memo hit for the same snapshot, as when one snapshot goes to many chats.
+# Offline, pages are synthesized from the recorded fixture.
+# Run from the repository root: python -m benchmarks.bench_alert_render
+
+import timeit
+from app.services.alert_templates import TEMPLATES, MessageRenderer
+from app.services.fuel_parser import parse_fuel_page
+from benchmarks.suite import SCALES, load_fixture, synthesize_page
+
+REPEAT = 20
+
+
+def concatenate(prices):
+    """The price message as it was built before templates"""
+    grouped_data = {}
+    for provider, fuel_type, price in prices:
+        grouped_data.setdefault(fuel_type, []).append((provider, price))
+    message = "🚗 Fuel Prices for Today:\n\n"
+    for fuel_type, entries in grouped_data.items():
+        message += f"🔹 {fuel_type}:\n"
+        for provider, price in entries:
+            message += f"  - {provider}: {price:.2f} THB\n"
+        message += "\n"
+    return message
+
+
+def best_us(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEAT)) * 1e6
+
+
+def main():
+    sample = load_fixture()
+    print(f"{'scale':>8} {'template':>9} {'concat us':>10} {'cold us':>9} {'memo us':>8} {'chars':>7}")
+    for providers, rows in SCALES:
+        page, class_map = synthesize_page(sample, providers, rows)
+        parsed = parse_fuel_page(page, class_map)
+        prices = [(entry['provider'], entry['type'], entry['price'])
+                  for entries in parsed.values() for entry in entries]
+        assert TEMPLATES['plain'].render_prices(prices) == concatenate(prices)
+
+        concat = best_us(lambda: concatenate(prices))
+        for template in TEMPLATES.values():
+            renderer = MessageRenderer()
+
+            def cold():
+                renderer.clear()
+                return renderer.render(template, 'prices', prices)
+
+            cold_us = best_us(cold)
+            memo_us = best_us(lambda: renderer.render(template, 'prices', prices))
+            print(f"{providers}x{rows:<5} {template.id:>9} {concat:>10.0f} {cold_us:>9.0f} {memo_us:>8.0f} "
+                  f"{len(cold()):>7}")
+
+
+if __name__ == '__main__':
+    main()
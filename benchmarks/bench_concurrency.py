@@ -0,0 +1,115 @@
+# benchmarks/bench_concurrency.py
+#
+# Latency of / and /api/alert/fuel while scrapes are running, comparing the
+# blocking scrape path with the async one. Upstream fetch, database and
+# Telegram latencies are simulated, the parsing is real.
+# Run from the repository root: python -m benchmarks.bench_concurrency
+
+import asyncio
+import contextlib
+import statistics
+import time
+from unittest.mock import patch
+import httpx
+from app.dependencies import get_alert_service, get_fuel_service
+from app.main import app
+
+fuel_service = get_fuel_service()
+alert_service = get_alert_service()
+
+FETCH_LATENCY = 0.3
+DB_LATENCY = 0.05
+SCRAPES = 4
+PROBES = 20
+PROBE_INTERVAL = 0.1
+
+with open('./raw/gasprice.html', 'r', encoding='utf-8') as file:
+    SAMPLE_HTML = file.read()
+
+
+def blocking_fetch():
+    time.sleep(FETCH_LATENCY)
+    return SAMPLE_HTML
+
+
+async def async_fetch():
+    await asyncio.sleep(FETCH_LATENCY)
+    return SAMPLE_HTML
+
+
+def blocking_db(*args, **kwargs):
+    time.sleep(DB_LATENCY)
+
+
+def blocking_prices(*args, **kwargs):
+    time.sleep(DB_LATENCY)
+    return [('ptt', 'ดีเซล B7', 32.94)]
+
+
+async def no_send(message):
+    pass
+
+
+async def blocking_run():
+    """The previous route body: the synchronous scrape inside the event loop"""
+    fuel_service.run()
+
+
+async def blocking_alert():
+    """The previous alert path: database reads inside the event loop"""
+    prices = alert_service.get_fuel_prices()
+    await alert_service.send_to_telegram(alert_service.format_fuel_prices(prices))
+
+
+async def probe(client: httpx.AsyncClient, path: str, latencies: list, start: float):
+    """Issue requests on a fixed schedule, measuring from the scheduled send time"""
+    for i in range(PROBES):
+        scheduled = start + i * PROBE_INTERVAL
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await client.get(path)
+        latencies.append(time.perf_counter() - scheduled)
+
+
+async def measure(blocking: bool):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        root, alert = [], []
+        if blocking:
+            run = patch.object(fuel_service, 'run_async', blocking_run)
+            send = patch.object(alert_service, 'send_fuel_price_alert', blocking_alert)
+        else:
+            run = send = contextlib.nullcontext()
+        with run, send:
+            start = time.perf_counter()
+            scrapes = [client.get('/api/scrape/fuel') for _ in range(SCRAPES)]
+            await asyncio.gather(*scrapes, probe(client, '/', root, start), probe(client, '/api/alert/fuel?full=true', alert, start))
+    return root, alert
+
+
+def describe(latencies: list):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return (f"p50 {statistics.median(ordered) * 1000:>7.1f} ms  p95 {p95 * 1000:>7.1f} ms"
+            f"  max {ordered[-1] * 1000:>7.1f} ms")
+
+
+def main():
+    with patch.object(fuel_service.sources[0], 'fetch', blocking_fetch), \
+         patch.object(fuel_service.sources[0], 'fetch_async', async_fetch), \
+         patch.object(fuel_service.db_manager, 'connect', blocking_db), \
+         patch.object(fuel_service.db_manager, 'close', lambda: None), \
+         patch.object(fuel_service.fuel_repo, 'create_fuel_table', blocking_db), \
+         patch.object(fuel_service.fuel_repo, 'insert_fuel_data', blocking_db), \
+         patch.object(alert_service.db_context, 'connect', lambda: None), \
+         patch.object(alert_service.db_context, 'close', lambda: None), \
+         patch.object(alert_service.fuel_repo, 'get_fuel_prices', blocking_prices), \
+         patch.object(alert_service, 'send_to_telegram', no_send):
+        print(f"{SCRAPES} concurrent scrapes, {FETCH_LATENCY * 1000:.0f} ms fetch, {DB_LATENCY * 1000:.0f} ms per DB call")
+        for name, blocking in (('blocking', True), ('async', False)):
+            root, alert = asyncio.run(measure(blocking))
+            print(f"{name:>9}  /                {describe(root)}")
+            print(f"{name:>9}  /api/alert/fuel  {describe(alert)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_fuel_writes.py
+#
+# Round-trips and wall time per scrape for the per-row writer and the batched
+# writer, against the latency-simulating connection in benchmarks/fake_db.py.
+# Run from the repository root: python -m benchmarks.bench_fuel_writes
+
+import time
+from app.services.fuel_parser import parse_fuel_page
+from app.services.sources import KapookSource
+from benchmarks import fake_db
+from db.db_context import DatabaseContext
+from db.fuel_repo import FuelRepository
+
+
+def load_fuel_data():
+    with open('./raw/gasprice.html', 'r', encoding='utf-8') as file:
+        parsed = parse_fuel_page(file.read(), KapookSource.class_map)
+    return parsed
+
+
+def insert_per_row(db_context: DatabaseContext, parsed: dict):
+    """The previous writer: one existence check per provider, one committed INSERT per row"""
+    for provider, fuel_data in parsed.items():
+        db_context.fetchone('SELECT 1 FROM fuel_prices WHERE date = %s AND provider = %s LIMIT 1',
+                            ('2024-01-01', provider))
+        for entry in fuel_data:
+            db_context.execute('INSERT INTO fuel_prices (date, provider, type, price) VALUES (%s, %s, %s, %s)',
+                               ('2024-01-01', entry['provider'], entry['type'], entry['price']))
+
+
+def insert_batched(db_context: DatabaseContext, parsed: dict):
+    all_fuel_data = [entry for fuel_data in parsed.values() for entry in fuel_data]
+    FuelRepository(db_context).insert_fuel_data(all_fuel_data)
+
+
+def measure(writer, parsed: dict):
+    db_context = DatabaseContext()
+    connection = fake_db.attach(db_context)
+    start = time.perf_counter()
+    writer(db_context, parsed)
+    elapsed = time.perf_counter() - start
+    return connection.round_trips, connection.commits, elapsed
+
+
+def main():
+    parsed = load_fuel_data()
+    rows = sum(len(fuel_data) for fuel_data in parsed.values())
+    print(f"{len(parsed)} providers, {rows} rows per scrape")
+    print(f"{'writer':>10} {'round-trips':>12} {'commits':>8} {'wall ms':>9}")
+    for name, writer in (('per-row', insert_per_row), ('batched', insert_batched)):
+        round_trips, commits, elapsed = measure(writer, parsed)
+        print(f"{name:>10} {round_trips:>12} {commits:>8} {elapsed * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_history.py
+#
+# Seed a scratch schema with several years of daily prices and time the
+# history queries as the table grows. Needs the Postgres configured in .env.
+# Run from the repository root: python -m benchmarks.bench_history
+
+import time
+from datetime import date, timedelta
+from db.db_context import DatabaseContext
+from db.fuel_repo import FuelRepository
+from db.history_repo import HistoryRepository
+
+SCHEMA = 'bench_history'
+PROVIDERS = 10
+FUEL_TYPES = 12
+YEARS = (1, 3, 10)
+REPEAT = 5
+
+
+def seed(db_context: DatabaseContext, end: date, years: int):
+    """Fill fuel_prices with every provider and type for each day of the range"""
+    start = end - timedelta(days=365 * years)
+    db_context.execute(f'''
+    TRUNCATE fuel_prices;
+    INSERT INTO fuel_prices (date, provider, type, price)
+    SELECT day::date, 'provider' || p, 'type' || t, 30 + (p + t + EXTRACT(DOY FROM day)) %% 10
+    FROM generate_series(%s::date, %s::date, interval '1 day') AS day,
+         generate_series(1, {PROVIDERS}) AS p,
+         generate_series(1, {FUEL_TYPES}) AS t;
+    ANALYZE fuel_prices;
+    ''', (start, end))
+
+
+def timed(query, *args):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        query(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    db_context = DatabaseContext()
+    db_context.connect()
+    try:
+        db_context.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA}; SET search_path TO {SCHEMA};')
+        FuelRepository(db_context, partitioned=False).create_fuel_table()
+        history_repo = HistoryRepository(db_context)
+        fuel_repo = FuelRepository(db_context)
+
+        end = date.today()
+        month_ago = end - timedelta(days=30)
+        print(f"{'years':>5} {'rows':>9} {'today ms':>9} {'series ms':>10} {'deltas ms':>10} {'stats ms':>9}")
+        for years in YEARS:
+            seed(db_context, end, years)
+            rows = db_context.fetchone('SELECT COUNT(*) FROM fuel_prices')[0]
+            print(f"{years:>5} {rows:>9}"
+                  f" {timed(fuel_repo.get_fuel_prices, ('type1', 'type2'), end):>9.2f}"
+                  f" {timed(history_repo.get_price_series, month_ago, end, 'provider1', 'type1'):>10.2f}"
+                  f" {timed(history_repo.get_daily_deltas, month_ago, end, 'provider1', None):>10.2f}"
+                  f" {timed(history_repo.get_price_stats, month_ago, end, None):>9.2f}")
+    finally:
+        db_context.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;')
+        db_context.close()
+
+
+if __name__ == '__main__':
+    main()
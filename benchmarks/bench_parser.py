@@ -0,0 +1,62 @@
+# benchmarks/bench_parser.py
+#
+# Compare one BeautifulSoup tree per provider with the single-pass backends.
+# Run from the repository root: python -m benchmarks.bench_parser
+
+import re
+import timeit
+from bs4 import BeautifulSoup
+from app.services.fuel_parser import PARSER_BACKENDS, lxml_available, parse_fuel_page
+
+SAMPLE_HTML = './raw/gasprice.html'
+PROVIDER_COUNTS = (1, 7, 14, 28, 56)
+REPEAT = 5
+
+
+def load_sample():
+    with open(SAMPLE_HTML, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def synthesize_page(html_content: str, providers: int):
+    """Build a page with the given number of provider articles by cloning the ptt block"""
+    article = re.search(r'<article class="gasprice ptt">.*?</article>', html_content, re.S).group(0)
+    articles = [article.replace('gasprice ptt', f'gasprice p{i}') for i in range(providers)]
+    page = html_content.replace(article, '\n'.join(articles), 1)
+    class_map = {f'p{i}': f'gasprice p{i}' for i in range(providers)}
+    return page, class_map
+
+
+def parse_per_provider(html_content: str, class_map: dict):
+    """The previous approach: a fresh BeautifulSoup tree for every provider"""
+    results = {}
+    for provider, class_name in class_map.items():
+        soup = BeautifulSoup(html_content, 'html.parser')
+        article = soup.find('article', class_=class_name)
+        results[provider] = [{
+            'provider': provider,
+            'type': li.find('span').text.strip(),
+            'price': float(li.find('em').text.strip())
+        } for li in article.find_all('li')]
+    return results
+
+
+def main():
+    sample = load_sample()
+    backends = [name for name in PARSER_BACKENDS if name != 'lxml' or lxml_available()]
+    print(f"{'providers':>9} {'per-provider':>13}" + ''.join(f" {name:>11}" for name in backends) + "   (ms)")
+    for providers in PROVIDER_COUNTS:
+        page, class_map = synthesize_page(sample, providers)
+        expected = parse_per_provider(page, class_map)
+        before = min(timeit.repeat(lambda: parse_per_provider(page, class_map), number=1, repeat=REPEAT))
+
+        row = f"{providers:>9} {before * 1000:>13.2f}"
+        for name in backends:
+            assert parse_fuel_page(page, class_map, name) == expected
+            after = min(timeit.repeat(lambda: parse_fuel_page(page, class_map, name), number=1, repeat=REPEAT))
+            row += f" {after * 1000:>11.2f}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_price_store.py
+#
+# Memory footprint and aggregation time of the columnar price store against
+# the list of (provider, type, date, Decimal) tuples psycopg2 returns, for
+# several years of synthetic daily prices.
+# Run from the repository root: python -m benchmarks.bench_price_store
+
+import datetime
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+from decimal import Decimal
+from app.services.price_store import ColumnarPriceStore
+
+PROVIDERS = ('ptt', 'bcp', 'shell', 'esso', 'caltex', 'pt', 'susco')
+TYPES = tuple(f'type {i}' for i in range(10))
+YEARS = (1, 5, 10)
+
+
+def make_rows(years: int):
+    """Rows shaped like a fetchall over fuel_prices, each value its own object as psycopg2 builds them"""
+    random.seed(years)
+    start = datetime.date(2024, 1, 1)
+    rows = []
+    for provider in PROVIDERS:
+        for fuel_type in TYPES:
+            price = random.randint(2500, 4500)
+            for day in range(365 * years):
+                price += random.choice((-30, 0, 0, 0, 30))
+                rows.append((''.join(provider), ''.join(fuel_type), start + datetime.timedelta(days=day),
+                             Decimal(price).scaleb(-2)))
+    return rows
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def tuple_stats(rows, start, end):
+    """The same aggregation over tuples, grouped through a defaultdict like format_fuel_prices"""
+    grouped = defaultdict(list)
+    for provider, fuel_type, day, price in rows:
+        if start <= day <= end:
+            grouped[(provider, fuel_type)].append(price)
+    return [(provider, fuel_type, min(prices), max(prices), round(sum(prices) / len(prices), 2), len(prices))
+            for (provider, fuel_type), prices in sorted(grouped.items())]
+
+
+def main():
+    print(f"{'years':>5} {'rows':>8} {'tuples MB':>10} {'store MB':>9} {'ratio':>6} "
+          f"{'tuple stats ms':>15} {'store stats ms':>15}")
+    for years in YEARS:
+        rows, tuples_size = measure(lambda: make_rows(years))
+        store, store_size = measure(lambda: ColumnarPriceStore())
+        _, load_size = measure(lambda: store.ensure_loaded(lambda: iter(rows)))
+        store_size += load_size
+
+        end = rows[-1][2]
+        start = end - datetime.timedelta(days=365)
+        began = time.perf_counter()
+        expected = tuple_stats(rows, start, end)
+        tuple_ms = (time.perf_counter() - began) * 1000
+        began = time.perf_counter()
+        stats = store.stats(start, end)
+        store_ms = (time.perf_counter() - began) * 1000
+        assert [row[:4] + row[5:] for row in stats] == [row[:4] + row[5:] for row in expected]
+
+        print(f"{years:>5} {len(rows):>8} {tuples_size / 2**20:>10.1f} {store_size / 2**20:>9.2f} "
+              f"{tuples_size / store_size:>5.0f}x {tuple_ms:>15.1f} {store_ms:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
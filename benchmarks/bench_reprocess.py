@@ -0,0 +1,58 @@
+# benchmarks/bench_reprocess.py
+#
+# Re-parsing throughput of the Reprocessor as worker processes are added,
+# over pages synthesized from the recorded fixture and shipped gzipped like
+# the snapshot archive does. Also compares the pickled size of one page's
+# result as records and as the tuples the workers send back.
+# Run from the repository root: python -m benchmarks.bench_reprocess
+
+import functools
+import gzip
+import os
+import pickle
+import time
+from app.services.fuel_parser import extract_fuel_tuples, parse_fuel_page
+from app.services.reprocessor import Reprocessor
+from benchmarks.suite import load_fixture, synthesize_page
+
+PAGES = 96
+PROVIDERS = 28
+ROWS = 20
+CHUNK_SIZE = 8
+
+
+def worker_counts():
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    if counts[-1] != os.cpu_count():
+        counts.append(os.cpu_count())
+    return [0] + counts
+
+
+def main():
+    page, class_map = synthesize_page(load_fixture(), PROVIDERS, ROWS)
+    payload = gzip.compress(page.encode('utf-8'))
+    pages = [(f'page {i}', 'synthetic', payload) for i in range(PAGES)]
+    extractors = {'synthetic': functools.partial(extract_fuel_tuples, class_map=class_map)}
+
+    records = len(pickle.dumps(parse_fuel_page(page, class_map)))
+    tuples = len(pickle.dumps(extract_fuel_tuples(page, class_map)))
+    print(f"{PAGES} pages of {PROVIDERS}x{ROWS} rows, {len(payload)} bytes gzipped, {os.cpu_count()} cores")
+    print(f"result per page: {records} bytes as records, {tuples} bytes as tuples")
+    print(f"{'workers':>8} {'seconds':>8} {'pages/s':>8} {'speedup':>8}")
+
+    inline = None
+    for workers in worker_counts():
+        reprocessor = Reprocessor(workers=workers, chunk_size=CHUNK_SIZE)
+        start = time.perf_counter()
+        for _ in reprocessor.run(pages, extractors):
+            pass
+        elapsed = time.perf_counter() - start
+        inline = inline or elapsed
+        label = 'inline' if workers == 0 else str(workers)
+        print(f"{label:>8} {elapsed:>8.2f} {PAGES / elapsed:>8.1f} {inline / elapsed:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
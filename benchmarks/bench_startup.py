@@ -0,0 +1,68 @@
+# benchmarks/bench_startup.py
+#
+# Cold-start cost of the API: the time to import app.main and the time from
+# spawning the process to the first response of /, startup lifespan included.
+# Each run is a fresh interpreter so nothing is cached in sys.modules.
+# Run from the repository root: python -m benchmarks.bench_startup
+
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 5
+
+IMPORT_SCRIPT = '''
+import time
+start = time.perf_counter()
+import app.main
+print('elapsed', time.perf_counter() - start)
+'''
+
+# Prints the wall-clock time of the first response, the parent subtracts its spawn time
+FIRST_RESPONSE_SCRIPT = '''
+import asyncio
+import time
+import httpx
+from app.main import app
+
+async def first_response():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            response = await client.get('/')
+            print('elapsed', time.time())
+            assert response.status_code == 200
+
+asyncio.run(first_response())
+'''
+
+
+def run_script(script: str):
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    # The app may log to stdout too, e.g. when no database is reachable
+    [elapsed] = [line.split()[1] for line in result.stdout.splitlines() if line.startswith('elapsed ')]
+    return float(elapsed)
+
+
+def import_ms():
+    return round(run_script(IMPORT_SCRIPT) * 1000, 3)
+
+
+def first_response_ms():
+    spawned = time.time()
+    return round((run_script(FIRST_RESPONSE_SCRIPT) - spawned) * 1000, 3)
+
+
+def median_ms(measure, runs: int = RUNS):
+    return statistics.median(measure() for _ in range(runs))
+
+
+def main():
+    print(f"{'stage':>16} {'median ms':>10}")
+    print(f"{'import':>16} {median_ms(import_ms):>10.1f}")
+    print(f"{'first response':>16} {median_ms(first_response_ms):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_streaming.py
+#
+# Peak Python memory and wall time of reading a whole price series with
+# fetchall versus streaming it through a server-side cursor, as the table
+# grows. Seeds a scratch schema. Needs the Postgres configured in .env.
+# Run from the repository root: python -m benchmarks.bench_streaming
+
+import time
+import tracemalloc
+from datetime import date, timedelta
+from benchmarks.bench_history import seed
+from db.db_context import DatabaseContext
+from db.fuel_repo import FuelRepository
+from db.history_repo import HistoryRepository
+from my_env import db_params
+
+SCHEMA = 'bench_streaming'
+YEARS = (1, 3, 10)
+
+
+def measure(read):
+    """(peak MiB, seconds) of consuming every row read() returns"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = 0
+    for _ in read():
+        count += 1
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, peak / 2 ** 20, elapsed
+
+
+def main():
+    db_context = DatabaseContext()
+    # Streams open their own connections, point those at the scratch schema too
+    db_context.db_params = {**db_params, 'options': f'-c search_path={SCHEMA}'}
+    db_context.connect()
+    try:
+        db_context.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA};')
+        FuelRepository(db_context, partitioned=False).create_fuel_table()
+        history_repo = HistoryRepository(db_context)
+
+        end = date.today()
+        print(f"{'years':>5} {'rows':>9} {'fetchall MiB':>12} {'fetchall s':>10} {'stream MiB':>10} {'stream s':>8}")
+        for years in YEARS:
+            seed(db_context, end, years)
+            start = end - timedelta(days=365 * years)
+            count, fetch_mib, fetch_s = measure(lambda: history_repo.get_price_series(start, end))
+            _, stream_mib, stream_s = measure(lambda: history_repo.iter_price_series(start, end))
+            print(f"{years:>5} {count:>9} {fetch_mib:>12.1f} {fetch_s:>10.2f} {stream_mib:>10.1f} {stream_s:>8.2f}")
+    finally:
+        db_context.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;')
+        db_context.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/bench_workers.py
+#
+# Load test of several workers scraping at once against one Postgres. Each
+# worker is a separate process replaying the same synthetic page (providers
+# named bench*) through FuelDataService.run, released together by a barrier.
+# Checks that no price is stored twice, that exactly one worker wrote each
+# provider, that the other workers were notified and that exactly one worker
+# won the scheduler leader election.
+#
+# Needs the database from .env; the bench* rows are deleted before and after.
+# Run from the repository root: python -m benchmarks.bench_workers --workers 8
+
+import argparse
+import multiprocessing
+import select
+import time
+from datetime import datetime
+import psycopg2
+from benchmarks.suite import load_fixture, synthesize_page
+from my_env import coordination_config, db_params
+
+PROVIDERS = 28
+ROWS = 20
+
+
+def worker(barrier, results, page: str, class_map: dict):
+    from app.services.coordination import LeaderElection
+    from app.services.fuel_service import FuelDataService
+    from app.services.sources import KapookSource
+
+    service = FuelDataService()
+    source = KapookSource()
+    source.class_map = class_map
+    source.fetch = lambda: page
+    source.mark_stored = lambda date: None  # Keep the fetch cache of the real page untouched
+    service.sources = [source]
+    leader = LeaderElection()
+
+    barrier.wait()
+    start = time.perf_counter()
+    rows = service.run()
+    elapsed = time.perf_counter() - start
+    results.put({'rows': len(rows), 'counts': service.last_report.counts(), 'seconds': elapsed,
+                 'leader': leader.is_leader()})
+    barrier.wait()  # Hold the leader session until every worker has asked
+    leader.release()
+
+
+def cleanup(service):
+    """Delete the bench* rows and rebuild today's summary from the real ones"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    service.db_manager.connect()
+    try:
+        service.db_manager.execute("DELETE FROM fuel_prices WHERE provider LIKE %s;", ('bench%',))
+        service.db_manager.execute("DELETE FROM fuel_scrape_checkpoints WHERE provider LIKE %s;", ('bench%',))
+        service.db_manager.execute('''
+        DELETE FROM fuel_daily_summary summary WHERE date = %s AND NOT EXISTS (
+            SELECT 1 FROM fuel_prices WHERE date = summary.date AND type = summary.type);
+        ''', (today,))
+        service.summary_repo.refresh_summary(today, today)
+    finally:
+        service.db_manager.close()
+
+
+def duplicates():
+    conn = psycopg2.connect(**db_params)
+    with conn, conn.cursor() as cursor:
+        cursor.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM fuel_prices WHERE provider LIKE %s
+            GROUP BY date, provider, type HAVING COUNT(*) > 1
+        ) duplicated;
+        ''', ('bench%',))
+        count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+
+def listen():
+    conn = psycopg2.connect(**db_params)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f'LISTEN "{coordination_config["channel"]}";')
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    page, class_map = synthesize_page(load_fixture(), PROVIDERS, ROWS)
+    class_map = {f'bench{provider}': css_class for provider, css_class in class_map.items()}
+
+    # Create the tables first, so no worker races on CREATE TABLE
+    from app.services.fuel_service import FuelDataService
+    service = FuelDataService()
+    service.db_manager.connect()
+    try:
+        service.fuel_repo.create_fuel_table()
+        service.summary_repo.create_summary_table()
+        service.checkpoint_repo.create_checkpoint_table()
+    finally:
+        service.db_manager.close()
+    cleanup(service)
+
+    listener = listen()
+    barrier = multiprocessing.Barrier(args.workers)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(barrier, results, page, class_map))
+                 for _ in range(args.workers)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - start
+
+    select.select([listener], [], [], 1.0)  # Notifications are sent on commit, give the last one a moment
+    listener.poll()
+    notifications = len(listener.notifies)
+    listener.close()
+    duplicated = duplicates()
+    cleanup(service)
+
+    written = sum(report['counts']['done'] for report in reports)
+    skipped = sum(report['counts']['skipped'] for report in reports)
+    leaders = sum(report['leader'] for report in reports)
+    print(f"{args.workers} workers, {PROVIDERS} providers x {ROWS} rows, {wall:.2f} s wall")
+    seconds = ', '.join(f"{report['seconds']:.2f}" for report in reports)
+    print(f"  per-worker run s: {seconds}")
+    print(f"  providers written {written}, skipped {skipped}, duplicated prices {duplicated}")
+    print(f"  notifications {notifications}, leaders {leaders}")
+
+    assert duplicated == 0, 'a price was stored twice'
+    assert written == PROVIDERS, 'every provider is written by exactly one worker'
+    assert skipped == PROVIDERS * (args.workers - 1)
+    assert notifications == sum(1 for report in reports if report['rows']), 'one notification per writing worker'
+    assert leaders == 1, 'exactly one scheduler leader'
+
+
+if __name__ == '__main__':
+    main()
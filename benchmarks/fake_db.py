@@ -0,0 +1,66 @@
+# benchmarks/fake_db.py
+#
+# A latency-simulating stand-in for a psycopg2 connection. Every statement
+# costs one network round-trip and every commit one fsync, so benchmarks can
+# compare write strategies without a running Postgres.
+
+import time
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._rows = []
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        self.connection.round_trips += 1
+        time.sleep(self.connection.rtt)
+        if isinstance(query, bytes):
+            query = query.decode('utf-8')
+        # Emulate RETURNING for multi-row inserts
+        self._rows = [(i,) for i in range(query.count('),') + 1)] if 'RETURNING' in query else []
+        self.rowcount = len(self._rows)
+
+    def mogrify(self, template, args=None):
+        return repr(args).encode('utf-8')
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    encoding = 'UTF8'
+
+    def __init__(self, rtt: float = 0.0005, fsync: float = 0.002):
+        self.rtt = rtt
+        self.fsync = fsync
+        self.round_trips = 0
+        self.commits = 0
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.round_trips += 1
+        time.sleep(self.rtt + self.fsync)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def attach(db_context, rtt: float = 0.0005, fsync: float = 0.002):
+    """Point a DatabaseContext at a fresh fake connection"""
+    db_context.conn = FakeConnection(rtt, fsync)
+    db_context.cursor = db_context.conn.cursor()
+    return db_context.conn
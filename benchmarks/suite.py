@@ -0,0 +1,158 @@
+# benchmarks/suite.py
+#
+# Offline benchmark suite with a regression gate. Pages with N providers and
+# M fuel rows are synthesized from the recorded fixture and replayed through
+# parsing, an end-to-end scrape against the latency-simulating connection in
+# benchmarks/fake_db.py, and alert formatting, plus the cold start of the API. Results are written as JSON.
+#
+# Run from the repository root:
+#   python -m benchmarks.suite                    # measure, write results/latest.json
+#   python -m benchmarks.suite --save-baseline    # measure and store the baseline
+#   python -m benchmarks.suite --check --threshold 20
+#       exit 1 when a stage is more than 20% slower than the baseline
+
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import timeit
+from datetime import datetime
+from app.services.alert_service import AlertService
+from app.services.fuel_parser import parse_fuel_page
+from app.services.fuel_service import FuelDataService
+from app.services.sources import KapookSource
+from benchmarks import bench_startup, fake_db
+
+FIXTURE = './raw/gasprice.html'
+RESULTS_DIR = './benchmarks/results'
+SCALES = ((7, 10), (28, 20), (112, 40))  # (providers, fuel rows per provider)
+REPEAT = 5
+
+
+def load_fixture(path: str = FIXTURE):
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def synthesize_page(html_content: str, providers: int, rows: int):
+    """Clone the ptt article into N providers of M rows each"""
+    article = re.search(r'<article class="gasprice ptt">.*?</article>', html_content, re.S).group(0)
+    item = re.search(r'<li>.*?</li>', article, re.S).group(0)
+    items = '\n'.join(re.sub(r'<span>.*?</span>', f'<span>type {j}</span>', item, count=1) for j in range(rows))
+    template = re.sub(r'<li>.*</li>', lambda _: items, article, count=1, flags=re.S)
+
+    articles = [template.replace('gasprice ptt', f'gasprice p{i}') for i in range(providers)]
+    page = html_content.replace(article, '\n'.join(articles), 1)
+    class_map = {f'p{i}': f'gasprice p{i}' for i in range(providers)}
+    return page, class_map
+
+
+def best_ms(func):
+    return round(min(timeit.repeat(func, number=1, repeat=REPEAT)) * 1000, 3)
+
+
+def bench_parse(page: str, class_map: dict):
+    return best_ms(lambda: parse_fuel_page(page, class_map))
+
+
+def bench_scrape(page: str, class_map: dict):
+    """fetch -> parse -> batched insert through FuelDataService.run with the page replayed from memory"""
+    service = FuelDataService()
+    source = KapookSource()
+    source.class_map = class_map
+    source.fetch = lambda: page
+    service.sources = [source]
+    service.db_manager.connect = lambda: fake_db.attach(service.db_manager)
+    return best_ms(service.run)
+
+
+def bench_alert(parsed: dict):
+    """Format the full price message and the change message for the parsed rows, cold every time"""
+    service = AlertService()
+    prices = [(entry['provider'], entry['type'], entry['price']) for entries in parsed.values() for entry in entries]
+    changes = [(provider, fuel_type, price, price - 0.3) for provider, fuel_type, price in prices]
+
+    def format_messages():
+        service.renderer.clear()  # Measure rendering, not memo hits
+        service.format_fuel_prices(prices)
+        service.format_price_changes(service.filter_price_changes(changes))
+
+    return best_ms(format_messages)
+
+
+def run_suite(fixture: str):
+    sample = load_fixture(fixture)
+    results = {}
+    for providers, rows in SCALES:
+        page, class_map = synthesize_page(sample, providers, rows)
+        parsed = parse_fuel_page(page, class_map)
+        assert sum(len(entries) for entries in parsed.values()) == providers * rows
+
+        scale = f'{providers}x{rows}'
+        results[f'parse/{scale}'] = bench_parse(page, class_map)
+        results[f'scrape/{scale}'] = bench_scrape(page, class_map)
+        results[f'alert/{scale}'] = bench_alert(parsed)
+    results['startup/import'] = bench_startup.median_ms(bench_startup.import_ms)
+    results['startup/first_response'] = bench_startup.median_ms(bench_startup.first_response_ms)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """Stages slower than the baseline by more than threshold percent"""
+    regressions = []
+    for stage, baseline_ms in baseline.items():
+        current_ms = results.get(stage)
+        if current_ms is None or baseline_ms <= 0:
+            continue
+        change = (current_ms - baseline_ms) / baseline_ms * 100
+        if change > threshold:
+            regressions.append((stage, baseline_ms, current_ms, change))
+    return regressions
+
+
+def write_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fixture', default=FIXTURE)
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'latest.json'))
+    parser.add_argument('--baseline', default=os.path.join(RESULTS_DIR, 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--threshold', type=float, default=20.0, help='allowed slowdown in percent')
+    args = parser.parse_args()
+
+    results = run_suite(args.fixture)
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results_ms': results,
+    }
+    write_json(args.output, report)
+    if args.save_baseline:
+        write_json(args.baseline, report)
+
+    print(f"{'stage':>22} {'ms':>10}")
+    for stage, elapsed in results.items():
+        print(f"{stage:>22} {elapsed:>10.3f}")
+
+    if args.check:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)['results_ms']
+        regressions = compare(results, baseline, args.threshold)
+        for stage, baseline_ms, current_ms, change in regressions:
+            print(f"REGRESSION {stage}: {baseline_ms:.3f} ms -> {current_ms:.3f} ms (+{change:.1f}%)")
+        if regressions:
+            sys.exit(1)
+        print(f"No stage slower than {args.threshold:.0f}% over the baseline.")
+
+
+if __name__ == '__main__':
+    main()
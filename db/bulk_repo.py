@@ -0,0 +1,112 @@
+import csv
+import io
+from db.db_context import DatabaseContext
+from db.fuel_repo import FuelRepository
+from db.summary_repo import SummaryRepository
+from my_env import fuel_prices_partitioned
+
+
+class RowStream:
+    """File-like CSV view over an iterator of rows, read lazily by COPY FROM STDIN"""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.pending = ''
+        self.count = 0  # Rows handed to COPY so far
+
+    def read(self, size: int = -1):
+        out = io.StringIO()
+        out.write(self.pending)
+        writer = csv.writer(out, lineterminator='\n')
+        while size < 0 or out.tell() < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            writer.writerow(row)
+            self.count += 1
+        data = out.getvalue()
+        if size < 0:
+            self.pending = ''
+            return data
+        self.pending = data[size:]
+        return data[:size]
+
+
+class BulkRepository:
+    def __init__(self, db_manager: DatabaseContext, partitioned: bool = fuel_prices_partitioned):
+        """Initialize with a reference to the generic Repsitory"""
+        self.db_manager = db_manager
+        self.fuel_repo = FuelRepository(db_manager, partitioned)
+        self.summary_repo = SummaryRepository(db_manager)
+
+    def prepare_import(self):
+        """Create the fuel tables and an empty session-local staging table"""
+        self.fuel_repo.create_fuel_table()
+        self.summary_repo.create_summary_table()
+        self.db_manager.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS fuel_prices_import (
+            date DATE NOT NULL,
+            provider VARCHAR(50),
+            type VARCHAR(50),
+            price NUMERIC(10, 2)
+        );
+        TRUNCATE fuel_prices_import;
+        ''')
+
+    def copy_prices(self, rows, replace: bool = False):
+        """COPY (date, provider, type, price) rows into fuel_prices, skipping existing days.
+
+        Rows are streamed from the iterator, so memory stays constant whatever the size.
+        With replace, the stored rows of every copied date and provider are rebuilt instead.
+        Staging, merge and summary refresh are one transaction, so a failure leaves neither
+        merged rows with a stale summary nor rows in staging.
+        Returns the number of rows read and the number inserted."""
+        with self.db_manager.transaction():
+            self.prepare_import()
+            stream = RowStream(rows)
+            self.db_manager.copy_expert(
+                'COPY fuel_prices_import (date, provider, type, price) FROM STDIN WITH (FORMAT csv)', stream)
+
+            if self.fuel_repo.partitioned:
+                months = self.db_manager.fetchall(
+                    "SELECT DISTINCT date_trunc('month', date)::date FROM fuel_prices_import;")
+                for (month,) in months:
+                    self.fuel_repo.ensure_partition(month.strftime('%Y-%m-%d'))
+
+            delete_query = '''
+            DELETE FROM fuel_prices
+            USING (SELECT DISTINCT date, provider FROM fuel_prices_import) rebuilt
+            WHERE fuel_prices.date = rebuilt.date AND fuel_prices.provider = rebuilt.provider;
+            ''' if replace else ''
+            # The dimension tables are kept in sync in the same statement
+            inserted = self.db_manager.execute(delete_query + '''
+            WITH new_providers AS (
+                INSERT INTO fuel_providers (name)
+                SELECT DISTINCT provider FROM fuel_prices_import
+                ON CONFLICT (name) DO NOTHING
+            ), new_types AS (
+                INSERT INTO fuel_types (name)
+                SELECT DISTINCT type FROM fuel_prices_import
+                ON CONFLICT (name) DO NOTHING
+            )
+            INSERT INTO fuel_prices (date, provider, type, price)
+            SELECT date, provider, type, price FROM fuel_prices_import
+            ON CONFLICT (date, provider, type) DO NOTHING;
+            ''')
+            first_date, last_date = self.db_manager.fetchone('SELECT MIN(date), MAX(date) FROM fuel_prices_import;')
+            if inserted and first_date is not None:
+                self.summary_repo.refresh_summary(first_date, last_date)
+            self.db_manager.execute('TRUNCATE fuel_prices_import;')
+            return stream.count, inserted
+
+    def copy_prices_to(self, file, start_date, end_date):
+        """COPY the prices between two dates to a file-like object as CSV with a header"""
+        query = self.db_manager.mogrify('''
+        COPY (
+            SELECT date, provider, type, price
+            FROM fuel_prices
+            WHERE date BETWEEN %s AND %s
+            ORDER BY date, provider, type
+        ) TO STDOUT WITH (FORMAT csv, HEADER)
+        ''', (start_date, end_date))
+        self.db_manager.copy_expert(query, file)
@@ -0,0 +1,50 @@
+from db.db_context import DatabaseContext
+
+
+class CheckpointRepository:
+    def __init__(self, db_manager: DatabaseContext):
+        """Initialize with a reference to the generic Repsitory"""
+        self.db_manager = db_manager
+
+    def create_checkpoint_table(self):
+        """Create the per-provider scrape state table if it doesn't exist"""
+        self.db_manager.execute('''
+        CREATE TABLE IF NOT EXISTS fuel_scrape_checkpoints (
+            date DATE NOT NULL,
+            source VARCHAR(50) NOT NULL,
+            provider VARCHAR(50) NOT NULL,
+            status VARCHAR(16) NOT NULL,
+            rows INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (date, source, provider)
+        );
+        ''')
+
+    def save_checkpoints(self, date: str, checkpoints: list):
+        """Record (source, provider, status, rows, error) for a day in one statement
+
+        A provider already done for the day stays done."""
+        if not checkpoints:
+            return
+        query = '''
+        INSERT INTO fuel_scrape_checkpoints (date, source, provider, status, rows, error)
+        VALUES %s
+        ON CONFLICT (date, source, provider) DO UPDATE SET
+            status = EXCLUDED.status,
+            rows = EXCLUDED.rows,
+            error = EXCLUDED.error,
+            updated_at = NOW()
+        WHERE fuel_scrape_checkpoints.status <> 'done';
+        '''
+        self.db_manager.execute_values(query, [(date, *checkpoint) for checkpoint in checkpoints])
+
+    def get_checkpoints(self, date: str):
+        """(source, provider, status, rows, error, updated_at) of every provider tried on a day"""
+        query = """
+        SELECT source, provider, status, rows, error, updated_at
+        FROM fuel_scrape_checkpoints
+        WHERE date = %s
+        ORDER BY source, provider;
+        """
+        return self.db_manager.fetchall(query, (date,))
@@ -0,0 +1,41 @@
+import hashlib
+import json
+from contextlib import contextmanager
+import psycopg2
+from db.db_context import DatabaseContext
+
+
+def lock_key(name: str):
+    """Stable signed 64-bit advisory lock key for a lock name, the same in every worker"""
+    return int.from_bytes(hashlib.sha1(name.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+
+class CoordinationRepository:
+    """Advisory locks and notifications shared by every worker on one database"""
+
+    def __init__(self, db_manager: DatabaseContext):
+        """Initialize with a reference to the generic Repsitory"""
+        self.db_manager = db_manager
+
+    @contextmanager
+    def hold(self, name: str):
+        """Hold a session-level advisory lock, waiting for any other worker holding it
+
+        Session-level rather than transaction-level so commits inside the block keep it held,
+        writes in the block must commit themselves as an open transaction is rolled back on exit."""
+        key = lock_key(name)
+        self.db_manager.fetchone('SELECT pg_advisory_lock(%s);', (key,))
+        try:
+            yield
+        finally:
+            try:
+                self.db_manager.conn.rollback()  # Unlocking fails in an aborted transaction
+                self.db_manager.fetchone('SELECT pg_advisory_unlock(%s);', (key,))
+                self.db_manager.conn.commit()
+            except psycopg2.Error as e:
+                # The lock went with the session when the connection broke
+                print(f"Error releasing advisory lock {name}: {e}")
+
+    def notify(self, channel: str, payload: dict):
+        """Notify listeners on a channel, delivered once the statement commits"""
+        self.db_manager.execute('SELECT pg_notify(%s, %s);', (channel, json.dumps(payload)))
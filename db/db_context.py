@@ -1,44 +1,165 @@
+import itertools
+import threading
+from contextlib import closing, contextmanager
 import psycopg2
-from my_env import db_params
+import psycopg2.extras
+from db.db_pool import get_pool
+from metrics import db_query_duration
+from my_env import db_params, db_stream_itersize
+
+# Server-side cursor names, unique within the process
+_cursor_names = itertools.count()
 
 class DatabaseContext:
     def __init__(self):
         self.db_params = db_params
-        self.conn = None
-        self.cursor = None
-    
+        # Connection state is per thread so a shared context is safe to use from worker threads
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        return getattr(self._local, 'conn', None)
+
+    @conn.setter
+    def conn(self, value):
+        self._local.conn = value
+
+    @property
+    def cursor(self):
+        return getattr(self._local, 'cursor', None)
+
+    @cursor.setter
+    def cursor(self, value):
+        self._local.cursor = value
+
+    @property
+    def pool(self):
+        return getattr(self._local, 'pool', None)
+
+    @pool.setter
+    def pool(self, value):
+        self._local.pool = value
+
+    @property
+    def in_transaction(self):
+        return getattr(self._local, 'in_transaction', False)
+
+    @in_transaction.setter
+    def in_transaction(self, value):
+        self._local.in_transaction = value
+
     def connect(self):
-        """Establish connection to the PostgreSQL database"""
+        """Check out a connection from the shared pool, or open one directly without a pool"""
+        if self.conn is not None:
+            self.close()  # Never leak a previously held connection
         try:
-            self.conn = psycopg2.connect(**self.db_params)
+            self.pool = get_pool()
+            if self.pool is not None:
+                self.conn = self.pool.getconn()
+            else:
+                self.conn = psycopg2.connect(**self.db_params)
             self.cursor = self.conn.cursor()
         except psycopg2.DatabaseError as e:
             print(f"Error connecting to the database: {e}")
             raise
 
     def close(self):
-        """Close the database connection"""
+        """Return the connection to the pool, or close it when it was opened directly"""
         if self.cursor:
             self.cursor.close()
         if self.conn:
-            self.conn.close()
+            if self.pool is not None:
+                self.pool.putconn(self.conn)
+            else:
+                self.conn.close()
+        self.conn = None
+        self.cursor = None
+        self.pool = None
 
-    def execute(self, query: str, params=None):
-        """Execute a query on the database"""
+    def _commit(self):
+        if not self.in_transaction:
+            self.conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Run the block as one transaction: statements inside commit together when it ends, or not at all"""
+        if self.in_transaction:
+            yield  # Part of the enclosing transaction
+            return
+        self.in_transaction = True
         try:
-            self.cursor.execute(query, params)
+            yield
             self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            self.in_transaction = False
+
+    def execute(self, query: str, params=None):
+        """Execute a query on the database, returns the number of affected rows"""
+        try:
+            with db_query_duration.time(operation='execute'):
+                self.cursor.execute(query, params)
+                self._commit()
+            return self.cursor.rowcount
         except psycopg2.DatabaseError as e:
             print(f"Database error: {e}")
             self.conn.rollback()
             raise
     
+    def execute_values(self, query: str, rows: list, fetch=False):
+        """Execute a multi-row VALUES statement in one round-trip and commit once, unless in a transaction"""
+        try:
+            with db_query_duration.time(operation='execute_values'):
+                result = psycopg2.extras.execute_values(
+                    self.cursor, query, rows, page_size=max(len(rows), 1), fetch=fetch)
+                self._commit()
+            return result
+        except psycopg2.DatabaseError as e:
+            print(f"Database error: {e}")
+            self.conn.rollback()
+            raise
+
+    def copy_expert(self, query: str, file):
+        """Stream a COPY FROM STDIN / TO STDOUT through a file-like object and commit once, unless in a transaction"""
+        try:
+            with db_query_duration.time(operation='copy'):
+                self.cursor.copy_expert(query, file)
+                self._commit()
+        except psycopg2.DatabaseError as e:
+            print(f"Database error: {e}")
+            self.conn.rollback()
+            raise
+
+    def mogrify(self, query: str, params=None):
+        """Bind parameters client-side, for statements like COPY that take none"""
+        return self.cursor.mogrify(query, params).decode(psycopg2.extensions.encodings[self.conn.encoding])
+
     def fetchall(self, query, params=None):
         """Fetch all results from a query."""
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        with db_query_duration.time(operation='fetchall'):
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
 
     def fetchone(self, query, params=None):
         """Fetch a single result from a query."""
-        self.cursor.execute(query, params)
-        return self.cursor.fetchone()
\ No newline at end of file
+        with db_query_duration.time(operation='fetchone'):
+            self.cursor.execute(query, params)
+            return self.cursor.fetchone()
+
+    def stream(self, query, params=None, itersize: int = db_stream_itersize):
+        """Yield the rows of a query through a server-side cursor, itersize rows per round-trip.
+
+        The generator checks out its own connection for the whole iteration instead of the
+        thread's one, so it can be advanced from any thread, e.g. by a StreamingResponse.
+        Closing it early returns the connection and drops the cursor."""
+        pool = get_pool()
+        connection = pool.connection() if pool is not None else closing(psycopg2.connect(**self.db_params))
+        with connection as conn:
+            with conn.cursor(name=f'stream_{next(_cursor_names)}') as cursor:
+                cursor.itersize = itersize
+                with db_query_duration.time(operation='stream'):
+                    cursor.execute(query, params)
+                yield from cursor
+            conn.rollback()  # End the read transaction
@@ -0,0 +1,270 @@
+import threading
+import time
+from contextlib import contextmanager
+import psycopg2
+from my_env import db_params, db_pool_config
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool with health checks and idle eviction"""
+
+    def __init__(self, db_params: dict, minconn: int = 1, maxconn: int = 5, timeout: float = 10.0,
+                 max_idle: float = 300.0, health_check_interval: float = 30.0):
+        self.db_params = db_params
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self._idle = []  # (connection, returned_at), most recently used last
+        self._in_use = set()
+        self._pending = 0  # Slots reserved while connecting or health checking outside the lock
+        self._lock = threading.Condition()
+        self._closed = False
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'created': 0,
+            'discarded': 0,
+            'evicted': 0,
+        }
+
+    def _connect(self):
+        return psycopg2.connect(**self.db_params)
+
+    def _release_slot(self):
+        """Give back a slot reserved for connecting or health checking outside the lock, lock held"""
+        self._pending -= 1
+        self._lock.notify()
+
+    def open(self):
+        """Open the minimum number of connections
+
+        Connections are opened one by one outside the lock, so checkouts are served meanwhile."""
+        with self._lock:
+            self._closed = False
+        while True:
+            with self._lock:
+                if self._closed or len(self._idle) + len(self._in_use) + self._pending >= self.minconn:
+                    return
+                self._pending += 1
+            try:
+                conn = self._connect()
+            except psycopg2.OperationalError as e:
+                # Keep serving, connections are opened lazily on checkout
+                print(f"Error connecting to the database: {e}")
+                with self._lock:
+                    self._release_slot()
+                return
+            with self._lock:
+                self._release_slot()
+                self._metrics['created'] += 1
+                closed = self._closed
+                if not closed:
+                    self._idle.append((conn, time.monotonic()))
+            if closed:
+                self._discard(conn)
+                return
+
+    def _needs_check(self, conn, returned_at: float):
+        return conn.closed or time.monotonic() - returned_at >= self.health_check_interval
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        """Close a connection the pool gave up on, called without the lock"""
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        """Check out a connection, waiting up to the pool timeout for one to be returned
+
+        The lock only guards the bookkeeping. Opening a connection or health checking an idle
+        one happens outside it on a reserved slot, so a slow server never blocks other checkouts."""
+        start = time.monotonic()
+        waited = False
+        while True:
+            conn = None
+            evicted = []
+            try:
+                with self._lock:
+                    while True:
+                        if self._closed:
+                            raise PoolTimeout("Connection pool is closed")
+                        evicted.extend(self._evict_idle())
+                        if self._idle:
+                            conn, returned_at = self._idle.pop()
+                            if not self._needs_check(conn, returned_at):
+                                return self._checkout(conn, start, waited)
+                            break
+                        if len(self._in_use) + self._pending < self.maxconn:
+                            break
+                        remaining = self.timeout - (time.monotonic() - start)
+                        if remaining <= 0:
+                            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                        waited = True
+                        self._lock.wait(remaining)
+                    self._pending += 1
+            finally:
+                for stale in evicted:
+                    self._discard(stale)
+
+            created = conn is None
+            try:
+                if created:
+                    conn = self._connect()
+                elif not self._healthy(conn):
+                    self._discard(conn)
+                    conn = None
+            except BaseException:
+                with self._lock:
+                    self._release_slot()
+                raise
+
+            with self._lock:
+                self._release_slot()
+                if created:
+                    self._metrics['created'] += 1
+                elif conn is None:
+                    self._metrics['discarded'] += 1
+                    continue  # Try the next idle connection or open a new one
+                if not self._closed:
+                    return self._checkout(conn, start, waited)
+                self._metrics['discarded'] += 1
+            self._discard(conn)
+            raise PoolTimeout("Connection pool is closed")
+
+    def _checkout(self, conn, start: float, waited: bool):
+        """Record a checkout, lock held"""
+        self._in_use.add(conn)
+        wait_time = time.monotonic() - start
+        self._metrics['checkouts'] += 1
+        if waited:
+            self._metrics['waits'] += 1
+        self._metrics['wait_time_total'] += wait_time
+        self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], wait_time)
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool, closing it if it is broken or the pool is closed"""
+        if not discard and not conn.closed and conn.status != psycopg2.extensions.STATUS_READY:
+            try:
+                conn.rollback()  # Never hand out a connection in a transaction
+            except psycopg2.Error:
+                discard = True
+        with self._lock:
+            self._in_use.discard(conn)
+            discard = discard or self._closed or bool(conn.closed)
+            if discard:
+                self._metrics['discarded'] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+        if discard:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the block"""
+        conn = self.getconn()
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def _evict_idle(self):
+        """Drop connections idle longer than max_idle, keeping minconn open, lock held
+
+        Returns the dropped connections for the caller to close."""
+        now = time.monotonic()
+        keep, evicted = [], []
+        # Oldest first so the most recently used connections survive
+        for conn, returned_at in self._idle:
+            total = len(keep) + len(self._in_use) + self._pending
+            if now - returned_at > self.max_idle and total >= self.minconn:
+                self._metrics['evicted'] += 1
+                self._metrics['discarded'] += 1
+                evicted.append(conn)
+            else:
+                keep.append((conn, returned_at))
+        self._idle = keep
+        return evicted
+
+    def close(self):
+        """Close idle connections; checked out ones are closed when returned"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._metrics['discarded'] += len(idle)
+            self._lock.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            checkouts = self._metrics['checkouts']
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'checkouts': checkouts,
+                'waits': self._metrics['waits'],
+                'wait_time_avg_ms': round(self._metrics['wait_time_total'] / checkouts * 1000, 3) if checkouts else 0.0,
+                'wait_time_max_ms': round(self._metrics['wait_time_max'] * 1000, 3),
+                'created': self._metrics['created'],
+                'discarded': self._metrics['discarded'],
+                'evicted': self._metrics['evicted'],
+            }
+
+
+# Process-wide pool shared by every DatabaseContext
+_pool = None
+
+
+def init_pool(connect: bool = True):
+    """Create the process-wide pool, called on application startup
+
+    With connect=False no connection is opened yet, the caller warms the pool with open()
+    or connections are opened on first checkout."""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(db_params, **db_pool_config)
+        if connect:
+            _pool.open()
+    return _pool
+
+
+def get_pool():
+    return _pool
+
+
+def close_pool():
+    """Drain the process-wide pool, called on application shutdown"""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
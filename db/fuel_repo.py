@@ -1,57 +1,118 @@
 from app.errors.handlers import DatabaseException, error_types
 from db.db_context import DatabaseContext
-from datetime import datetime
+from datetime import datetime, timedelta
+from my_env import fuel_prices_partitioned
+
+# Fuel types reported when no filter is given
+DEFAULT_FUEL_TYPES = ('แก๊สโซฮอล์ 95', 'แก๊สโซฮอล์ E20', 'ดีเซล B7')
 
 
 class FuelRepository:
-    def __init__(self, db_manager: DatabaseContext):
+    def __init__(self, db_manager: DatabaseContext, partitioned: bool = fuel_prices_partitioned):
         """Initialize with a reference to the generic Repsitory"""
         self.db_manager = db_manager
+        self.partitioned = partitioned
+        self.partitions = set()  # Monthly partitions known to exist
 
     def create_fuel_table(self):
         """Create table for storing fuel data if it doesn't exist"""
-        create_table_query = '''
-        CREATE TABLE IF NOT EXISTS fuel_prices (
-            id SERIAL PRIMARY KEY,
-            date DATE NOT NULL,
-            provider VARCHAR(50),
-            type VARCHAR(50),
-            price NUMERIC(10, 2)
+        if self.partitioned:
+            # Monthly range partitions, the key must be part of the primary key
+            table_query = '''
+            CREATE TABLE IF NOT EXISTS fuel_prices (
+                id SERIAL,
+                date DATE NOT NULL,
+                provider VARCHAR(50),
+                type VARCHAR(50),
+                price NUMERIC(10, 2),
+                PRIMARY KEY (id, date)
+            ) PARTITION BY RANGE (date);
+            CREATE TABLE IF NOT EXISTS fuel_prices_default PARTITION OF fuel_prices DEFAULT;
+            '''
+        else:
+            table_query = '''
+            CREATE TABLE IF NOT EXISTS fuel_prices (
+                id SERIAL PRIMARY KEY,
+                date DATE NOT NULL,
+                provider VARCHAR(50),
+                type VARCHAR(50),
+                price NUMERIC(10, 2)
+            );
+            '''
+        create_table_query = table_query + '''
+        CREATE UNIQUE INDEX IF NOT EXISTS fuel_prices_date_provider_type_key
+            ON fuel_prices (date, provider, type);
+        CREATE INDEX IF NOT EXISTS fuel_prices_provider_type_date_idx
+            ON fuel_prices (provider, type, date) INCLUDE (price);
+        CREATE TABLE IF NOT EXISTS fuel_providers (
+            id SMALLSERIAL PRIMARY KEY,
+            name VARCHAR(50) NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS fuel_types (
+            id SMALLSERIAL PRIMARY KEY,
+            name VARCHAR(50) NOT NULL UNIQUE
         );
         '''
         self.db_manager.execute(create_table_query)
 
-    def insert_fuel_data(self, fuel_data: list, provider: str):
-        """Insert fuel prices into the database, but first check if data for the current date already exists."""
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # Query to check if data for the current date already exists
-        check_query = '''
-        SELECT 1 FROM fuel_prices
-        WHERE date = %s AND
-        provider = %s
-        LIMIT 1
-        '''
+    def ensure_partition(self, date: str):
+        """Create the monthly partition holding date if it doesn't exist"""
+        month_start = datetime.strptime(date, '%Y-%m-%d').date().replace(day=1)
+        if month_start in self.partitions:
+            return
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        self.db_manager.execute(f'''
+        CREATE TABLE IF NOT EXISTS fuel_prices_y{month_start:%Y}m{month_start:%m}
+            PARTITION OF fuel_prices FOR VALUES FROM ('{month_start}') TO ('{next_month}');
+        ''')
+        self.partitions.add(month_start)
 
-        result = self.db_manager.fetchone(check_query, (current_date, provider,))  # Fetch one result from the query
+    def insert_fuel_data(self, fuel_data: list, date: str = None):
+        """Insert fuel prices for all providers in one transaction, skipping rows that already exist for the day,
+        today by default."""
+        current_date = date or datetime.now().strftime('%Y-%m-%d')
+
+        if not fuel_data:
+            return 0
+
+        if self.partitioned:
+            self.ensure_partition(current_date)
+
+        # The dimension tables are kept in sync in the same statement
+        insert_query = '''
+        WITH inserted AS (
+            INSERT INTO fuel_prices (date, provider, type, price)
+            VALUES %s
+            ON CONFLICT (date, provider, type) DO NOTHING
+            RETURNING id, provider, type
+        ), new_providers AS (
+            INSERT INTO fuel_providers (name)
+            SELECT DISTINCT provider FROM inserted
+            ON CONFLICT (name) DO NOTHING
+        ), new_types AS (
+            INSERT INTO fuel_types (name)
+            SELECT DISTINCT type FROM inserted
+            ON CONFLICT (name) DO NOTHING
+        )
+        SELECT id FROM inserted
+        '''
+        rows = [(current_date, entry['provider'], entry['type'], entry['price']) for entry in fuel_data]
+        inserted = self.db_manager.execute_values(insert_query, rows, fetch=True)
 
-        if result:  # If the result is not empty, data exists
+        if not inserted:  # Every row conflicted, data for today already exists
             raise DatabaseException(
                 error_type=error_types['conflict']['type'],
                 message=f"Data for {current_date} already exists in the database."
             )
-        else:
-            # Insert the new data if no data for the current date exists
-            insert_query = '''
-            INSERT INTO fuel_prices (date, provider, type, price)
-            VALUES (%s, %s, %s, %s)
-            '''
-            for entry in fuel_data:
-                self.db_manager.execute(
-                    insert_query, (current_date, entry['provider'], entry['type'], entry['price']))
+        return len(inserted)
 
-    def get_fuel_prices(self, fuel_type=('แก๊สโซฮอล์ 95', 'แก๊สโซฮอล์ E20', 'ดีเซล B7')):
-        today_date = datetime.now().strftime('%Y-%m-%d')
+    def get_stored_providers(self, date: str):
+        """Providers with prices stored for a date"""
+        rows = self.db_manager.fetchall('SELECT DISTINCT provider FROM fuel_prices WHERE date = %s;', (date,))
+        return {provider for (provider,) in rows}
+
+    def get_fuel_prices(self, fuel_type=DEFAULT_FUEL_TYPES, date=None):
+        today_date = date or datetime.now().strftime('%Y-%m-%d')
 
         query = """
         SELECT provider, type, price
@@ -61,5 +122,29 @@ class FuelRepository:
         ORDER BY provider, type;
         """
 
-        rows = self.db_manager.fetchall(query, (fuel_type, today_date,))
+        rows = self.db_manager.fetchall(query, (tuple(fuel_type), today_date,))
+        return rows
+
+    def get_price_changes(self, fuel_type=DEFAULT_FUEL_TYPES, date=None):
+        """Today's prices next to the previous recorded price of the same provider and type, in one query"""
+        today_date = date or datetime.now().strftime('%Y-%m-%d')
+
+        query = """
+        SELECT today.provider, today.type, today.price, previous.price
+        FROM fuel_prices today
+        LEFT JOIN LATERAL (
+            SELECT price
+            FROM fuel_prices
+            WHERE provider = today.provider
+            AND type = today.type
+            AND date < today.date
+            ORDER BY date DESC
+            LIMIT 1
+        ) previous ON TRUE
+        WHERE today.type IN %s
+        AND today.date = %s
+        ORDER BY today.provider, today.type;
+        """
+
+        rows = self.db_manager.fetchall(query, (tuple(fuel_type), today_date,))
         return rows
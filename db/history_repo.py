@@ -0,0 +1,96 @@
+from db.db_context import DatabaseContext
+
+
+class HistoryRepository:
+    def __init__(self, db_manager: DatabaseContext):
+        """Initialize with a reference to the generic Repsitory"""
+        self.db_manager = db_manager
+
+    # Ordered like the (provider, type, date) index, so a page starts right after the previous one
+    PRICE_SERIES_QUERY = """
+    SELECT date, provider, type, price
+    FROM fuel_prices
+    WHERE date BETWEEN %s AND %s
+    AND (%s IS NULL OR provider = %s)
+    AND (%s IS NULL OR type = %s)
+    AND (%s::text IS NULL OR (provider, type, date) > (%s, %s, %s::date))
+    ORDER BY provider, type, date
+    LIMIT %s;
+    """
+
+    @staticmethod
+    def price_series_params(start_date, end_date, provider, fuel_type, after, limit):
+        after_provider, after_type, after_date = after or (None, None, None)
+        return (start_date, end_date, provider, provider, fuel_type, fuel_type,
+                after_provider, after_provider, after_type, after_date, limit)
+
+    def get_price_series(self, start_date: str, end_date: str, provider=None, fuel_type=None, after=None, limit=None):
+        """Daily prices between two dates, optionally filtered by provider and fuel type
+
+        after is the (provider, type, date) of the last row of the previous page, limit the page size."""
+        return self.db_manager.fetchall(
+            self.PRICE_SERIES_QUERY, self.price_series_params(start_date, end_date, provider, fuel_type, after, limit))
+
+    def iter_price_series(self, start_date: str, end_date: str, provider=None, fuel_type=None, after=None):
+        """Daily prices like get_price_series, yielded lazily through a server-side cursor"""
+        return self.db_manager.stream(
+            self.PRICE_SERIES_QUERY, self.price_series_params(start_date, end_date, provider, fuel_type, after, None))
+
+    def get_daily_deltas(self, start_date: str, end_date: str, provider=None, fuel_type=None):
+        """Daily prices with the change from the previous recorded day of the same provider and type"""
+        # Read one day before the range so the first day has a delta
+        query = """
+        SELECT date, provider, type, price, change
+        FROM (
+            SELECT date, provider, type, price,
+                price - LAG(price) OVER (PARTITION BY provider, type ORDER BY date) AS change
+            FROM fuel_prices
+            WHERE date BETWEEN %s::date - 1 AND %s
+            AND (%s IS NULL OR provider = %s)
+            AND (%s IS NULL OR type = %s)
+        ) deltas
+        WHERE date >= %s
+        ORDER BY provider, type, date;
+        """
+        return self.db_manager.fetchall(
+            query, (start_date, end_date, provider, provider, fuel_type, fuel_type, start_date))
+
+    def get_price_stats(self, start_date: str, end_date: str, fuel_type=None):
+        """Minimum, maximum and average price per provider and fuel type between two dates"""
+        query = """
+        SELECT provider, type, MIN(price), MAX(price), ROUND(AVG(price), 2), COUNT(*)
+        FROM fuel_prices
+        WHERE date BETWEEN %s AND %s
+        AND (%s IS NULL OR type = %s)
+        GROUP BY provider, type
+        ORDER BY provider, type;
+        """
+        return self.db_manager.fetchall(query, (start_date, end_date, fuel_type, fuel_type))
+
+    def get_all_prices(self):
+        """Every stored price as (provider, type, date, price), yielded lazily for the in-memory price store"""
+        return self.db_manager.stream("""
+        SELECT provider, type, date, price
+        FROM fuel_prices
+        ORDER BY provider, type, date;
+        """)
+
+    def get_providers(self):
+        """Provider names from the provider dimension table"""
+        return [row[0] for row in self.db_manager.fetchall("SELECT name FROM fuel_providers ORDER BY name;")]
+
+    def get_fuel_types(self):
+        """Fuel type names from the fuel type dimension table"""
+        return [row[0] for row in self.db_manager.fetchall("SELECT name FROM fuel_types ORDER BY name;")]
+
+    def sync_dimensions(self):
+        """Backfill the dimension tables from existing price rows"""
+        query = """
+        INSERT INTO fuel_providers (name)
+        SELECT DISTINCT provider FROM fuel_prices WHERE provider IS NOT NULL
+        ON CONFLICT (name) DO NOTHING;
+        INSERT INTO fuel_types (name)
+        SELECT DISTINCT type FROM fuel_prices WHERE type IS NOT NULL
+        ON CONFLICT (name) DO NOTHING;
+        """
+        self.db_manager.execute(query)
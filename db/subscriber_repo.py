@@ -0,0 +1,42 @@
+from db.db_context import DatabaseContext
+
+
+class SubscriberRepository:
+    def __init__(self, db_manager: DatabaseContext):
+        """Initialize with a reference to the generic Repsitory"""
+        self.db_manager = db_manager
+
+    def create_subscriber_table(self):
+        """Create the alert subscriber table if it doesn't exist"""
+        self.db_manager.execute('''
+        CREATE TABLE IF NOT EXISTS alert_subscribers (
+            chat_id VARCHAR(64) PRIMARY KEY,
+            fuel_types TEXT[],
+            providers TEXT[],
+            created_at TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+        ''')
+
+    def get_subscribers(self):
+        """Every subscriber as (chat_id, fuel_types, providers), NULL filters meaning the defaults"""
+        query = """
+        SELECT chat_id, fuel_types, providers
+        FROM alert_subscribers
+        ORDER BY created_at, chat_id;
+        """
+        return self.db_manager.fetchall(query)
+
+    def save_subscriber(self, chat_id: str, fuel_types=None, providers=None):
+        """Add a subscriber or replace its filters"""
+        query = """
+        INSERT INTO alert_subscribers (chat_id, fuel_types, providers)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (chat_id) DO UPDATE SET
+            fuel_types = EXCLUDED.fuel_types,
+            providers = EXCLUDED.providers;
+        """
+        self.db_manager.execute(query, (chat_id, fuel_types, providers))
+
+    def delete_subscriber(self, chat_id: str):
+        """Remove a subscriber, returns the number of rows deleted"""
+        return self.db_manager.execute('DELETE FROM alert_subscribers WHERE chat_id = %s;', (chat_id,))
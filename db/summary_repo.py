@@ -0,0 +1,140 @@
+from datetime import timedelta
+from db.db_context import DatabaseContext
+
+
+class SummaryRepository:
+    def __init__(self, db_manager: DatabaseContext):
+        """Initialize with a reference to the generic Repsitory"""
+        self.db_manager = db_manager
+        self.table_ready = False  # Created and seeded by this repository already
+
+    def create_summary_table(self):
+        """Create the per-day, per-fuel-type summary table if it doesn't exist, seeding it on first use"""
+        self.db_manager.execute('''
+        CREATE TABLE IF NOT EXISTS fuel_daily_summary (
+            date DATE NOT NULL,
+            type VARCHAR(50) NOT NULL,
+            providers SMALLINT NOT NULL,
+            cheapest_provider VARCHAR(50) NOT NULL,
+            min_price NUMERIC(10, 2) NOT NULL,
+            dearest_provider VARCHAR(50) NOT NULL,
+            max_price NUMERIC(10, 2) NOT NULL,
+            avg_price NUMERIC(10, 2) NOT NULL,
+            spread NUMERIC(10, 2) NOT NULL,
+            min_change NUMERIC(10, 2),
+            avg_change NUMERIC(10, 2),
+            PRIMARY KEY (date, type)
+        );
+        ''')
+        if not self.table_ready:
+            self.seed_summary()
+            self.table_ready = True
+
+    def ensure_summary_table(self):
+        """Create and seed the table before the first read, on a database no scrape has run against yet"""
+        if not self.table_ready:
+            self.create_summary_table()
+
+    def seed_summary(self):
+        """Summarize the stored prices older than the first summarized day, e.g. the history from before
+        the table existed. Returns the number of rows written."""
+        if not self.db_manager.fetchone("SELECT to_regclass('fuel_prices') IS NOT NULL;")[0]:
+            return 0
+        first_price, last_price, first_summary = self.db_manager.fetchone('''
+        SELECT (SELECT MIN(date) FROM fuel_prices), (SELECT MAX(date) FROM fuel_prices),
+            (SELECT MIN(date) FROM fuel_daily_summary);
+        ''')
+        if first_price is None or (first_summary is not None and first_price >= first_summary):
+            return 0
+        end_date = last_price if first_summary is None else first_summary - timedelta(days=1)
+        return self.refresh_summary(first_price, end_date)
+
+    def refresh_summary(self, start_date, end_date):
+        """Recompute the summaries of every day between two dates from fuel_prices.
+
+        The first summarized day after the range is recomputed too, since its change
+        versus the previous day depends on the range. The previous day of the range's first day
+        comes from fuel_prices or, for a type without prices in the month before, from the summary.
+        Returns the number of rows written."""
+        query = '''
+        WITH bounds AS (
+            SELECT %(start)s::date AS start_date,
+                GREATEST(%(end)s::date, COALESCE(
+                    (SELECT MIN(date) FROM fuel_daily_summary WHERE date > %(end)s::date), %(end)s::date)) AS end_date
+        ), days AS (
+            SELECT date, type, COUNT(*) AS providers,
+                (ARRAY_AGG(provider ORDER BY price, provider))[1] AS cheapest_provider,
+                MIN(price) AS min_price,
+                (ARRAY_AGG(provider ORDER BY price DESC, provider))[1] AS dearest_provider,
+                MAX(price) AS max_price,
+                ROUND(AVG(price), 2) AS avg_price
+            FROM fuel_prices, bounds
+            WHERE date BETWEEN bounds.start_date AND bounds.end_date
+            GROUP BY date, type
+        ), before AS (
+            SELECT DISTINCT ON (type) type, min_price, avg_price
+            FROM (
+                SELECT date, type, MIN(price) AS min_price, ROUND(AVG(price), 2) AS avg_price
+                FROM fuel_prices, bounds
+                WHERE date < bounds.start_date AND date >= bounds.start_date - 31
+                GROUP BY date, type
+                UNION ALL
+                SELECT date, type, min_price, avg_price
+                FROM fuel_daily_summary, bounds
+                WHERE date < bounds.start_date
+            ) previous
+            ORDER BY type, date DESC
+        ), ordered AS (
+            SELECT days.*,
+                LAG(min_price) OVER w AS previous_min,
+                LAG(avg_price) OVER w AS previous_avg
+            FROM days
+            WINDOW w AS (PARTITION BY type ORDER BY date)
+        )
+        INSERT INTO fuel_daily_summary (date, type, providers, cheapest_provider, min_price, dearest_provider,
+                                        max_price, avg_price, spread, min_change, avg_change)
+        SELECT ordered.date, ordered.type, ordered.providers, ordered.cheapest_provider, ordered.min_price,
+            ordered.dearest_provider, ordered.max_price, ordered.avg_price,
+            ordered.max_price - ordered.min_price,
+            ordered.min_price - COALESCE(ordered.previous_min, before.min_price),
+            ordered.avg_price - COALESCE(ordered.previous_avg, before.avg_price)
+        FROM ordered
+        LEFT JOIN before ON before.type = ordered.type
+        ON CONFLICT (date, type) DO UPDATE SET
+            providers = EXCLUDED.providers,
+            cheapest_provider = EXCLUDED.cheapest_provider,
+            min_price = EXCLUDED.min_price,
+            dearest_provider = EXCLUDED.dearest_provider,
+            max_price = EXCLUDED.max_price,
+            avg_price = EXCLUDED.avg_price,
+            spread = EXCLUDED.spread,
+            min_change = EXCLUDED.min_change,
+            avg_change = EXCLUDED.avg_change;
+        '''
+        return self.db_manager.execute(query, {'start': start_date, 'end': end_date})
+
+    def get_daily_summary(self, date=None, fuel_type=None):
+        """Summary rows of one day, the latest summarized day by default, one per fuel type"""
+        self.ensure_summary_table()
+        query = """
+        SELECT date, type, providers, cheapest_provider, min_price, dearest_provider, max_price,
+            avg_price, spread, min_change, avg_change
+        FROM fuel_daily_summary
+        WHERE date = COALESCE(%s, (SELECT MAX(date) FROM fuel_daily_summary))
+        AND (%s IS NULL OR type = %s)
+        ORDER BY type;
+        """
+        return self.db_manager.fetchall(query, (date, fuel_type, fuel_type))
+
+    def get_summary_range(self, start_date, end_date, fuel_type=None):
+        """Summary rows between two dates"""
+        self.ensure_summary_table()
+        query = """
+        SELECT date, type, providers, cheapest_provider, min_price, dearest_provider, max_price,
+            avg_price, spread, min_change, avg_change
+        FROM fuel_daily_summary
+        WHERE date BETWEEN %s AND %s
+        AND (%s IS NULL OR type = %s)
+        ORDER BY type, date;
+        """
+        return self.db_manager.fetchall(query, (start_date, end_date, fuel_type, fuel_type))
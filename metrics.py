@@ -0,0 +1,175 @@
+# metrics.py
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from my_env import metrics_enabled
+
+# Seconds, matching the Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = ''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """Collects metrics and renders them in the Prometheus text format"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str, labelnames: tuple = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # Label values tuple -> sample state
+        registry.register(self)
+
+    def _key(self, labels: dict):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.extend(self._samples(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self, key, value):
+        return [f'{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            state['counts'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block in seconds"""
+        if not self.registry.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state['count'] if state else 0
+
+    def _samples(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), state['counts']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+        lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+# Process-wide registry, exposed on /metrics
+registry = MetricsRegistry(enabled=metrics_enabled)
+
+http_request_duration = Histogram(
+    registry, 'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route', 'status'))
+fetch_duration = Histogram(
+    registry, 'fuel_fetch_duration_seconds', 'Upstream page fetch time per source', ('source',))
+fetch_bytes = Counter(
+    registry, 'fuel_fetch_bytes', 'Page bytes received per source, cache revalidations included', ('source',))
+parse_duration = Histogram(
+    registry, 'fuel_parse_duration_seconds', 'Page parse time per source', ('source',))
+rows_parsed = Counter(
+    registry, 'fuel_rows_parsed', 'Price rows parsed per source and provider', ('source', 'provider'))
+scrape_errors = Counter(
+    registry, 'fuel_scrape_errors', 'Failed source scrapes', ('source',))
+store_duration = Histogram(
+    registry, 'fuel_store_duration_seconds', 'Time to write a scrape batch to the database')
+rows_written = Counter(
+    registry, 'fuel_rows_written', 'Price rows inserted into the database')
+price_read_duration = Histogram(
+    registry, 'fuel_price_read_duration_seconds', 'Time to read prices from the database', ('query',))
+db_query_duration = Histogram(
+    registry, 'db_query_duration_seconds', 'Database round-trip time by operation', ('operation',))
+telegram_send_duration = Histogram(
+    registry, 'telegram_send_duration_seconds', 'Telegram message delivery time', ('status',))
+telegram_messages = Counter(
+    registry, 'telegram_messages', 'Queued Telegram messages by delivery outcome', ('status',))
@@ -1,9 +1,39 @@
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv('.env')
 
-fuel_data_scraper_url = 'https://gasprice.kapook.com/gasprice.php'
+def str_to_bool(s):
+    return {"True": True, "False": False}.get(s, None)
+
+fuel_data_scraper_url = os.getenv('SCRAPER_URL', 'https://gasprice.kapook.com/gasprice.php')
+
+# Registered price sources to scrape, comma separated
+fuel_sources = [name.strip() for name in os.getenv('FUEL_SOURCES', 'kapook').split(',') if name.strip()]
+
+# Sources scraped at once, and the minimum seconds between requests to one host
+source_concurrency = int(os.getenv('SOURCE_CONCURRENCY', 4))
+source_host_interval = float(os.getenv('SOURCE_HOST_INTERVAL', 1))
+
+# One of: auto, htmlparser, regex, lxml, bs4
+fuel_parser_backend = os.getenv('FUEL_PARSER_BACKEND', 'auto')
+
+# Worker processes for page parsing, 0 parses on the event loop's thread pool
+parse_workers = int(os.getenv('PARSE_WORKERS', 1))
+
+# Worker processes and pages per work unit for bulk re-parsing, empty uses every core
+reprocess_workers = int(os.getenv('REPROCESS_WORKERS')) if os.getenv('REPROCESS_WORKERS') else None
+reprocess_chunk_size = int(os.getenv('REPROCESS_CHUNK_SIZE', 8))
+
+# Timeout in seconds for requests to the upstream page
+fetch_timeout = float(os.getenv('FETCH_TIMEOUT', 30))
+
+# Directory holding the last fetched page and its validators
+fetch_cache_dir = os.getenv('FETCH_CACHE_DIR', './cache')
+
+# Content-addressed archive of every fetched page, empty to disable
+snapshot_archive_dir = os.getenv('SNAPSHOT_ARCHIVE_DIR', './raw/archive')
 
 db_params = {
     'dbname': os.getenv('DATABASE_NAME'),
@@ -13,12 +43,68 @@ db_params = {
     'port': os.getenv('DATABASE_PORT')
 }
 
+db_pool_config = {
+    'minconn': int(os.getenv('DATABASE_POOL_MIN', 1)),
+    'maxconn': int(os.getenv('DATABASE_POOL_MAX', 5)),
+    'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', 10)),
+    'max_idle': float(os.getenv('DATABASE_POOL_MAX_IDLE', 300)),
+    'health_check_interval': float(os.getenv('DATABASE_POOL_HEALTH_CHECK', 30)),
+}
+
+# Rows fetched per round-trip when streaming a query through a server-side cursor
+db_stream_itersize = int(os.getenv('DATABASE_STREAM_ITERSIZE', 2000))
+
+# Seconds a cached price query stays valid between scrapes
+price_cache_ttl = float(os.getenv('PRICE_CACHE_TTL', 300))
+
+# Serve history stats and analytics from the in-memory columnar price store
+price_store_enabled = bool(str_to_bool(os.getenv('PRICE_STORE_ENABLED', 'True')))
+
+# Create fuel_prices with monthly range partitions, only applies to a new table
+fuel_prices_partitioned = bool(str_to_bool(os.getenv('FUEL_PRICES_PARTITIONED', 'False')))
+
 telegram_bot_config = {
     'token': os.getenv('TELEGRAM_BOT_TOKEN'),
     'chat_id': os.getenv('TELEGRAM_BOT_CHAT_ID'),
 }
 
-def str_to_bool(s):
-    return {"True": True, "False": False}.get(s, None)
+# Outbound Telegram queue on disk and its delivery limits, rates in messages per second
+telegram_delivery_config = {
+    'queue_path': os.getenv('TELEGRAM_QUEUE_PATH', './cache/telegram_outbox.sqlite3'),
+    'api_url': os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org'),
+    'rate': float(os.getenv('TELEGRAM_RATE', 25)),
+    'chat_rate': float(os.getenv('TELEGRAM_CHAT_RATE', 1)),
+    'group_rate': float(os.getenv('TELEGRAM_GROUP_RATE', 1 / 3)),
+    'max_attempts': int(os.getenv('TELEGRAM_MAX_ATTEMPTS', 8)),
+    'backoff': float(os.getenv('TELEGRAM_BACKOFF', 2)),
+    'concurrency': int(os.getenv('TELEGRAM_SEND_CONCURRENCY', 8)),
+}
+
+# Minimum price move in THB that triggers a change alert, per fuel type as JSON
+alert_default_threshold = float(os.getenv('ALERT_DEFAULT_THRESHOLD', 0.01))
+alert_thresholds = json.loads(os.getenv('ALERT_THRESHOLDS', '{}'))
+
+# Alert message layout, one of: plain, markdown, html, compact
+alert_template = os.getenv('ALERT_TEMPLATE', 'plain')
+
+# In-process scrape -> persist -> alert schedule, cron syntax in local time
+scheduler_enabled = bool(str_to_bool(os.getenv('SCHEDULER_ENABLED', 'False')))
+scheduler_config = {
+    'schedule': os.getenv('SCHEDULER_CRON', '0 6 * * *'),
+    'jitter': float(os.getenv('SCHEDULER_JITTER', 60)),
+    'max_retries': int(os.getenv('SCHEDULER_MAX_RETRIES', 3)),
+    'backoff': float(os.getenv('SCHEDULER_BACKOFF', 30)),
+}
+
+# Coordinate several API workers over the database: one leader runs the scheduled
+# pipeline, the others drop their price caches when a scrape is committed
+coordination_enabled = bool(str_to_bool(os.getenv('COORDINATION_ENABLED', 'False')))
+coordination_config = {
+    'channel': os.getenv('COORDINATION_CHANNEL', 'fuel_price_updates'),
+    'reconnect_interval': float(os.getenv('COORDINATION_RECONNECT_INTERVAL', 5)),
+}
+
+# Collect stage timings and counters, exposed on /metrics in the Prometheus text format
+metrics_enabled = bool(str_to_bool(os.getenv('METRICS_ENABLED', 'False')))
 
 debug=bool(str_to_bool(os.getenv('DEBUG')))
\ No newline at end of file
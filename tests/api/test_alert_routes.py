@@ -0,0 +1,54 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import alert_routes
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(alert_routes.router, prefix="/api")
+    with TestClient(app) as client:
+        yield client
+
+# Test that a change alert reports the number of queued changes
+def test_send_fuel_alert(client, mocker):
+    mocker.patch.object(alert_routes.get_alert_service(), "send_price_change_alert", return_value=2)
+
+    response = client.get("/api/alert/fuel")
+
+    assert response.status_code == 200
+    assert response.json()["message"] == "Fuel price alert queued for 2 changes!"
+
+# Test that a failure is reported with its message
+def test_send_fuel_alert_error(client, mocker):
+    mocker.patch.object(alert_routes.get_alert_service(), "send_fuel_price_alert", side_effect=RuntimeError("database down"))
+
+    response = client.get("/api/alert/fuel", params={"full": "true"})
+
+    assert response.status_code == 500
+    assert response.json() == {"type": "Internal server error", "message": "database down", "details": None, "status": 500}
+
+# Test subscribing a chat with filters
+def test_save_subscriber(client, mocker):
+    mock_save = mocker.patch.object(alert_routes.get_alert_service(), "save_subscriber")
+
+    response = client.put("/api/alert/subscribers/42", json={"fuel_types": ["Diesel"]})
+
+    assert response.status_code == 200
+    mock_save.assert_called_once_with("42", ["Diesel"], None)
+
+# Test listing subscribers
+def test_get_subscribers(client, mocker):
+    mocker.patch.object(alert_routes.get_alert_service(), "get_subscribers", return_value=[("42", ["Diesel"], None)])
+
+    response = client.get("/api/alert/subscribers")
+
+    assert response.json() == {"data": [{"chat_id": "42", "fuel_types": ["Diesel"], "providers": None}], "status": 200}
+
+# Test unsubscribing a chat that isn't subscribed
+def test_remove_unknown_subscriber(client, mocker):
+    mocker.patch.object(alert_routes.get_alert_service(), "remove_subscriber", return_value=False)
+
+    response = client.delete("/api/alert/subscribers/42")
+
+    assert response.status_code == 404
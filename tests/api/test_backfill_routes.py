@@ -0,0 +1,29 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import backfill_routes
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(backfill_routes.router, prefix="/api")
+    with TestClient(app) as client:
+        yield client
+
+# Test that the export is streamed as a CSV attachment
+def test_export_prices(client, mocker):
+    mocker.patch.object(backfill_routes.get_backfill_service(), "export_prices",
+                        return_value=iter([b"date,provider,type,price\n", b"2024-01-01,ptt,Diesel,30.25\n"]))
+
+    response = client.get("/api/fuel/export", params={"start": "2024-01-01", "end": "2024-01-31"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="fuel_prices_2024-01-01_2024-01-31.csv"' in response.headers["content-disposition"]
+    assert response.text == "date,provider,type,price\n2024-01-01,ptt,Diesel,30.25\n"
+
+# Test a reversed date range
+def test_export_prices_invalid_range(client):
+    response = client.get("/api/fuel/export", params={"start": "2024-02-01", "end": "2024-01-01"})
+
+    assert response.status_code == 400
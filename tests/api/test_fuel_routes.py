@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import fuel_routes
+from app.services.fuel_service import ScrapeReport
+from app.services.price_cache import price_cache, price_key
+from db.fuel_repo import DEFAULT_FUEL_TYPES
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(fuel_routes.router, prefix="/api")
+    with TestClient(app) as client:
+        yield client
+
+# Test that prices are served from the cache without touching the database
+def test_get_fuel_prices_from_cache(client, mocker):
+    price_cache.set(price_key(DEFAULT_FUEL_TYPES), [("ptt", "ดีเซล B7", 32.94)])
+    mock_load = mocker.patch.object(fuel_routes.get_price_service(), "load_fuel_prices")
+
+    response = client.get("/api/fuel/prices")
+
+    assert response.status_code == 200
+    assert response.json() == {"data": [{"provider": "ptt", "type": "ดีเซล B7", "price": 32.94}], "status": 200}
+    assert response.headers["ETag"]
+    mock_load.assert_not_called()
+
+# Test a miss with a fuel type filter and a conditional request
+def test_get_fuel_prices_etag(client, mocker):
+    mock_load = mocker.patch.object(fuel_routes.get_price_service(), "load_fuel_prices",
+                                    return_value=[("ptt", "Diesel", 30.25)])
+
+    response = client.get("/api/fuel/prices", params={"type": ["Diesel"]})
+    etag = response.headers["ETag"]
+    not_modified = client.get("/api/fuel/prices", params={"type": ["Diesel"]}, headers={"If-None-Match": etag})
+
+    assert response.json()["data"] == [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    assert not_modified.status_code == 304
+    mock_load.assert_called_once_with(price_key(("Diesel",)))
+
+# Test that a scrape answers with its per-provider report
+def test_scrape_all_fuel_partial_failure(client, mocker):
+    report = ScrapeReport("2024-01-01")
+    report.record("kapook", "ptt", "done", rows=7)
+    report.record("kapook", "shell", "failed", error="No article found with class name gasprice shell")
+
+    async def run_async():
+        fuel_routes.get_fuel_service().last_report = report
+        return [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    mocker.patch.object(fuel_routes.get_fuel_service(), "run_async", run_async)
+
+    response = client.get("/api/scrape/fuel")
+
+    assert response.status_code == 200
+    assert response.json()["message"] == "Fuel data inserted for 1 providers, 1 failed."
+    assert response.json()["data"]["providers"]["kapook"]["shell"]["status"] == "failed"
@@ -0,0 +1,141 @@
+import datetime
+from decimal import Decimal
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import history_routes
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(history_routes.router, prefix="/api")
+    with TestClient(app) as client:
+        yield client
+
+# Test the price series endpoint
+def test_get_price_series(client, mocker):
+    mock_series = mocker.patch.object(history_routes.get_history_service(), "get_price_series", return_value=[
+        (datetime.date(2024, 1, 1), "ptt", "Diesel", Decimal("30.25")),
+        (datetime.date(2024, 1, 2), "ptt", "Diesel", Decimal("30.55")),
+    ])
+
+    response = client.get("/api/fuel/history", params={"start": "2024-01-01", "end": "2024-01-31", "provider": "ptt"})
+
+    assert response.status_code == 200
+    assert response.json()["data"][1] == {"date": "2024-01-02", "provider": "ptt", "type": "Diesel", "price": 30.55}
+    mock_series.assert_called_once_with(datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), "ptt", None, None, None)
+    assert response.json()["next"] is None
+
+# Test that a full page links to the next one through a keyset cursor
+def test_get_price_series_pages(client, mocker):
+    mock_series = mocker.patch.object(history_routes.get_history_service(), "get_price_series", return_value=[
+        (datetime.date(2024, 1, 1), "ptt", "ดีเซล B7", Decimal("30.25")),
+        (datetime.date(2024, 1, 2), "ptt", "ดีเซล B7", Decimal("30.55")),
+    ])
+    params = {"start": "2024-01-01", "end": "2024-01-31", "limit": 2}
+
+    cursor = client.get("/api/fuel/history", params=params).json()["next"]
+    client.get("/api/fuel/history", params={**params, "after": cursor})
+
+    assert mock_series.call_args.args[4:] == (("ptt", "ดีเซล B7", datetime.date(2024, 1, 2)), 2)
+    assert client.get("/api/fuel/history", params={**params, "after": "not-a-cursor"}).status_code == 400
+
+# Test that prices stream as NDJSON or CSV
+def test_stream_price_series(client, mocker):
+    mock_iter = mocker.patch.object(history_routes.get_history_service().history_repo, "iter_price_series",
+                                    side_effect=lambda *args: iter([
+                                        (datetime.date(2024, 1, 1), "ptt", "Diesel", Decimal("30.25")),
+                                        (datetime.date(2024, 1, 2), "ptt", "Diesel", Decimal("30.55")),
+                                    ]))
+    params = {"start": "2024-01-01", "end": "2024-01-31", "type": "Diesel"}
+
+    response = client.get("/api/fuel/history/stream", params=params)
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.splitlines()[1] == '{"date": "2024-01-02", "provider": "ptt", "type": "Diesel", "price": 30.55}'
+    mock_iter.assert_called_once_with(datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), None, "Diesel", None)
+
+    response = client.get("/api/fuel/history/stream", params={**params, "format": "csv"})
+
+    assert response.text.splitlines() == ["date,provider,type,price", "2024-01-01,ptt,Diesel,30.25",
+                                          "2024-01-02,ptt,Diesel,30.55"]
+
+# Test the day-over-day deltas endpoint
+def test_get_daily_deltas(client, mocker):
+    mocker.patch.object(history_routes.get_history_service(), "get_daily_deltas", return_value=[
+        (datetime.date(2024, 1, 1), "ptt", "Diesel", Decimal("30.25"), None),
+        (datetime.date(2024, 1, 2), "ptt", "Diesel", Decimal("30.55"), Decimal("0.30")),
+    ])
+
+    response = client.get("/api/fuel/history/deltas", params={"start": "2024-01-01", "end": "2024-01-02"})
+
+    assert [entry["change"] for entry in response.json()["data"]] == [None, 0.30]
+
+# Test the stats endpoint
+def test_get_price_stats(client, mocker):
+    mocker.patch.object(history_routes.get_history_service(), "get_price_stats", return_value=[
+        ("ptt", "Diesel", Decimal("29.99"), Decimal("31.00"), Decimal("30.40"), 31),
+    ])
+
+    response = client.get("/api/fuel/history/stats", params={"start": "2024-01-01", "end": "2024-01-31"})
+
+    assert response.json()["data"] == [
+        {"provider": "ptt", "type": "Diesel", "min": 29.99, "max": 31.00, "avg": 30.40, "days": 31}
+    ]
+
+# Test that a reversed range is rejected
+def test_invalid_range(client, mocker):
+    mock_series = mocker.patch.object(history_routes.get_history_service(), "get_price_series")
+
+    response = client.get("/api/fuel/history", params={"start": "2024-02-01", "end": "2024-01-01"})
+
+    assert response.status_code == 400
+    mock_series.assert_not_called()
+
+# Test the rankings endpoint on the latest scraped day
+def test_get_rankings(client, mocker):
+    mock_rankings = mocker.patch.object(history_routes.get_history_service(), "get_rankings", return_value=(
+        datetime.date(2024, 1, 2), [("ptt", Decimal("30.00")), ("bcp", Decimal("30.85"))]))
+
+    response = client.get("/api/fuel/analytics/rankings", params={"type": "Diesel"})
+
+    assert response.status_code == 200
+    assert response.json() == {"date": "2024-01-02", "status": 200, "data": [
+        {"rank": 1, "provider": "ptt", "price": 30.0},
+        {"rank": 2, "provider": "bcp", "price": 30.85},
+    ]}
+    mock_rankings.assert_called_once_with(None, "Diesel")
+
+# Test the spreads endpoint for a given date
+def test_get_spreads(client, mocker):
+    mock_spreads = mocker.patch.object(history_routes.get_history_service(), "get_spreads", return_value=(
+        datetime.date(2024, 1, 2), [("Diesel", "ptt", Decimal("30.00"), "bcp", Decimal("30.85"), Decimal("0.85"))]))
+
+    response = client.get("/api/fuel/analytics/spreads", params={"date": "2024-01-02"})
+
+    assert response.json()["data"] == [
+        {"type": "Diesel", "cheapest": "ptt", "lowest": 30.0, "dearest": "bcp", "highest": 30.85, "spread": 0.85}]
+    mock_spreads.assert_called_once_with(datetime.date(2024, 1, 2))
+
+# Test the daily summary endpoint on the latest summarized day
+def test_get_daily_summary(client, mocker):
+    mock_summary = mocker.patch.object(history_routes.get_history_service(), "get_daily_summary", return_value=[
+        (datetime.date(2024, 1, 2), "Diesel", 2, "ptt", Decimal("30.00"), "bcp", Decimal("30.85"),
+         Decimal("30.43"), Decimal("0.85"), Decimal("-0.20"), None)])
+
+    response = client.get("/api/fuel/summary", params={"type": "Diesel"})
+
+    assert response.status_code == 200
+    assert response.json()["data"] == [
+        {"date": "2024-01-02", "type": "Diesel", "providers": 2, "cheapest": "ptt", "lowest": 30.0,
+         "dearest": "bcp", "highest": 30.85, "avg": 30.43, "spread": 0.85, "lowest_change": -0.2, "avg_change": None}]
+    mock_summary.assert_called_once_with(None, "Diesel")
+
+# Test the summary history endpoint
+def test_get_summary_range(client, mocker):
+    mock_range = mocker.patch.object(history_routes.get_history_service(), "get_summary_range", return_value=[])
+
+    response = client.get("/api/fuel/summary/history", params={"start": "2024-01-01", "end": "2024-01-31"})
+
+    assert response.json() == {"data": [], "status": 200}
+    mock_range.assert_called_once_with(datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), None)
@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+from app import dependencies
+from app.main import create_app
+
+GETTERS = (dependencies.get_fuel_service, dependencies.get_price_service, dependencies.get_history_service,
+           dependencies.get_backfill_service, dependencies.get_scheduler)
+
+# Test that the app serves without building the services its routes depend on
+def test_create_app_is_lazy():
+    for getter in GETTERS:
+        getter.cache_clear()
+
+    client = TestClient(create_app())  # No lifespan, only the request path is exercised
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert not any(dependencies.is_built(getter) for getter in GETTERS)
+
+# Test that a service is built on its first request and shared afterwards
+def test_service_built_on_first_use(mocker):
+    dependencies.get_history_service.cache_clear()
+    client = TestClient(create_app())
+    mocker.patch("app.services.history_service.HistoryService.get_providers", return_value=["ptt"])
+
+    assert client.get("/api/fuel/providers").status_code == 200
+    service = dependencies.get_history_service()
+    assert client.get("/api/fuel/providers").status_code == 200
+
+    assert dependencies.get_history_service() is service
+    assert dependencies.get_history_service.cache_info().misses == 1
@@ -0,0 +1,33 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import metrics_routes
+from metrics import registry, rows_written
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(metrics_routes.router)
+    with TestClient(app) as client:
+        yield client
+
+# Test the Prometheus exposition of the process-wide registry
+def test_get_metrics(client, mocker):
+    mocker.patch.object(registry, "enabled", True)
+    rows_written.inc(21)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE fuel_rows_written counter" in response.text
+    assert "fuel_rows_written_total 21.0" in response.text
+    registry.reset()
+
+# Test that the endpoint is hidden while metrics are disabled
+def test_get_metrics_disabled(client, mocker):
+    mocker.patch.object(registry, "enabled", False)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 404
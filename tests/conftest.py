@@ -0,0 +1,58 @@
+import json
+import httpx
+import pytest
+from app.services.price_cache import price_cache
+from app.services.price_store import price_store
+
+# Keep the process-wide price cache and store from leaking rows between tests
+@pytest.fixture(autouse=True)
+def clear_price_cache():
+    price_cache.invalidate()
+    price_store.invalidate()
+    yield
+    price_cache.invalidate()
+    price_store.invalidate()
+
+# Archive pages fetched in tests under the test's temporary directory
+@pytest.fixture(autouse=True)
+def snapshot_archive(tmp_path, monkeypatch):
+    from app.services import sources
+    from app.services.snapshot_archive import SnapshotArchive
+    archive = SnapshotArchive(str(tmp_path / "archive"))
+    monkeypatch.setattr(sources, "snapshot_archive", archive)
+    yield archive
+
+class FakeBotApi:
+    """In-process stand-in for the Telegram Bot API, served through an httpx.MockTransport"""
+
+    def __init__(self):
+        self.messages = []  # (chat_id, text) of every accepted sendMessage
+        self.replies = []  # (status, body) answered before accepting again
+        self.parse_modes = []  # parse_mode of every accepted sendMessage, None for plain text
+
+    def handle(self, request):
+        if self.replies:
+            status, body = self.replies.pop(0)
+            return httpx.Response(status, json=body)
+        payload = json.loads(request.content)
+        self.messages.append((payload["chat_id"], payload["text"]))
+        self.parse_modes.append(payload.get("parse_mode"))
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": len(self.messages)}})
+
+    @property
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+@pytest.fixture
+def fake_bot_api():
+    yield FakeBotApi()
+
+# A Telegram sender on a queue under the test's temporary directory, talking to the fake Bot API
+@pytest.fixture
+def telegram_sender(tmp_path, fake_bot_api):
+    from app.services.telegram_delivery import MessageQueue, TelegramSender
+    sender = TelegramSender(MessageQueue(str(tmp_path / "outbox.sqlite3")), "token",
+                            rate=1000, chat_rate=1000, group_rate=1000,
+                            backoff=0.01, transport=fake_bot_api.transport)
+    yield sender
+    sender.queue.close()
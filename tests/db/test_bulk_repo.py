@@ -0,0 +1,67 @@
+import datetime
+import pytest
+from unittest.mock import MagicMock
+from db.bulk_repo import BulkRepository, RowStream
+
+@pytest.fixture
+def mock_bulk_repo():
+    mock_db = MagicMock()
+    yield BulkRepository(mock_db, partitioned=False), mock_db
+
+# Test that rows are rendered as CSV lazily, in reads of the requested size
+def test_row_stream():
+    consumed = []
+
+    def rows():
+        for row in [("2024-01-01", "ptt", "Diesel", "30.25"), ("2024-01-01", "b,cp", "Diesel", "30.55")]:
+            consumed.append(row)
+            yield row
+
+    stream = RowStream(rows())
+    first = stream.read(10)
+
+    assert first == "2024-01-01"
+    assert len(consumed) == 1
+    assert first + stream.read(-1) == '2024-01-01,ptt,Diesel,30.25\n2024-01-01,"b,cp",Diesel,30.55\n'
+    assert stream.count == 2
+    assert stream.read(10) == ""
+
+# Test that a file is copied into staging and merged without duplicates
+def test_copy_prices(mock_bulk_repo):
+    repo, mock_db = mock_bulk_repo
+    mock_db.copy_expert.side_effect = lambda query, file: file.read(-1)
+    mock_db.execute.return_value = 1
+    # No history to seed the summary with, then the copied range
+    mock_db.fetchone.side_effect = [(False,), (datetime.date(2024, 1, 1), datetime.date(2024, 1, 1))]
+
+    rows, inserted = repo.copy_prices(iter([("2024-01-01", "ptt", "Diesel", "30.25")]))
+
+    assert (rows, inserted) == (1, 1)
+    query = mock_db.copy_expert.call_args.args[0]
+    assert query.startswith("COPY fuel_prices_import")
+    queries = [c.args[0] for c in mock_db.execute.call_args_list]
+    merge = next(query for query in queries if "INSERT INTO fuel_prices " in query)
+    assert "ON CONFLICT (date, provider, type) DO NOTHING" in merge
+    assert "DELETE" not in merge
+    # The copied days are summarized after the merge
+    refresh = mock_db.execute.call_args_list[-2]
+    assert "INSERT INTO fuel_daily_summary" in refresh.args[0]
+    assert refresh.args[1] == {"start": datetime.date(2024, 1, 1), "end": datetime.date(2024, 1, 1)}
+    mock_db.fetchall.assert_not_called()
+    # Every step runs inside the file's transaction
+    calls = [name for name, _, _ in mock_db.mock_calls]
+    assert calls[0] == "transaction" and calls[1] == "transaction().__enter__"
+    assert calls[-1] == "transaction().__exit__"
+
+# Test that the monthly partitions of the imported rows are created first
+def test_copy_prices_partitioned():
+    mock_db = MagicMock()
+    repo = BulkRepository(mock_db, partitioned=True)
+    mock_db.fetchall.return_value = [(datetime.date(2023, 1, 1),), (datetime.date(2023, 2, 1),)]
+    mock_db.fetchone.return_value = (None, None)
+
+    repo.copy_prices(iter([]))
+
+    partitions = [c.args[0] for c in mock_db.execute.call_args_list if "PARTITION OF fuel_prices FOR VALUES" in c.args[0]]
+    assert len(partitions) == 2
+    assert "fuel_prices_y2023m02" in partitions[1]
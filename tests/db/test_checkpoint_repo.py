@@ -0,0 +1,26 @@
+import pytest
+from unittest.mock import MagicMock
+from db.checkpoint_repo import CheckpointRepository
+
+@pytest.fixture
+def mock_checkpoint_repo():
+    mock_db = MagicMock()
+    yield CheckpointRepository(mock_db), mock_db
+
+# Test that checkpoints are written in one statement without demoting a done provider
+def test_save_checkpoints(mock_checkpoint_repo):
+    repo, mock_db = mock_checkpoint_repo
+
+    repo.save_checkpoints("2024-01-01", [("kapook", "ptt", "done", 7, None), ("kapook", "shell", "failed", 0, "missing")])
+
+    query, rows = mock_db.execute_values.call_args.args
+    assert "WHERE fuel_scrape_checkpoints.status <> 'done'" in query
+    assert rows == [("2024-01-01", "kapook", "ptt", "done", 7, None), ("2024-01-01", "kapook", "shell", "failed", 0, "missing")]
+
+# Test that nothing is written without checkpoints
+def test_save_no_checkpoints(mock_checkpoint_repo):
+    repo, mock_db = mock_checkpoint_repo
+
+    repo.save_checkpoints("2024-01-01", [])
+
+    mock_db.execute_values.assert_not_called()
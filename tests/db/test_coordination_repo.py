@@ -0,0 +1,41 @@
+import pytest
+from unittest.mock import MagicMock, call
+from db.coordination_repo import CoordinationRepository, lock_key
+
+@pytest.fixture
+def mock_coordination_repo():
+    mock_db = MagicMock()
+    yield CoordinationRepository(mock_db), mock_db
+
+# Test that lock keys are stable signed 64-bit integers
+def test_lock_key():
+    assert lock_key("fuel_store") == lock_key("fuel_store")
+    assert lock_key("fuel_store") != lock_key("scheduler_leader")
+    assert -2 ** 63 <= lock_key("fuel_store") < 2 ** 63
+
+# Test that the lock is released after the block, even when it fails
+def test_hold_releases_on_error(mock_coordination_repo):
+    repo, mock_db = mock_coordination_repo
+    key = lock_key("fuel_store")
+
+    with pytest.raises(RuntimeError):
+        with repo.hold("fuel_store"):
+            mock_db.execute("INSERT")
+            raise RuntimeError("insert failed")
+
+    assert mock_db.method_calls == [
+        call.fetchone("SELECT pg_advisory_lock(%s);", (key,)),
+        call.execute("INSERT"),
+        call.conn.rollback(),
+        call.fetchone("SELECT pg_advisory_unlock(%s);", (key,)),
+        call.conn.commit(),
+    ]
+
+# Test that notifications carry a JSON payload
+def test_notify(mock_coordination_repo):
+    repo, mock_db = mock_coordination_repo
+
+    repo.notify("fuel_price_updates", {"worker": "a:1", "date": "2025-01-01"})
+
+    mock_db.execute.assert_called_once_with(
+        "SELECT pg_notify(%s, %s);", ("fuel_price_updates", '{"worker": "a:1", "date": "2025-01-01"}'))
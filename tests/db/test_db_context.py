@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import MagicMock
+from db import db_context
+from db.db_context import DatabaseContext
+
+@pytest.fixture
+def mock_pool(mocker):
+    pool = MagicMock()
+    conn = pool.connection.return_value.__enter__.return_value
+    cursor = conn.cursor.return_value.__enter__.return_value
+    mocker.patch.object(db_context, "get_pool", return_value=pool)
+    yield pool, conn, cursor
+
+# Test that streamed rows come lazily from a named cursor on a connection held for the iteration
+def test_stream(mock_pool):
+    pool, conn, cursor = mock_pool
+    cursor.__iter__.return_value = iter([(1,), (2,), (3,)])
+
+    rows = DatabaseContext().stream("SELECT id FROM fuel_prices WHERE date = %s", ("2024-01-01",), itersize=2)
+    pool.connection.assert_not_called()  # Nothing runs before the first row is asked for
+
+    assert next(rows) == (1,)
+    assert conn.cursor.call_args.kwargs["name"].startswith("stream_")
+    assert cursor.itersize == 2
+    cursor.execute.assert_called_once_with("SELECT id FROM fuel_prices WHERE date = %s", ("2024-01-01",))
+    assert list(rows) == [(2,), (3,)]
+    conn.rollback.assert_called_once()
+    pool.connection.return_value.__exit__.assert_called_once()
+
+# Test that closing a stream early returns its connection
+def test_stream_closed_early(mock_pool):
+    pool, _, cursor = mock_pool
+    cursor.__iter__.return_value = iter([(1,), (2,), (3,)])
+
+    rows = DatabaseContext().stream("SELECT id FROM fuel_prices")
+    next(rows)
+    rows.close()
+
+    pool.connection.return_value.__exit__.assert_called_once()
+    pool.connection.return_value.__enter__.return_value.cursor.return_value.__exit__.assert_called_once()
+
+# Test that statements in a transaction commit together once it ends, or roll back together
+def test_transaction():
+    context = DatabaseContext()
+    context.conn, context.cursor = MagicMock(), MagicMock()
+
+    with context.transaction():
+        context.execute("INSERT INTO fuel_prices VALUES (1)")
+        with context.transaction():
+            context.copy_expert("COPY fuel_prices_import FROM STDIN", None)
+        context.conn.commit.assert_not_called()
+    context.conn.commit.assert_called_once()
+
+    with pytest.raises(RuntimeError):
+        with context.transaction():
+            context.execute("INSERT INTO fuel_prices VALUES (2)")
+            raise RuntimeError("summary refresh failed")
+    context.conn.commit.assert_called_once()
+    context.conn.rollback.assert_called_once()
+
+    context.execute("TRUNCATE fuel_prices_import")
+    assert context.conn.commit.call_count == 2
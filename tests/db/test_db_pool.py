@@ -0,0 +1,121 @@
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+import psycopg2
+from db.db_pool import ConnectionPool, PoolTimeout
+
+def make_connection():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.status = psycopg2.extensions.STATUS_READY
+    return conn
+
+@pytest.fixture
+def mock_connect():
+    with patch("db.db_pool.psycopg2.connect", side_effect=lambda **kwargs: make_connection()) as mock_connect:
+        yield mock_connect
+
+# Test that the pool opens minconn connections and reuses returned ones
+def test_pool_reuses_connections(mock_connect):
+    pool = ConnectionPool({}, minconn=2, maxconn=3)
+    pool.open()
+    assert mock_connect.call_count == 2
+
+    with pool.connection() as first:
+        assert pool.stats()['in_use'] == 1
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert mock_connect.call_count == 2
+    assert pool.stats()['in_use'] == 0
+
+# Test that checkout times out when every connection is in use
+def test_pool_timeout(mock_connect):
+    pool = ConnectionPool({}, minconn=0, maxconn=1, timeout=0.05)
+    pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+# Test that a waiting checkout gets the connection once it is returned
+def test_pool_waits_for_returned_connection(mock_connect):
+    pool = ConnectionPool({}, minconn=0, maxconn=1, timeout=2)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+
+    assert pool.getconn() is conn
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['wait_time_max_ms'] > 0
+
+# Test that a slow connect blocks neither returning nor checking out other connections
+def test_pool_connects_outside_lock(mock_connect):
+    pool = ConnectionPool({}, minconn=0, maxconn=2, timeout=2)
+    conn = pool.getconn()
+    connecting, release = threading.Event(), threading.Event()
+
+    def slow_connect(**kwargs):
+        connecting.set()
+        release.wait(2)
+        return make_connection()
+
+    mock_connect.side_effect = slow_connect
+    opener = threading.Thread(target=pool.getconn)
+    opener.start()
+    assert connecting.wait(1)
+
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert opener.is_alive()
+
+    release.set()
+    opener.join(1)
+    assert pool.stats()['in_use'] == 2
+
+# Test that broken connections are discarded instead of reused
+def test_pool_discards_broken_connection(mock_connect):
+    pool = ConnectionPool({}, minconn=0, maxconn=2)
+
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection():
+            raise psycopg2.OperationalError("server closed the connection")
+
+    assert pool.stats()['discarded'] == 1
+    assert pool.stats()['idle'] == 0
+
+# Test that stale idle connections are health checked before checkout
+def test_pool_health_check(mock_connect):
+    pool = ConnectionPool({}, minconn=1, maxconn=2, health_check_interval=0)
+    pool.open()
+    stale = pool._idle[0][0]
+    stale.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError()
+
+    conn = pool.getconn()
+
+    assert conn is not stale
+    stale.close.assert_called_once()
+
+# Test idle eviction down to minconn
+def test_pool_evicts_idle_connections(mock_connect):
+    pool = ConnectionPool({}, minconn=1, maxconn=3, max_idle=0)
+    conns = [pool.getconn() for _ in range(3)]
+    for conn in conns:
+        pool.putconn(conn)
+
+    pool.getconn()
+
+    assert pool.stats()['evicted'] == 2
+
+# Test that closing the pool drains idle connections
+def test_pool_close(mock_connect):
+    pool = ConnectionPool({}, minconn=2, maxconn=2)
+    pool.open()
+    idle = [conn for conn, _ in pool._idle]
+
+    pool.close()
+
+    for conn in idle:
+        conn.close.assert_called_once()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
@@ -0,0 +1,85 @@
+from datetime import datetime
+import pytest
+from unittest.mock import MagicMock, patch
+from app.errors.handlers import DatabaseException
+from db.fuel_repo import FuelRepository
+
+@pytest.fixture
+def mock_fuel_repo():
+    mock_db = MagicMock()
+    yield FuelRepository(mock_db), mock_db
+
+# Test that all providers are written with one multi-row statement
+def test_insert_fuel_data_batched(mock_fuel_repo):
+    repo, mock_db = mock_fuel_repo
+    mock_db.execute_values.return_value = [(1,), (2,), (3,)]
+
+    fuel_data = [
+        {"provider": "ptt", "type": "Diesel", "price": 30.25},
+        {"provider": "ptt", "type": "Gasoline", "price": 33.50},
+        {"provider": "bcp", "type": "Diesel", "price": 30.25}
+    ]
+
+    result = repo.insert_fuel_data(fuel_data)
+
+    assert result == 3
+    mock_db.execute_values.assert_called_once()
+    query, rows = mock_db.execute_values.call_args.args
+    assert "ON CONFLICT (date, provider, type) DO NOTHING" in query
+    assert [row[1:] for row in rows] == [("ptt", "Diesel", 30.25), ("ptt", "Gasoline", 33.50), ("bcp", "Diesel", 30.25)]
+    mock_db.execute.assert_not_called()
+    mock_db.fetchone.assert_not_called()
+
+# Test that a fully conflicting batch is reported as existing data
+def test_insert_fuel_data_conflict(mock_fuel_repo):
+    repo, mock_db = mock_fuel_repo
+    mock_db.execute_values.return_value = []
+
+    with pytest.raises(DatabaseException) as exc_info:
+        repo.insert_fuel_data([{"provider": "ptt", "type": "Diesel", "price": 30.25}])
+
+    assert "already exists" in exc_info.value.message
+
+# Test that an empty batch does not touch the database
+def test_insert_fuel_data_empty(mock_fuel_repo):
+    repo, mock_db = mock_fuel_repo
+
+    assert repo.insert_fuel_data([]) == 0
+    mock_db.execute_values.assert_not_called()
+
+# Test that the insert also keeps the dimension tables in sync
+def test_insert_fuel_data_syncs_dimensions(mock_fuel_repo):
+    repo, mock_db = mock_fuel_repo
+    mock_db.execute_values.return_value = [(1,)]
+
+    repo.insert_fuel_data([{"provider": "ptt", "type": "Diesel", "price": 30.25}])
+
+    query = mock_db.execute_values.call_args.args[0]
+    assert "INSERT INTO fuel_providers" in query
+    assert "INSERT INTO fuel_types" in query
+
+# Test that partitioned tables get their monthly partition once before inserting
+def test_insert_fuel_data_partitioned():
+    mock_db = MagicMock()
+    mock_db.execute_values.return_value = [(1,)]
+    repo = FuelRepository(mock_db, partitioned=True)
+
+    with patch("db.fuel_repo.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime(2024, 12, 15)
+        mock_datetime.strptime = datetime.strptime
+        repo.insert_fuel_data([{"provider": "ptt", "type": "Diesel", "price": 30.25}])
+        repo.insert_fuel_data([{"provider": "ptt", "type": "Diesel", "price": 30.25}])
+
+    mock_db.execute.assert_called_once()
+    query = mock_db.execute.call_args.args[0]
+    assert "fuel_prices_y2024m12" in query
+    assert "FROM ('2024-12-01') TO ('2025-01-01')" in query
+
+# Test the partitioned table definition
+def test_create_fuel_table_partitioned():
+    mock_db = MagicMock()
+    FuelRepository(mock_db, partitioned=True).create_fuel_table()
+
+    query = mock_db.execute.call_args.args[0]
+    assert "PARTITION BY RANGE (date)" in query
+    assert "fuel_prices_date_provider_type_key" in query
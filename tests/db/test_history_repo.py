@@ -0,0 +1,31 @@
+import datetime
+import pytest
+from unittest.mock import MagicMock
+from db.history_repo import HistoryRepository
+
+@pytest.fixture
+def mock_history_repo():
+    mock_db = MagicMock()
+    yield HistoryRepository(mock_db), mock_db
+
+# Test that a page starts after the keyset of the previous page's last row
+def test_get_price_series_page(mock_history_repo):
+    repo, mock_db = mock_history_repo
+    after = ("ptt", "Diesel", datetime.date(2024, 1, 2))
+
+    repo.get_price_series("2024-01-01", "2024-01-31", None, "Diesel", after=after, limit=100)
+
+    query, params = mock_db.fetchall.call_args.args
+    assert "(provider, type, date) > (%s, %s, %s::date)" in query
+    assert params[-5:] == ("ptt", "ptt", "Diesel", datetime.date(2024, 1, 2), 100)
+
+# Test that the lazy variant streams the same query without a limit
+def test_iter_price_series(mock_history_repo):
+    repo, mock_db = mock_history_repo
+
+    rows = repo.iter_price_series("2024-01-01", "2024-01-31")
+
+    assert rows is mock_db.stream.return_value
+    query, params = mock_db.stream.call_args.args
+    assert query == repo.PRICE_SERIES_QUERY
+    assert params[6:] == (None, None, None, None, None)
@@ -0,0 +1,26 @@
+import pytest
+from unittest.mock import MagicMock
+from db.subscriber_repo import SubscriberRepository
+
+@pytest.fixture
+def mock_subscriber_repo():
+    mock_db = MagicMock()
+    yield SubscriberRepository(mock_db), mock_db
+
+# Test that saving a subscriber replaces its filters
+def test_save_subscriber(mock_subscriber_repo):
+    repo, mock_db = mock_subscriber_repo
+
+    repo.save_subscriber("42", ["Diesel"], None)
+
+    query, params = mock_db.execute.call_args.args
+    assert "ON CONFLICT (chat_id) DO UPDATE" in query
+    assert params == ("42", ["Diesel"], None)
+
+# Test that deleting reports whether the subscriber existed
+def test_delete_subscriber(mock_subscriber_repo):
+    repo, mock_db = mock_subscriber_repo
+    mock_db.execute.return_value = 0
+
+    assert repo.delete_subscriber("42") == 0
+    assert mock_db.execute.call_args.args[1] == ("42",)
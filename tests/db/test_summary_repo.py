@@ -0,0 +1,55 @@
+import datetime
+import pytest
+from unittest.mock import MagicMock
+from db.summary_repo import SummaryRepository
+
+@pytest.fixture
+def mock_summary_repo():
+    mock_db = MagicMock()
+    yield SummaryRepository(mock_db), mock_db
+
+# Test that a refresh recomputes the range in one upserting statement
+def test_refresh_summary(mock_summary_repo):
+    repo, mock_db = mock_summary_repo
+    mock_db.execute.return_value = 6
+
+    result = repo.refresh_summary("2024-01-01", "2024-01-03")
+
+    assert result == 6
+    query, params = mock_db.execute.call_args.args
+    assert "FROM fuel_prices, bounds" in query
+    assert "ON CONFLICT (date, type) DO UPDATE" in query
+    # The day before the range is looked up in fuel_prices too, not only in earlier summaries
+    assert "WHERE date < bounds.start_date AND date >= bounds.start_date - 31" in query
+    assert params == {"start": "2024-01-01", "end": "2024-01-03"}
+
+# Test that the daily summary defaults to the latest summarized day, creating the table on first read
+def test_get_daily_summary(mock_summary_repo):
+    repo, mock_db = mock_summary_repo
+    mock_db.fetchone.return_value = (False,)  # Fresh database, nothing scraped yet
+    mock_db.fetchall.return_value = []
+
+    assert repo.get_daily_summary() == []
+    assert repo.get_daily_summary() == []
+
+    query, params = mock_db.fetchall.call_args.args
+    assert "COALESCE(%s, (SELECT MAX(date) FROM fuel_daily_summary))" in query
+    assert params == (None, None, None)
+    creates = [c for c in mock_db.execute.call_args_list if "CREATE TABLE IF NOT EXISTS fuel_daily_summary" in c.args[0]]
+    assert len(creates) == 1
+
+# Test that history stored before the first summarized day is summarized when the table is set up
+@pytest.mark.parametrize("first_summary, end", [
+    (None, datetime.date(2024, 3, 31)),
+    (datetime.date(2024, 3, 1), datetime.date(2024, 2, 29)),
+    (datetime.date(2024, 1, 1), None),
+])
+def test_seed_summary(mock_summary_repo, first_summary, end):
+    repo, mock_db = mock_summary_repo
+    mock_db.fetchone.side_effect = [(True,), (datetime.date(2024, 1, 1), datetime.date(2024, 3, 31), first_summary)]
+
+    repo.create_summary_table()
+
+    refreshes = [c.args[1] for c in mock_db.execute.call_args_list if "INSERT INTO fuel_daily_summary" in c.args[0]]
+    assert refreshes == ([{"start": datetime.date(2024, 1, 1), "end": end}] if end else [])
+    assert repo.table_ready
@@ -1,24 +1,30 @@
 # test_alert_service.py
 import asyncio
+from decimal import Decimal
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.services.alert_service import AlertService
+from app.services.alert_templates import TEMPLATES
 
 # Mocking external dependencies
 @pytest.fixture
-def mock_alert_service():
+def mock_alert_service(telegram_sender, fake_bot_api):
     with patch("app.services.alert_service.DatabaseContext") as MockDBContext, \
          patch("app.services.alert_service.FuelRepository") as MockFuelRepo, \
-         patch("app.services.alert_service.Bot") as MockBot:
+         patch("app.services.alert_service.SummaryRepository") as MockSummaryRepo, \
+         patch("app.services.alert_service.SubscriberRepository") as MockSubscriberRepo, \
+         patch("app.services.alert_service.telegram_bot_config", {"token": "token", "chat_id": "mock_chat_id"}):
         
         # Setup Mock Database and Repo
         mock_db = MockDBContext.return_value
         mock_repo = MockFuelRepo.return_value
-        mock_bot = MockBot.return_value
+        MockSummaryRepo.return_value.get_daily_summary.return_value = []
+        MockSubscriberRepo.return_value.get_subscribers.return_value = []
         
-        # Create an instance of the service
+        # Create an instance of the service delivering to the fake Bot API
         service = AlertService()
-        yield service, mock_db, mock_repo, mock_bot
+        service.delivery = telegram_sender
+        yield service, mock_db, mock_repo, fake_bot_api
 
 # Test getting fuel prices
 def test_get_fuel_prices(mock_alert_service):
@@ -54,23 +60,26 @@ def test_format_fuel_prices(mock_alert_service):
     expected_result = "🚗 Fuel Prices for Today:\n\n🔹 FuelType1:\n  - Provider1: 10.99 THB\n\n🔹 FuelType2:\n  - Provider2: 11.99 THB\n\n"
     assert result == expected_result
 
-# Test sending a message to Telegram
-@patch("app.services.alert_service.telegram_bot_config", {"token": "mock_token", "chat_id": "mock_chat_id"})
+# Test sending a message to Telegram through the delivery queue
+@pytest.mark.asyncio
 async def test_send_to_telegram(mock_alert_service):
-    service, _, _, mock_bot = mock_alert_service
+    service, _, _, fake_bot_api = mock_alert_service
 
     # Mock message
     mock_message = "Hello, world!"
 
     # Call the method
-    await service.send_to_telegram(mock_message)
+    assert await service.send_to_telegram(mock_message) == 1
+    assert await service.delivery.flush() == 0
+    await service.aclose()
 
-    # Verify the bot was called
-    mock_bot.return_value.send_message.assert_called_once_with(chat_id="mock_chat_id", text=mock_message)
+    # Verify the message was delivered
+    assert fake_bot_api.messages == [("mock_chat_id", mock_message)]
 
 # Test sending a fuel price alert
+@pytest.mark.asyncio
 async def test_send_fuel_price_alert(mock_alert_service):
-    service, _, mock_repo, mock_bot = mock_alert_service
+    service, _, mock_repo, fake_bot_api = mock_alert_service
 
     # Mock fuel prices
     mock_prices = [
@@ -78,10 +87,156 @@ async def test_send_fuel_price_alert(mock_alert_service):
         ("Provider2", "FuelType2", 11.99),
     ]
     mock_repo.get_fuel_prices.return_value = mock_prices
+    service.subscriber_repo.get_subscribers.return_value = [("mock_chat_id", ["FuelType1", "FuelType2"], None)]
 
     # Call the method
     await service.send_fuel_price_alert()
+    await service.delivery.flush()
+    await service.aclose()
+
+    # Verify the message was delivered
+    expected_message = "🚗 Fuel Prices for Today:\n\n🔹 FuelType1:\n  - Provider1: 10.99 THB\n\n🔹 FuelType2:\n  - Provider2: 11.99 THB\n\n"
+    assert fake_bot_api.messages == [("mock_chat_id", expected_message)]
+# Test that only rows moving by at least their threshold are kept
+def test_filter_price_changes(mock_alert_service):
+    service, _, _, _ = mock_alert_service
+    service.thresholds = {"FuelType2": 0.50}
+    service.default_threshold = 0.01
+
+    rows = [
+        ("Provider1", "FuelType1", Decimal("10.99"), Decimal("10.69")),
+        ("Provider2", "FuelType1", Decimal("11.00"), Decimal("11.00")),
+        ("Provider1", "FuelType2", Decimal("12.20"), Decimal("12.00")),
+        ("Provider2", "FuelType2", Decimal("11.49"), Decimal("12.00")),
+        ("Provider3", "FuelType1", Decimal("9.99"), None),
+    ]
+
+    result = service.filter_price_changes(rows)
+
+    assert result == [
+        ("Provider1", "FuelType1", Decimal("10.99"), Decimal("0.30")),
+        ("Provider2", "FuelType2", Decimal("11.49"), Decimal("-0.51")),
+        ("Provider3", "FuelType1", Decimal("9.99"), None),
+    ]
+
+# Test formatting changed prices with deltas
+def test_format_price_changes(mock_alert_service):
+    service, _, _, _ = mock_alert_service
 
-    # Verify the bot was called
-    expected_message = "🚗 Fuel Prices for Today:\n\n🔹 FuelType1:\n  - Provider1: 10.99 THB\n\n🔹 FuelType2:\n  - Provider2: 11.99 THB\n"
-    mock_bot.send_message.assert_called_once_with(chat_id="mock_chat_id", text=expected_message)
\ No newline at end of file
+    changes = [
+        ("Provider1", "FuelType1", Decimal("10.99"), Decimal("0.30")),
+        ("Provider2", "FuelType1", Decimal("9.99"), None),
+        ("Provider2", "FuelType2", Decimal("11.49"), Decimal("-0.51")),
+    ]
+
+    result = service.format_price_changes(changes)
+
+    expected_result = "🚗 Fuel Price Changes for Today:\n\n🔹 FuelType1:\n  - Provider1: 10.99 THB (+0.30)\n  - Provider2: 9.99 THB (new)\n\n🔹 FuelType2:\n  - Provider2: 11.49 THB (-0.51)\n\n"
+    assert result == expected_result
+
+# Test that nothing is sent when no price moved
+@pytest.mark.asyncio
+async def test_send_price_change_alert_skips_unchanged(mock_alert_service, mocker):
+    service, _, mock_repo, _ = mock_alert_service
+    mock_repo.get_price_changes.return_value = [("Provider1", "FuelType1", Decimal("10.99"), Decimal("10.99"))]
+    mock_send = mocker.patch.object(service.delivery, "enqueue_many", AsyncMock())
+
+    result = await service.send_price_change_alert()
+
+    assert result == 0
+    mock_send.assert_not_called()
+
+# Test that queued alerts survive a failed send and go out coalesced on one client
+@pytest.mark.asyncio
+async def test_send_price_change_alert_retries(mock_alert_service):
+    service, _, mock_repo, fake_bot_api = mock_alert_service
+    mock_repo.get_price_changes.return_value = [("Provider1", "FuelType1", Decimal("10.99"), Decimal("10.69"))]
+    service.subscriber_repo.get_subscribers.return_value = [("mock_chat_id", ["FuelType1"], None)]
+    fake_bot_api.replies.append((502, {"ok": False}))
+
+    assert await service.send_price_change_alert() == 1
+    await service.send_to_telegram("Hello, world!")
+    assert await service.delivery.flush() == 0
+    client = service.delivery.client
+    await service.aclose()
+
+    assert client is not None
+    assert len(fake_bot_api.messages) == 1
+    assert fake_bot_api.messages[0][1].endswith("\nHello, world!")
+
+# Test formatting the precomputed summary
+def test_format_daily_summary(mock_alert_service):
+    service, _, _, _ = mock_alert_service
+    summary = [
+        ("2024-01-02", "FuelType1", 2, "Provider2", Decimal("10.49"), "Provider1", Decimal("10.99"),
+         Decimal("10.74"), Decimal("0.50"), Decimal("-0.20"), Decimal("0.15")),
+        ("2024-01-02", "FuelType2", 1, "Provider1", Decimal("20.00"), "Provider1", Decimal("20.00"),
+         Decimal("20.00"), Decimal("0.00"), None, None),
+    ]
+
+    result = service.format_daily_summary(summary)
+
+    expected_result = "📊 Cheapest Today:\n  - FuelType1: Provider2 10.49 THB (spread 0.50, -0.20 vs previous day)\n  - FuelType2: Provider1 20.00 THB (spread 0.00)\n"
+    assert result == expected_result
+    assert service.format_daily_summary([]) == ""
+
+# Test that the change alert ends with the summary of the alerted fuel types
+@pytest.mark.asyncio
+async def test_send_price_change_alert_with_summary(mock_alert_service, mocker):
+    service, _, mock_repo, _ = mock_alert_service
+    mock_repo.get_price_changes.return_value = [("Provider1", "ดีเซล B7", Decimal("30.99"), Decimal("30.69"))]
+    service.summary_repo.get_daily_summary.return_value = [
+        ("2024-01-02", "ดีเซล B7", 2, "Provider2", Decimal("30.49"), "Provider1", Decimal("30.99"),
+         Decimal("30.74"), Decimal("0.50"), Decimal("-0.20"), Decimal("0.15")),
+        ("2024-01-02", "Other", 1, "Provider1", Decimal("20.00"), "Provider1", Decimal("20.00"),
+         Decimal("20.00"), Decimal("0.00"), None, None),
+    ]
+    mock_enqueue = mocker.patch.object(service.delivery, "enqueue_many", AsyncMock())
+
+    assert await service.send_price_change_alert() == 1
+
+    [(chat_id, message)] = mock_enqueue.call_args.args[0]
+    assert chat_id == "mock_chat_id"
+    assert message.endswith("📊 Cheapest Today:\n  - ดีเซล B7: Provider2 30.49 THB (spread 0.50, -0.20 vs previous day)\n")
+    service.summary_repo.get_daily_summary.assert_called_once()
+
+# Test that subscribers are served from one query and one rendering per distinct filter set
+@pytest.mark.asyncio
+async def test_send_price_change_alert_fan_out(mock_alert_service, mocker):
+    service, _, mock_repo, _ = mock_alert_service
+    service.subscriber_repo.get_subscribers.return_value = [
+        ("1", ["ดีเซล B7"], None),
+        ("2", ["ดีเซล B7"], None),
+        ("3", ["ดีเซล B7", "แก๊สโซฮอล์ 95"], ["bcp"]),
+        ("4", ["แก๊สโซฮอล์ 95"], ["ptt"]),
+    ]
+    mock_repo.get_price_changes.return_value = [
+        ("bcp", "ดีเซล B7", Decimal("30.99"), Decimal("30.69")),
+        ("ptt", "ดีเซล B7", Decimal("30.99"), Decimal("30.69")),
+        ("ptt", "แก๊สโซฮอล์ 95", Decimal("35.00"), Decimal("35.00")),
+    ]
+    mock_enqueue = mocker.patch.object(service.delivery, "enqueue_many", AsyncMock())
+    render = mocker.spy(service, "format_price_changes")
+
+    assert await service.send_price_change_alert() == 2
+
+    mock_repo.get_price_changes.assert_called_once_with(("ดีเซล B7", "แก๊สโซฮอล์ 95"))
+    messages = mock_enqueue.call_args.args[0]
+    assert [chat_id for chat_id, _ in messages] == ["1", "2", "3"]  # Nothing chat 4 follows moved
+    assert messages[0][1] is messages[1][1]
+    assert "ptt" not in messages[2][1]
+    assert render.call_count == 2
+
+# Test that a formatted alert is sent with its template's parse mode
+@pytest.mark.asyncio
+async def test_send_with_template_parse_mode(mock_alert_service):
+    service, _, _, fake_bot_api = mock_alert_service
+    service.template = TEMPLATES["markdown"]
+
+    await service.send_to_telegram(service.format_fuel_prices([("ptt", "Diesel", Decimal("30.94"))]))
+    assert await service.delivery.flush() == 0
+    await service.delivery.aclose()
+
+    [(_, text)] = fake_bot_api.messages
+    assert "*30\\.94*" in text
+    assert fake_bot_api.parse_modes == ["MarkdownV2"]
@@ -0,0 +1,62 @@
+import re
+from decimal import Decimal
+import pytest
+from app.services.alert_templates import TEMPLATES, MessageRenderer
+from app.services.telegram_delivery import split_message
+
+PRICES = [("ptt", "ดีเซล B7", Decimal("30.94")), ("bcp", "ดีเซล B7", Decimal("30.99")),
+          ("ptt", "แก๊สโซฮอล์ 95", Decimal("35.05"))]
+
+# Test that a snapshot is rendered once per template and served from the memo afterwards
+def test_renderer_memoizes_per_template():
+    renderer = MessageRenderer()
+
+    first = renderer.render(TEMPLATES["plain"], "prices", PRICES)
+    again = renderer.render(TEMPLATES["plain"], "prices", list(PRICES))
+    html = renderer.render(TEMPLATES["html"], "prices", PRICES)
+
+    assert again is first
+    assert html != first
+    assert renderer.stats == {"hits": 1, "misses": 2}
+
+    renderer.render(TEMPLATES["plain"], "prices", PRICES[:2])
+    assert renderer.stats["misses"] == 3
+
+# Test that the memo drops the least recently used snapshot
+def test_renderer_evicts():
+    renderer = MessageRenderer(maxsize=2)
+    for rows in (PRICES[:1], PRICES[:2], PRICES[:1], PRICES):
+        renderer.render(TEMPLATES["plain"], "prices", rows)
+
+    renderer.render(TEMPLATES["plain"], "prices", PRICES[:1])
+    renderer.render(TEMPLATES["plain"], "prices", PRICES[:2])
+
+    assert renderer.stats == {"hits": 2, "misses": 4}
+
+# Test that MarkdownV2 values are escaped and HTML values are entity-encoded
+def test_escaping():
+    rows = [("a_b", "Diesel (B7)", Decimal("30.94"))]
+
+    assert "  \\- a\\_b: *30\\.94* THB" in TEMPLATES["markdown"].render_prices(rows)
+    assert "🔹 *Diesel \\(B7\\):*" in TEMPLATES["markdown"].render_prices(rows)
+    assert "  - a&lt;b&gt;: <b>30.94</b> THB" in TEMPLATES["html"].render_prices([("a<b>", "Diesel", 30.94)])
+
+# Test the one-line-per-type layout
+def test_compact_template():
+    changes = [("ptt", "Diesel", Decimal("30.94"), Decimal("0.30")), ("bcp", "Diesel", Decimal("30.99"), None)]
+
+    assert TEMPLATES["compact"].render_prices(PRICES) == \
+        "🚗 Prices today\n🔹 ดีเซล B7: ptt 30.94, bcp 30.99\n🔹 แก๊สโซฮอล์ 95: ptt 35.05\n"
+    assert TEMPLATES["compact"].render_changes(changes) == \
+        "🚗 Changes today\n🔹 Diesel: ptt 30.94 (+0.30), bcp 30.99 (new)\n"
+
+# Test that long formatted messages split into parts with balanced markup
+@pytest.mark.parametrize("template_id, markup", [("markdown", r"(?<!\\)\*"), ("html", r"</?b>")])
+def test_long_message_parts_stay_well_formed(template_id, markup):
+    rows = [(f"provider {i}", f"type {i % 40}", Decimal(i) / 7) for i in range(2000)]
+
+    parts = split_message(TEMPLATES[template_id].render_prices(rows))
+
+    assert len(parts) > 1
+    assert all(len(part) <= 4096 for part in parts)
+    assert all(len(re.findall(markup, part)) % 2 == 0 for part in parts)
@@ -0,0 +1,108 @@
+import gzip
+import shutil
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.backfill_service import BackfillService
+
+@pytest.fixture
+def mock_backfill_service():
+    with patch("app.services.backfill_service.DatabaseContext") as MockDatabaseContext, \
+         patch("app.services.backfill_service.BulkRepository") as MockBulkRepository:
+        service = BackfillService()
+        yield service, MockDatabaseContext.return_value, MockBulkRepository.return_value
+
+# Test reading CSV and gzipped JSON Lines dumps
+def test_read_dumps(mock_backfill_service, tmp_path):
+    service, _, _ = mock_backfill_service
+    csv_path = tmp_path / "prices.csv"
+    csv_path.write_text("date,provider,type,price\n2024-01-01,ptt,Diesel,30.25\n", encoding="utf-8")
+    jsonl_path = tmp_path / "prices.jsonl.gz"
+    with gzip.open(jsonl_path, "wt", encoding="utf-8") as file:
+        file.write('{"date": "2024-01-02", "provider": "bcp", "type": "Diesel", "price": 30.55}\n\n')
+
+    assert list(service.read_rows(str(csv_path))) == [("2024-01-01", "ptt", "Diesel", "30.25")]
+    assert list(service.read_rows(str(jsonl_path))) == [("2024-01-02", "bcp", "Diesel", 30.55)]
+
+# Test that an HTML snapshot is parsed and dated from its file name
+def test_read_snapshot(mock_backfill_service, tmp_path):
+    service, _, _ = mock_backfill_service
+    snapshot = tmp_path / "gasprice-2023-05-01.html"
+    shutil.copy("./raw/gasprice.html", snapshot)
+
+    rows = list(service.read_rows(str(snapshot)))
+
+    assert rows
+    assert {row[0] for row in rows} == {"2023-05-01"}
+    assert {row[1] for row in rows} == {"ptt", "bcp", "shell", "esso", "caltex", "pt", "susco"}
+
+    with pytest.raises(ValueError, match="No YYYY-MM-DD date"):
+        list(service.read_rows(str(tmp_path / "gasprice.html")))
+
+# Test importing a directory file by file with progress
+def test_import_files(mock_backfill_service, tmp_path):
+    service, mock_db, mock_repo = mock_backfill_service
+    for name in ("b.csv", "a.jsonl", "notes.txt"):
+        (tmp_path / name).write_text("", encoding="utf-8")
+    mock_repo.copy_prices.side_effect = [(10, 7), (5, 0)]
+    progress = MagicMock()
+
+    totals = service.import_files([str(tmp_path)], progress=progress)
+
+    assert totals == {"files": 2, "rows": 15, "inserted": 7}
+    assert progress.call_count == 2
+    assert "[1/2]" in progress.call_args_list[0].args[0] and "a.jsonl" in progress.call_args_list[0].args[0]
+    # One connection per file and one to tell the other workers
+    assert mock_db.connect.call_count == mock_db.close.call_count == 3
+    query, (_, payload) = mock_db.execute.call_args.args
+    assert "pg_notify" in query and '"reason": "import"' in payload
+
+# Test that the export yields the chunks COPY writes
+def test_export_prices(mock_backfill_service):
+    service, _, mock_repo = mock_backfill_service
+
+    def copy_to(file, start_date, end_date):
+        for chunk in (b"date,provider,type,price\n", b"2024-01-01,ptt,Diesel,30.25\n"):
+            file.write(chunk)
+
+    mock_repo.copy_prices_to.side_effect = copy_to
+
+    chunks = list(service.export_prices("2024-01-01", "2024-01-31", maxsize=1))
+
+    assert b"".join(chunks) == b"date,provider,type,price\n2024-01-01,ptt,Diesel,30.25\n"
+
+# Test that an export failure reaches the consumer
+def test_export_prices_failure(mock_backfill_service):
+    service, _, mock_repo = mock_backfill_service
+    mock_repo.copy_prices_to.side_effect = Exception("connection lost")
+
+    with pytest.raises(Exception, match="connection lost"):
+        list(service.export_prices("2024-01-01", "2024-01-31"))
+
+# Test rebuilding a date range from archived pages, parsed in worker processes
+@pytest.mark.parametrize("workers", [0, 1])
+def test_reparse(mock_backfill_service, snapshot_archive, workers):
+    from datetime import date, datetime
+    service, mock_db, mock_repo = mock_backfill_service
+    service.archive = snapshot_archive
+    with open("./raw/gasprice.html", "rb") as file:
+        page = file.read()
+    snapshot_archive.store("kapook", page, fetched_at=datetime(2024, 1, 31, 6, 0))
+    snapshot_archive.store("kapook", page, fetched_at=datetime(2024, 2, 1, 6, 0))
+    snapshot_archive.store("retired", b"<html></html>", fetched_at=datetime(2024, 2, 1, 6, 0))
+    copied = []
+
+    def copy_prices(rows, replace=False):
+        assert replace
+        copied.append(list(rows))
+        return len(copied[-1]), len(copied[-1])
+
+    mock_repo.copy_prices.side_effect = copy_prices
+
+    totals = service.reparse(date(2024, 1, 1), date(2024, 2, 29), workers=workers, progress=MagicMock())
+
+    assert len(copied) == 2
+    assert {row[0] for row in copied[0]} == {"2024-01-31"}
+    assert {row[0] for row in copied[1]} == {"2024-02-01"}
+    assert totals == {"snapshots": 2, "rows": len(copied[0]) * 2, "inserted": len(copied[0]) * 2}
+    assert mock_db.connect.call_count == 3
+    assert '"reason": "reparse"' in mock_db.execute.call_args.args[1][1]
@@ -0,0 +1,89 @@
+import json
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock
+import psycopg2
+from app.dependencies import get_history_service
+from app.services import coordination, history_service
+from app.services.coordination import WORKER_ID, LeaderElection, PriceUpdateListener
+from app.services.price_store import ColumnarPriceStore
+
+# Test that leadership is taken once and kept while the session lives
+def test_leader_election(mocker):
+    mock_connect = mocker.patch("app.services.coordination.psycopg2.connect")
+    cursor = mock_connect.return_value.cursor.return_value.__enter__.return_value
+    mock_connect.return_value.closed = 0
+    cursor.fetchone.return_value = (True,)
+    leader = LeaderElection()
+
+    assert leader.is_leader()
+    assert leader.is_leader()
+
+    assert [c.args[0] for c in cursor.execute.call_args_list] == ["SELECT pg_try_advisory_lock(%s);", "SELECT 1;"]
+    mock_connect.assert_called_once()
+
+# Test that a lost session gives up leadership until the lock is taken again
+def test_leader_election_connection_lost(mocker):
+    mock_connect = mocker.patch("app.services.coordination.psycopg2.connect")
+    cursor = mock_connect.return_value.cursor.return_value.__enter__.return_value
+    mock_connect.return_value.closed = 0
+    cursor.fetchone.return_value = (True,)
+    leader = LeaderElection()
+    assert leader.is_leader()
+
+    cursor.execute.side_effect = psycopg2.OperationalError("server closed the connection")
+    assert not leader.is_leader()
+
+    cursor.execute.side_effect = None
+    cursor.fetchone.return_value = (False,)  # Another worker took over
+    assert not leader.is_leader()
+    assert mock_connect.call_count == 2
+
+# Test that notifications from other workers reach the handler and our own are skipped
+def test_listener_skips_own_updates():
+    on_update = MagicMock()
+    listener = PriceUpdateListener("fuel_price_updates", on_update=on_update)
+
+    listener.handle(json.dumps({"worker": WORKER_ID, "date": "2025-01-01"}))
+    listener.handle(json.dumps({"worker": "other:1", "date": "2025-01-01"}))
+
+    on_update.assert_called_once_with({"worker": "other:1", "date": "2025-01-01"})
+    assert listener.received == 1
+
+# Test that an update drops the price cache and applies the notified day to a loaded store
+def test_invalidate_prices(mocker):
+    mock_cache = mocker.patch.object(coordination, "price_cache")
+    store = ColumnarPriceStore()
+    store.ensure_loaded(lambda: iter([("ptt", "Diesel", date(2025, 1, 1), Decimal("30.25"))]))
+    mocker.patch.object(history_service, "price_store", store)
+    service = get_history_service()
+    mocker.patch.object(service, "db_context")
+    mock_series = mocker.patch.object(service.history_repo, "get_price_series", return_value=[
+        (date(2025, 1, 2), "ptt", "Diesel", Decimal("30.55")),
+        (date(2025, 1, 2), "bcp", "Diesel", Decimal("30.45")),
+    ])
+    mock_load = mocker.patch.object(service.history_repo, "get_all_prices")
+
+    coordination.invalidate_prices({"worker": "other:1", "date": "2025-01-02"})
+
+    mock_cache.invalidate.assert_called_once()
+    mock_series.assert_called_once_with(date(2025, 1, 2), date(2025, 1, 2))
+    mock_load.assert_not_called()
+    assert store.loaded and store.rows == 3
+    assert store.latest_date() == date(2025, 1, 2)
+
+    # Without a day, after a reconnect, the store is reloaded here rather than by the next request
+    mock_load.return_value = iter([("ptt", "Diesel", date(2025, 1, 3), Decimal("30.75"))])
+    coordination.invalidate_prices({})
+    assert store.loaded and store.rows == 1
+
+# Test that a failing update is logged and the listener keeps going
+def test_listener_update_error():
+    on_update = MagicMock(side_effect=[RuntimeError("connection refused"), None])
+    listener = PriceUpdateListener("fuel_price_updates", on_update=on_update)
+
+    listener.handle(json.dumps({"worker": "other:1", "date": "2025-01-01"}))
+    listener.handle(json.dumps({"worker": "other:1", "date": "2025-01-02"}))
+
+    assert on_update.call_count == 2
+    assert listener.received == 2
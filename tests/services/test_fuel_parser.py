@@ -0,0 +1,95 @@
+import pytest
+from app.services.fuel_parser import (
+    extract_fuel_tuples, lxml_available, parse_fuel_page, parse_fuel_page_partial, resolve_parser_backend)
+from app.services.sources import KapookSource
+
+HTML_CONTENT = '''
+<article class="gasprice ptt">
+    <header><h3>ptt</h3></header>
+    <ul>
+        <li><span>Diesel</span><em>30.25</em></li>
+        <li><span>Gasoline</span><em> 33.50</em></li>
+    </ul>
+</article>
+<article class="gasprice pt">
+    <ul>
+        <li><span>Diesel</span><em>30.00</em></li>
+    </ul>
+</article>
+'''
+
+# Test parsing several providers from one pass
+def test_parse_fuel_page_multiple_providers():
+    result = parse_fuel_page(HTML_CONTENT, {"ptt": "gasprice ptt", "pt": "gasprice pt"})
+
+    assert result == {
+        "ptt": [
+            {"provider": "ptt", "type": "Diesel", "price": 30.25},
+            {"provider": "ptt", "type": "Gasoline", "price": 33.50}
+        ],
+        "pt": [
+            {"provider": "pt", "type": "Diesel", "price": 30.00}
+        ]
+    }
+
+# Test that bytes are accepted like the response content from requests
+def test_parse_fuel_page_bytes():
+    result = parse_fuel_page(HTML_CONTENT.encode('utf-8'), {"pt": "gasprice pt"})
+
+    assert result["pt"] == [{"provider": "pt", "type": "Diesel", "price": 30.00}]
+
+# Test a missing provider article
+def test_parse_fuel_page_missing_provider():
+    with pytest.raises(ValueError, match="No article found with class name gasprice shell"):
+        parse_fuel_page(HTML_CONTENT, {"shell": "gasprice shell"})
+
+# Test that a missing provider doesn't lose the others
+def test_parse_fuel_page_partial():
+    parsed, errors = parse_fuel_page_partial(
+        HTML_CONTENT, {"ptt": "gasprice ptt", "shell": "gasprice shell", "pt": "gasprice pt"})
+
+    assert list(parsed) == ["ptt", "pt"]
+    assert parsed["pt"] == [{"provider": "pt", "type": "Diesel", "price": 30.00}]
+    assert errors == {"shell": "No article found with class name gasprice shell"}
+
+# Test all configured providers against the sample page
+def test_parse_fuel_page_sample_html():
+    with open('./raw/gasprice.html', 'r', encoding='utf-8') as file:
+        html_content = file.read()
+
+    result = parse_fuel_page(html_content, KapookSource.class_map)
+
+    assert list(result) == list(KapookSource.class_map)
+    assert result["ptt"][0] == {"provider": "ptt", "type": "แก๊สโซฮอล์ 95", "price": 35.35}
+    assert len(result["susco"]) == 6
+
+# Backends available in this environment, lxml is optional
+BACKENDS = ['htmlparser', 'regex', 'bs4'] + (['lxml'] if lxml_available() else [])
+
+# Test that every backend returns identical records for the sample page
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backend_parity_sample_html(backend):
+    with open('./raw/gasprice.html', 'r', encoding='utf-8') as file:
+        html_content = file.read()
+
+    expected = extract_fuel_tuples(html_content, KapookSource.class_map, 'bs4')
+    result = extract_fuel_tuples(html_content, KapookSource.class_map, backend)
+
+    assert result == expected
+
+# Test that every backend returns identical records for the inline snippet
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backend_parity_snippet(backend):
+    class_map = {"ptt": "gasprice ptt", "pt": "gasprice pt"}
+
+    result = parse_fuel_page(HTML_CONTENT, class_map, backend)
+
+    assert result == parse_fuel_page(HTML_CONTENT, class_map, 'htmlparser')
+
+# Test backend name resolution
+def test_resolve_parser_backend():
+    assert resolve_parser_backend('regex') == 'regex'
+    assert resolve_parser_backend('auto') in ('lxml', 'htmlparser')
+
+    with pytest.raises(ValueError, match="Unknown fuel parser backend"):
+        resolve_parser_backend('selectolax')
@@ -1,30 +1,37 @@
 import pytest
-from unittest.mock import call, patch, MagicMock, mock_open
-from app.services.fuel_service import FuelDataService
+from unittest.mock import ANY, AsyncMock, call, patch, MagicMock, mock_open
+from app.services.sources import HostRateLimiter, KapookSource
+from datetime import date
+from app.services.fuel_service import FuelDataService, ScrapeReport
+from app.services.page_fetcher import FetchResult
+from app.services.price_cache import price_cache, price_key
 
 # Mocking external dependencies
 @pytest.fixture
 def mock_fuel_service():
     with patch("app.services.fuel_service.DatabaseContext") as MockDBContext, \
          patch("app.services.fuel_service.FuelRepository") as MockFuelRepo, \
-         patch("app.services.fuel_service.requests.get") as MockRequestsGet:
+         patch("app.services.sources.PageFetcher") as MockPageFetcher:
         
         # Setup Mock Database and Repo
         mock_db = MockDBContext.return_value
         mock_repo = MockFuelRepo.return_value
+        mock_fetcher = MockPageFetcher.return_value
+        mock_repo.get_stored_providers.return_value = set()
+        mock_db.fetchone.return_value = (False,)  # No fuel_prices history to summarize
         
         # Create an instance of the service
         service = FuelDataService()
-        yield service, mock_db, mock_repo, MockRequestsGet
+        yield service, mock_db, mock_repo, mock_fetcher
 
 # Test when debug=True (mock file read operation)
 @patch("builtins.open", new_callable=mock_open, read_data="<html>Sample HTML file content</html>")
-@patch("app.services.fuel_service.debug", True)  # Mock the debug flag
+@patch("app.services.sources.debug", True)  # Mock the debug flag
 def test_fetch_data_debug_true(mock_file, mock_fuel_service):
     service, _, _, _ = mock_fuel_service  # Get the service instance from the fixture
 
-    # Call the fetch_data method
-    result = service.fetch_data()
+    # Call the source's fetch method
+    result = service.sources[0].fetch()
 
     # Check that the file open method was called with the correct path
     mock_file.assert_called_once_with('./raw/gasprice.html', 'r', encoding='utf-8')
@@ -33,26 +40,25 @@ def test_fetch_data_debug_true(mock_file, mock_fuel_service):
     assert result == "<html>Sample HTML file content</html>"
 
 # Test when debug=False (mock network request)
-@patch("app.services.fuel_service.debug", False)  # Mock the debug flag
+@patch("app.services.sources.debug", False)  # Mock the debug flag
 def test_fetch_data_debug_false(mock_fuel_service):
-    service, _, _, mock_requests_get = mock_fuel_service  # Get the service and mocks from the fixture
+    service, _, _, mock_fetcher = mock_fuel_service  # Get the service and mocks from the fixture
 
     # Mock a successful network response
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.content = b"<html>Sample HTML content from URL</html>"
-    mock_requests_get.return_value = mock_response
+    mock_fetcher.fetch.return_value = FetchResult(b"<html>Sample HTML content from URL</html>", True, 200)
 
     # Call the fetch_data method
-    result = service.fetch_data()
+    result = service.sources[0].fetch()
 
-    # Ensure requests.get was called with the correct URL
-    mock_requests_get.assert_called_once_with(service.url)
+    # Ensure the page was fetched through the cached fetcher
+    mock_fetcher.fetch.assert_called_once_with()
 
     # Validate the content returned from the method
-    assert result == b"<html>Sample HTML content from URL</html>"
+    assert result == "<html>Sample HTML content from URL</html>"
+    assert service.sources[0].last_fetch.changed
 
 # Test the fetch_data method
+@patch("app.services.sources.debug", False)  # Mock the debug flag
 def test_fetch_data_success(mock_fuel_service):
     # Checking for common HTML elements
     def is_html(s):
@@ -61,34 +67,29 @@ def test_fetch_data_success(mock_fuel_service):
             if element in s:
                 return True
         return False
-    service, _, _, mock_requests_get = mock_fuel_service
+    service, _, _, mock_fetcher = mock_fuel_service
 
     # Mock a successful response
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.content = b"<html>Sample HTML content</html>"
-    mock_requests_get.return_value = mock_response
+    mock_fetcher.fetch.return_value = FetchResult(b"<html>Sample HTML content</html>", True, 200)
 
-    result = service.fetch_data()
+    result = service.sources[0].fetch()
 
     assert is_html(result)
 
 # Test when debug=False with a failure in the network request
-@patch("app.services.fuel_service.debug", False)  # Mock the debug flag
+@patch("app.services.sources.debug", False)  # Mock the debug flag
 def test_fetch_data_debug_false_failure(mock_fuel_service):
-    service, _, _, mock_requests_get = mock_fuel_service  # Get the service and mocks from the fixture
+    service, _, _, mock_fetcher = mock_fuel_service  # Get the service and mocks from the fixture
 
     # Mock a failed network response
-    mock_response = MagicMock()
-    mock_response.status_code = 404
-    mock_requests_get.return_value = mock_response
+    mock_fetcher.fetch.side_effect = Exception(f"Failed to load page {service.sources[0].url}")
 
     # Expect an exception to be raised due to the failed request
     with pytest.raises(Exception, match="Failed to load page"):
-        service.fetch_data()
+        service.sources[0].fetch()
 
-    # Ensure requests.get was called
-    mock_requests_get.assert_called_once_with(service.url)
+    # Ensure the fetch was attempted
+    mock_fetcher.fetch.assert_called_once_with()
 
 # Test the parse_fuel_data method
 def test_parse_fuel_data(mock_fuel_service):
@@ -105,7 +106,9 @@ def test_parse_fuel_data(mock_fuel_service):
     '''
     
     # Call the method
-    result = service.parse_fuel_data(html_content, "gasprice ptt", "ptt")
+    source = service.sources[0]
+    source.class_map = {"ptt": "gasprice ptt"}
+    result = source.parse(html_content)["ptt"]
 
     # Expected result
     expected_result = [
@@ -126,17 +129,18 @@ def test_save_fuel_data(mock_fuel_service):
     ]
 
     # Call the method
-    service.save_fuel_data(fuel_data, "ptt")
+    service.save_fuel_data(fuel_data)
 
     # Ensure the repo's insert_fuel_data was called with the correct arguments
-    mock_repo.insert_fuel_data.assert_called_once_with(fuel_data, "ptt")
+    mock_repo.insert_fuel_data.assert_called_once_with(fuel_data, None)
 
 # Test the run method (end-to-end test with mocked dependencies)
-@patch("app.services.fuel_service.debug", False)  # Ensure debug=False
+@patch("app.services.sources.debug", False)  # Ensure debug=False
 def test_run(mock_fuel_service, mocker):
-    service, mock_db, mock_repo, mock_requests_get = mock_fuel_service
+    service, mock_db, mock_repo, _ = mock_fuel_service
+    source = service.sources[0]
 
-    # Mock fetch_data
+    # Mock the source fetch
     html_content = b'''
     <article class="gasprice ptt">
         <ul>
@@ -145,14 +149,15 @@ def test_run(mock_fuel_service, mocker):
         </ul>
     </article>
     '''
-    mocker.patch.object(service, 'fetch_data', return_value=html_content)
+    mocker.patch.object(source, 'fetch', return_value=html_content)
 
-    # Mock parse_fuel_data
+    # Mock the source parse
     fuel_data = [
         {"provider": "ptt", "type": "Diesel", "price": 30.25},
         {"provider": "ptt", "type": "Gasoline", "price": 33.50}
     ]
-    mocker.patch.object(service, 'parse_fuel_data', return_value=fuel_data)
+    parsed = {provider: fuel_data for provider in source.class_map}
+    mock_parse = mocker.patch.object(source, 'parse_partial', return_value=(parsed, {}))
 
     # Call the run method
     result = service.run()
@@ -163,17 +168,240 @@ def test_run(mock_fuel_service, mocker):
     # Verify that the fuel table creation method was called
     mock_repo.create_fuel_table.assert_called_once()
 
-    # Verify that the insert method was called with the expected parsed data
-    expected_calls = [
-        call(fuel_data, "ptt"),
-        call(fuel_data, "bcp"),
-        call(fuel_data, "shell"),
-        call(fuel_data, "esso"),
-        call(fuel_data, "caltex"),
-        call(fuel_data, "pt"),
-        call(fuel_data, "susco"),
-    ]
-    mock_repo.insert_fuel_data.assert_has_calls(expected_calls)
+    # Verify that the page was parsed once for all providers
+    mock_parse.assert_called_once_with(html_content)
+
+    # Verify that all providers were inserted with a single batched call
+    mock_repo.insert_fuel_data.assert_called_once_with(fuel_data * len(source.class_map), ANY)
 
     # Check that the final result matches the expected data
-    assert len(result) == 14
\ No newline at end of file
+    assert len(result) == 14
+
+# Test that a run crossing midnight writes everything on the report's date, not the current one
+def test_store_fuel_data_report_date(mock_fuel_service, mocker):
+    service, mock_db, mock_repo, _ = mock_fuel_service
+    source = service.sources[0]
+    fuel_data = [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    report = ScrapeReport("2024-01-31")
+    mock_apply = mocker.patch("app.services.fuel_service.price_store.apply")
+
+    service.store_fuel_data(report, [(source, {"ptt": fuel_data}, {})])
+
+    mock_repo.get_stored_providers.assert_called_once_with("2024-01-31")
+    mock_repo.insert_fuel_data.assert_called_once_with(fuel_data, "2024-01-31")
+    mock_apply.assert_called_once_with(date(2024, 1, 31), fuel_data)
+
+# Test that a failure after the insert leaves the whole write to roll back, without publishing it
+def test_store_fuel_data_rolls_back(mock_fuel_service, mocker):
+    service, mock_db, mock_repo, _ = mock_fuel_service
+    source = service.sources[0]
+    fuel_data = [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    mocker.patch.object(service.summary_repo, 'refresh_summary', side_effect=RuntimeError("deadlock"))
+    mock_apply = mocker.patch("app.services.fuel_service.price_store.apply")
+
+    with pytest.raises(RuntimeError, match="deadlock"):
+        service.store_fuel_data(ScrapeReport("2024-01-31"), [(source, {"ptt": fuel_data}, {})])
+
+    mock_repo.insert_fuel_data.assert_called_once()
+    exc_type = mock_db.transaction.return_value.__exit__.call_args.args[0]
+    assert exc_type is RuntimeError
+    mock_apply.assert_not_called()
+
+# Test the async fetch through the cached fetcher
+@pytest.mark.asyncio
+@patch("app.services.sources.debug", False)  # Ensure debug=False
+async def test_fetch_data_async(mock_fuel_service):
+    service, _, _, mock_fetcher = mock_fuel_service
+
+    mock_fetcher.fetch_async = AsyncMock(
+        return_value=FetchResult(b"<html>Sample HTML content from URL</html>", True, 200))
+
+    result = await service.sources[0].fetch_async()
+
+    mock_fetcher.fetch_async.assert_awaited_once_with()
+    assert result == "<html>Sample HTML content from URL</html>"
+
+# Test that an unchanged page already stored today skips parsing and writes
+@patch("app.services.sources.debug", False)  # Ensure debug=False
+def test_run_unchanged_page(mock_fuel_service, mocker):
+    service, mock_db, mock_repo, mock_fetcher = mock_fuel_service
+
+    mock_fetcher.fetch.return_value = FetchResult(b"<html></html>", False, 304)
+    mock_fetcher.is_stored.return_value = True
+    mock_parse = mocker.patch.object(service.sources[0], 'parse_partial')
+
+    result = service.run()
+
+    assert result == []
+    mock_parse.assert_not_called()
+    mock_db.connect.assert_not_called()
+    mock_repo.insert_fuel_data.assert_not_called()
+
+# Test that an unchanged page not yet stored today is still written
+@patch("app.services.sources.debug", False)  # Ensure debug=False
+def test_run_unchanged_page_new_day(mock_fuel_service, mocker):
+    service, _, mock_repo, mock_fetcher = mock_fuel_service
+
+    mock_fetcher.fetch.return_value = FetchResult(b"<html></html>", False, 304)
+    mock_fetcher.is_stored.return_value = False
+    fuel_data = [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    mocker.patch.object(service.sources[0], 'parse_partial', return_value=({"ptt": fuel_data}, {}))
+    price_cache.set(price_key(("Diesel",)), [])
+
+    result = service.run()
+
+    assert result == fuel_data
+    mock_repo.insert_fuel_data.assert_called_once_with(fuel_data, ANY)
+    mock_fetcher.mark_stored.assert_called_once()
+
+    # Verify that cached price reads were invalidated by the write
+    assert price_cache.get(price_key(("Diesel",))) is None
+
+# Test the async run method with parsing on the default thread pool
+@pytest.mark.asyncio
+@patch("app.services.fuel_service.get_parse_executor", return_value=None)
+async def test_run_async(_, mock_fuel_service, mocker):
+    service, mock_db, mock_repo, _ = mock_fuel_service
+
+    html_content = b'''
+    <article class="gasprice ptt">
+        <ul>
+            <li><span>Diesel</span><em>30.25</em></li>
+        </ul>
+    </article>
+    '''
+    source = service.sources[0]
+    mocker.patch.object(source, 'fetch_async', AsyncMock(return_value=html_content))
+    mocker.patch.object(source, 'class_map', {"ptt": "gasprice ptt"})
+
+    result = await service.run_async()
+
+    expected = [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    assert result == expected
+    mock_repo.create_fuel_table.assert_called_once()
+    mock_repo.insert_fuel_data.assert_called_once_with(expected, ANY)
+    mock_db.connect.assert_called_once()
+    mock_db.close.assert_called_once()
+    assert service.source_timings["kapook"]["status"] == "done"
+    assert service.source_timings["kapook"]["rows"] == 1
+
+# Test that several sources are scraped concurrently and written as one batch
+@pytest.mark.asyncio
+@patch("app.services.fuel_service.get_parse_executor", return_value=None)
+async def test_run_async_multiple_sources(_, mock_fuel_service, mocker):
+    service, _, mock_repo, _ = mock_fuel_service
+
+    html_content = '''
+    <article class="gasprice ptt"><ul><li><span>Diesel</span><em>30.25</em></li></ul></article>
+    <article class="gasprice bcp"><ul><li><span>Diesel</span><em>30.55</em></li></ul></article>
+    '''
+    first, second = KapookSource(), KapookSource()
+    first.class_map = {"ptt": "gasprice ptt"}
+    second.class_map = {"bcp": "gasprice bcp"}
+    second.name = "second"
+    for source in (first, second):
+        mocker.patch.object(source, 'fetch_async', AsyncMock(return_value=html_content))
+    service.sources = [first, second]
+    service.rate_limiter = HostRateLimiter(0)
+
+    result = await service.run_async()
+
+    assert result == [
+        {"provider": "ptt", "type": "Diesel", "price": 30.25},
+        {"provider": "bcp", "type": "Diesel", "price": 30.55}
+    ]
+    mock_repo.insert_fuel_data.assert_called_once_with(result, ANY)
+    assert set(service.source_timings) == {"kapook", "second"}
+    assert "fetch_ms" in service.source_timings["second"]
+
+# Test that a provider failing to parse doesn't stop the others, and its page is parsed again next run
+@patch("app.services.sources.debug", False)  # Ensure debug=False
+def test_run_partial_failure(mock_fuel_service, mocker):
+    service, mock_db, mock_repo, mock_fetcher = mock_fuel_service
+    source = service.sources[0]
+
+    html_content = '''
+    <article class="gasprice ptt"><ul><li><span>Diesel</span><em>30.25</em></li></ul></article>
+    <article class="gasprice bcp"><ul><li><span>Diesel</span><em>30.55</em></li></ul></article>
+    '''
+    mocker.patch.object(source, 'fetch', return_value=html_content)
+    mocker.patch.object(source, 'class_map', {"ptt": "gasprice ptt", "shell": "gasprice shell", "bcp": "gasprice bcp"})
+    mock_repo.get_stored_providers.return_value = {"bcp"}  # Stored by an earlier run today
+
+    result = service.run()
+
+    assert result == [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    mock_repo.insert_fuel_data.assert_called_once_with(result, ANY)
+    report = service.last_report
+    assert report.counts() == {"done": 1, "skipped": 1, "failed": 1}
+    assert report.providers["kapook"]["shell"]["error"] == "No article found with class name gasprice shell"
+    query, rows = mock_db.execute_values.call_args.args
+    assert "fuel_scrape_checkpoints" in query
+    assert sorted(row[2:4] for row in rows) == [("ptt", "done"), ("shell", "failed")]
+    mock_fetcher.mark_stored.assert_not_called()
+
+# Test that a rerun with every provider stored writes nothing
+@patch("app.services.sources.debug", False)  # Ensure debug=False
+def test_run_resume_all_stored(mock_fuel_service, mocker):
+    service, _, mock_repo, _ = mock_fuel_service
+    source = service.sources[0]
+    fuel_data = [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    mocker.patch.object(source, 'fetch', return_value="<html></html>")
+    mock_mark_stored = mocker.patch.object(source, 'mark_stored')
+    mocker.patch.object(source, 'parse_partial', return_value=({"ptt": fuel_data}, {}))
+    mock_repo.get_stored_providers.return_value = {"ptt"}
+
+    assert service.run() == []
+
+    mock_repo.insert_fuel_data.assert_not_called()
+    assert service.last_report.counts() == {"done": 0, "skipped": 1, "failed": 0}
+    mock_mark_stored.assert_called_once()
+
+# Test that the stored check and the insert run under the store lock and other workers are notified
+@patch("app.services.sources.debug", False)  # Ensure debug=False
+def test_run_holds_store_lock(mock_fuel_service, mocker):
+    service, mock_db, mock_repo, _ = mock_fuel_service
+    source = service.sources[0]
+    fuel_data = [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    mocker.patch.object(source, 'fetch', return_value="<html></html>")
+    mocker.patch.object(source, 'parse_partial', return_value=({"ptt": fuel_data}, {}))
+    events = []
+    mock_db.fetchone.side_effect = lambda query, params=None: events.append(query.split("(")[0]) or (False,)
+    mock_repo.get_stored_providers.side_effect = lambda date: events.append("stored") or set()
+    mock_repo.insert_fuel_data.side_effect = lambda rows, date: events.append("insert") or len(rows)
+    mock_db.transaction.return_value.__enter__.side_effect = lambda: events.append("begin")
+    mock_db.transaction.return_value.__exit__.side_effect = lambda *exc: events.append("commit")
+
+    assert service.run() == fuel_data
+
+    assert events == ["SELECT to_regclass", "SELECT pg_advisory_lock", "begin", "stored", "insert", "commit",
+                      "SELECT pg_advisory_unlock"]
+    query, (channel, payload) = mock_db.execute.call_args_list[-1].args
+    assert query == "SELECT pg_notify(%s, %s);" and channel == "fuel_price_updates"
+    assert '"date": "%s"' % service.last_report.date in payload
+
+# Test that a failing source is reported while the others are stored, and all failing raises
+@pytest.mark.asyncio
+@patch("app.services.fuel_service.get_parse_executor", return_value=None)
+async def test_run_async_source_failure(_, mock_fuel_service, mocker):
+    service, _, mock_repo, _ = mock_fuel_service
+
+    html_content = '<article class="gasprice ptt"><ul><li><span>Diesel</span><em>30.25</em></li></ul></article>'
+    first, second = KapookSource(), KapookSource()
+    first.class_map = {"ptt": "gasprice ptt"}
+    second.name = "second"
+    mocker.patch.object(first, 'fetch_async', AsyncMock(return_value=html_content))
+    mocker.patch.object(second, 'fetch_async', AsyncMock(side_effect=RuntimeError("timed out")))
+    service.sources = [first, second]
+    service.rate_limiter = HostRateLimiter(0)
+
+    result = await service.run_async()
+
+    assert result == [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    assert service.source_timings["second"]["status"] == "failed"
+    assert service.source_timings["second"]["error"] == "timed out"
+
+    service.sources = [second]
+    with pytest.raises(RuntimeError, match="timed out"):
+        await service.run_async()
+    mock_repo.insert_fuel_data.assert_called_once()
@@ -0,0 +1,72 @@
+import httpx
+import pytest
+from app.services.page_fetcher import PageFetcher
+
+URL = "https://example.com/gasprice.php"
+
+def make_fetcher(tmp_path, handler):
+    fetcher = PageFetcher(URL, str(tmp_path))
+    fetcher.client = httpx.Client(transport=httpx.MockTransport(handler))
+    return fetcher
+
+# Test that ETag/Last-Modified are sent back and a 304 serves the cached body
+def test_fetch_revalidates_with_validators(tmp_path):
+    seen_headers = []
+
+    def handler(request):
+        seen_headers.append(request.headers)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=b"<html>v1</html>",
+                              headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    fetcher = make_fetcher(tmp_path, handler)
+    first = fetcher.fetch()
+    second = fetcher.fetch()
+
+    assert first.changed and first.content == b"<html>v1</html>"
+    assert not second.changed and second.status == 304
+    assert second.content == b"<html>v1</html>"
+    assert seen_headers[1]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert fetcher.stats["not_modified"] == 1
+    assert fetcher.stats["bytes_saved"] == len(b"<html>v1</html>")
+
+# Test that identical content without validators is detected by hash
+def test_fetch_content_hash_short_circuit(tmp_path):
+    fetcher = make_fetcher(tmp_path, lambda request: httpx.Response(200, content=b"<html>same</html>"))
+
+    assert fetcher.fetch().changed
+    assert not fetcher.fetch().changed
+    assert fetcher.stats["hits"] == 1
+    assert fetcher.stats["misses"] == 1
+
+# Test that the cached body, validators and stored date survive a restart
+def test_cache_survives_restart(tmp_path):
+    fetcher = make_fetcher(tmp_path, lambda request: httpx.Response(200, content=b"<html>v1</html>", headers={"ETag": '"v1"'}))
+    fetcher.fetch()
+    fetcher.mark_stored("2024-01-01")
+
+    restarted = make_fetcher(tmp_path, lambda request: httpx.Response(304))
+    result = restarted.fetch()
+
+    assert result.content == b"<html>v1</html>"
+    assert not result.changed
+    assert restarted.is_stored("2024-01-01")
+    assert not restarted.is_stored("2024-01-02")
+
+# Test that changed content resets the stored date
+def test_changed_content_is_not_stored(tmp_path):
+    bodies = iter([b"<html>v1</html>", b"<html>v2</html>"])
+    fetcher = make_fetcher(tmp_path, lambda request: httpx.Response(200, content=next(bodies)))
+    fetcher.fetch()
+    fetcher.mark_stored("2024-01-01")
+
+    assert fetcher.fetch().changed
+    assert not fetcher.is_stored("2024-01-01")
+
+# Test that failed responses raise
+def test_fetch_failure(tmp_path):
+    fetcher = make_fetcher(tmp_path, lambda request: httpx.Response(404))
+
+    with pytest.raises(Exception, match="Failed to load page"):
+        fetcher.fetch()
@@ -0,0 +1,77 @@
+from unittest.mock import MagicMock, patch
+from app.services.price_cache import PriceCache, price_key
+from app.services.price_service import PriceService
+
+# Test read-through loading and hits
+def test_get_or_load_reads_through_once():
+    cache = PriceCache(ttl=60)
+    loader = MagicMock(return_value=[("ptt", "Diesel", 30.25)])
+
+    first = cache.get_or_load(("2024-01-01", ("Diesel",)), loader)
+    second = cache.get_or_load(("2024-01-01", ("Diesel",)), loader)
+
+    loader.assert_called_once()
+    assert first is second
+    assert cache.stats["hits"] == 1
+
+# Test that entries expire after the TTL
+def test_entries_expire():
+    cache = PriceCache(ttl=0)
+    cache.set(("2024-01-01", ("Diesel",)), [])
+
+    assert cache.get(("2024-01-01", ("Diesel",))) is None
+
+# Test explicit invalidation
+def test_invalidate():
+    cache = PriceCache(ttl=60)
+    cache.set(("2024-01-01", ("Diesel",)), [])
+
+    cache.invalidate()
+
+    assert cache.get(("2024-01-01", ("Diesel",))) is None
+
+# Test that rows loaded before an invalidation are served once but not cached
+def test_load_racing_invalidate_is_not_cached():
+    cache = PriceCache(ttl=60)
+    key = ("2024-01-01", ("Diesel",))
+
+    def stale_loader():
+        cache.invalidate()  # A scrape commits while the query runs
+        return [("ptt", "Diesel", 30.25)]
+
+    entry = cache.get_or_load(key, stale_loader)
+
+    assert entry.rows == [("ptt", "Diesel", 30.25)]
+    assert cache.get(key) is None
+    fresh = cache.get_or_load(key, MagicMock(return_value=[("ptt", "Diesel", 30.55)]))
+    assert cache.get(key) is fresh
+
+# Test that the ETag follows the rows
+def test_etag_changes_with_rows():
+    cache = PriceCache(ttl=60)
+    key = ("2024-01-01", ("Diesel",))
+
+    first = cache.set(key, [("ptt", "Diesel", 30.25)])
+    same = cache.set(key, [("ptt", "Diesel", 30.25)])
+    changed = cache.set(key, [("ptt", "Diesel", 31.00)])
+
+    assert first.etag == same.etag
+    assert first.etag != changed.etag
+
+# Test that the price service only hits the database on a miss
+def test_price_service_reads_through_cache():
+    with patch("app.services.price_service.DatabaseContext") as MockDBContext, \
+         patch("app.services.price_service.FuelRepository") as MockFuelRepo:
+        mock_db = MockDBContext.return_value
+        mock_repo = MockFuelRepo.return_value
+        mock_repo.get_fuel_prices.return_value = [("ptt", "Diesel", 30.25)]
+        service = PriceService()
+
+        assert service.get_cached_fuel_prices(("Diesel",)) is None
+        first = service.get_fuel_prices(("Diesel",))
+        second = service.get_fuel_prices(("Diesel",))
+
+        assert first.rows == second.rows == [("ptt", "Diesel", 30.25)]
+        mock_repo.get_fuel_prices.assert_called_once_with(("Diesel",), price_key(("Diesel",))[0])
+        mock_db.connect.assert_called_once()
+        mock_db.close.assert_called_once()
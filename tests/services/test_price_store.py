@@ -0,0 +1,107 @@
+import datetime
+from decimal import Decimal
+import pytest
+from app.services.price_store import ColumnarPriceStore
+
+ROWS = [
+    ("bcp", "Diesel", datetime.date(2024, 1, 1), Decimal("30.55")),
+    ("bcp", "Diesel", datetime.date(2024, 1, 2), Decimal("30.85")),
+    ("ptt", "Diesel", datetime.date(2024, 1, 1), Decimal("30.25")),
+    ("ptt", "Diesel", datetime.date(2024, 1, 2), Decimal("30.00")),
+    ("ptt", "Gasohol 95", datetime.date(2024, 1, 2), Decimal("38.15")),
+]
+
+@pytest.fixture
+def store():
+    store = ColumnarPriceStore()
+    store.ensure_loaded(lambda: iter(ROWS))
+    return store
+
+# Test that names are dictionary-encoded and prices kept as int32 cents
+def test_load(store):
+    assert store.providers == ["bcp", "ptt"]
+    assert store.types == ["Diesel", "Gasohol 95"]
+    assert store.rows == 5
+    assert list(store.series[(1, 0)].prices) == [3025, 3000]
+    assert store.nbytes() == 5 * 4 * 2
+
+    store.ensure_loaded(lambda: pytest.fail("loaded twice"))
+
+# Test stats against the SQL query's semantics
+def test_stats(store):
+    assert store.stats(datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), "Diesel") == [
+        ("bcp", "Diesel", Decimal("30.55"), Decimal("30.85"), Decimal("30.70"), 2),
+        ("ptt", "Diesel", Decimal("30.00"), Decimal("30.25"), Decimal("30.13"), 2),
+    ]
+    assert store.stats(datetime.date(2024, 1, 2), datetime.date(2024, 1, 2))[2] == (
+        "ptt", "Gasohol 95", Decimal("38.15"), Decimal("38.15"), Decimal("38.15"), 1)
+    assert store.stats(datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), "LPG") == []
+
+# Test rankings and spreads on a date
+def test_rankings_and_spreads(store):
+    day = datetime.date(2024, 1, 2)
+
+    assert store.latest_date() == day
+    assert store.rankings(day, "Diesel") == [("ptt", Decimal("30.00")), ("bcp", Decimal("30.85"))]
+    assert store.rankings(datetime.date(2024, 1, 3), "Diesel") == []
+    assert store.spreads(day) == [
+        ("Diesel", "ptt", Decimal("30.00"), "bcp", Decimal("30.85"), Decimal("0.85")),
+        ("Gasohol 95", "ptt", Decimal("38.15"), "ptt", Decimal("38.15"), Decimal("0.00")),
+    ]
+
+# Test incremental updates after a scrape
+def test_apply(store):
+    store.apply(datetime.date(2024, 1, 3), [{"provider": "shell", "type": "Diesel", "price": 31.05}])
+    store.apply(datetime.date(2024, 1, 2), [{"provider": "ptt", "type": "Diesel", "price": 99.0}])
+    store.apply(datetime.date(2023, 12, 31), [{"provider": "ptt", "type": "Diesel", "price": 30.5}])
+
+    assert store.rows == 7
+    assert store.rankings(datetime.date(2024, 1, 3), "Diesel") == [("shell", Decimal("31.05"))]
+    assert list(store.series[(1, 0)].prices) == [3050, 3025, 3000]
+
+# Test that an unloaded store ignores updates, and an invalidated one is served until it reloads
+def test_apply_unloaded():
+    store = ColumnarPriceStore()
+    store.apply(datetime.date(2024, 1, 3), [{"provider": "shell", "type": "Diesel", "price": 31.05}])
+    assert store.rows == 0
+
+    store.ensure_loaded(lambda: iter(ROWS))
+    store.invalidate()
+
+    assert not store.loaded and store.rows == 5
+    assert store.latest_date() == datetime.date(2024, 1, 2)
+
+    store.ensure_loaded(lambda: iter(ROWS[:2]))
+    assert store.loaded and store.providers == ["bcp"] and store.rows == 2
+
+# Test that a scrape applied while the store loads ends up in the loaded copy
+def test_apply_while_loading():
+    store = ColumnarPriceStore()
+
+    def loader():
+        # Committed after the loader's query ran, so missing from its rows
+        store.apply(datetime.date(2024, 1, 3), [{"provider": "shell", "type": "Diesel", "price": 31.05}])
+        assert store.rows == 0  # Readers never see a partly loaded store
+        yield from ROWS
+
+    store.ensure_loaded(loader)
+
+    assert store.rows == 6
+    assert store.rankings(datetime.date(2024, 1, 3), "Diesel") == [("shell", Decimal("31.05"))]
+
+# Test that a load overtaken by an invalidation is thrown away and loaded again
+def test_invalidate_while_loading():
+    store = ColumnarPriceStore()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        if len(loads) == 1:
+            store.invalidate()  # A backfill committed while the first load ran
+            return iter(ROWS[:1])
+        return iter(ROWS)
+
+    store.ensure_loaded(loader)
+
+    assert len(loads) == 2
+    assert store.rows == 5
@@ -0,0 +1,49 @@
+import gzip
+import pytest
+from app.services.reprocessor import Reprocessor
+from app.services.sources import KapookSource
+
+@pytest.fixture
+def pages():
+    with open("./raw/gasprice.html", "rb") as file:
+        page = file.read()
+    # Alternate raw and gzipped content
+    return [(f"2024-01-{day:02d}", "kapook", page if day % 2 else gzip.compress(page)) for day in range(1, 8)]
+
+# Test that rows stream back as tuples in input order, inline and on worker processes
+@pytest.mark.parametrize("workers", [0, 2])
+def test_run_ordered(pages, workers):
+    reprocessor = Reprocessor(workers=workers, chunk_size=2, max_pending=2)
+
+    results = list(reprocessor.run(iter(pages), {"kapook": KapookSource().extract_function()}))
+
+    assert [key for key, _ in results] == [key for key, _, _ in pages]
+    assert all(rows == results[0][1] for _, rows in results)
+    assert results[0][1][0] == ("ptt", results[0][1][0][1], results[0][1][0][2])
+    assert reprocessor.stats == {"pages": 7, "rows": 7 * len(results[0][1]), "chunks": 4}
+
+# Test that pages are only read as work units are submitted
+def test_run_lazy(pages):
+    consumed = []
+
+    def page_source():
+        for page in pages:
+            consumed.append(page[0])
+            yield page
+
+    results = Reprocessor(workers=1, chunk_size=1, max_pending=2).run(page_source(), {"kapook": KapookSource().extract_function()})
+    next(results)
+    results.close()
+
+    assert len(consumed) == 2
+
+# Test the generic tuple extraction of a source that only provides records
+def test_records_to_tuples():
+    source = KapookSource()
+    source.class_map = {"ptt": "gasprice ptt"}
+    with open("./raw/gasprice.html", "rb") as file:
+        page = file.read()
+
+    extract = super(KapookSource, source).extract_function()
+
+    assert extract(page) == source.extract_function()(page)
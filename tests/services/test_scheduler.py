@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.errors.handlers import DatabaseException
+from app.services.pipeline import FuelPipeline
+from app.services.scheduler import CronSchedule, PipelineScheduler
+
+# Test daily and stepped schedules
+def test_cron_next_after():
+    assert CronSchedule("0 6 * * *").next_after(datetime(2024, 1, 1, 5, 59, 30)) == datetime(2024, 1, 1, 6, 0)
+    assert CronSchedule("0 6 * * *").next_after(datetime(2024, 1, 1, 6, 0)) == datetime(2024, 1, 2, 6, 0)
+    assert CronSchedule("*/15 * * * *").next_after(datetime(2024, 1, 1, 5, 16)) == datetime(2024, 1, 1, 5, 30)
+    assert CronSchedule("30 23 31 12 *").next_after(datetime(2024, 1, 1)) == datetime(2024, 12, 31, 23, 30)
+
+# Test weekday schedules, 2024-01-06 is a Saturday
+def test_cron_weekdays():
+    assert CronSchedule("0 6 * * 1-5").next_after(datetime(2024, 1, 6, 12, 0)) == datetime(2024, 1, 8, 6, 0)
+    assert CronSchedule("0 6 * * 7").next_after(datetime(2024, 1, 6, 12, 0)) == datetime(2024, 1, 7, 6, 0)
+
+# Test invalid expressions
+@pytest.mark.parametrize("expression", ["0 6 * *", "60 * * * *", "0 6 * 13 *", "5-1 * * * *"])
+def test_cron_invalid(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+# Test retries with exponential backoff until the job succeeds
+@pytest.mark.asyncio
+async def test_run_once_retries(mocker):
+    job = AsyncMock(side_effect=[Exception("timeout"), Exception("timeout"), {"rows": 52}])
+    mock_sleep = mocker.patch("app.services.scheduler.asyncio.sleep", AsyncMock())
+    scheduler = PipelineScheduler("0 6 * * *", job, max_retries=3, backoff=10)
+
+    run = await scheduler.run_once()
+
+    assert run["status"] == "success"
+    assert run["attempts"] == 3
+    assert run["result"] == {"rows": 52}
+    assert [c.args[0] for c in mock_sleep.await_args_list] == [10, 20]
+    assert scheduler.status()["last_run"] is run
+
+# Test that a failing job gives up after the last retry
+@pytest.mark.asyncio
+async def test_run_once_gives_up(mocker):
+    mocker.patch("app.services.scheduler.asyncio.sleep", AsyncMock())
+    scheduler = PipelineScheduler("0 6 * * *", AsyncMock(side_effect=Exception("down")), max_retries=1)
+
+    run = await scheduler.run_once()
+
+    assert run["status"] == "failed"
+    assert run["attempts"] == 2
+    assert run["error"] == "down"
+
+# Test that overlapping runs are skipped
+@pytest.mark.asyncio
+async def test_run_once_single_flight():
+    release = asyncio.Event()
+    calls = []
+
+    async def job():
+        calls.append(1)
+        await release.wait()
+
+    scheduler = PipelineScheduler("0 6 * * *", job)
+
+    first = asyncio.create_task(scheduler.run_once())
+    await asyncio.sleep(0)
+    assert scheduler.status()["running"]
+    assert await scheduler.run_once() is None
+    release.set()
+    await first
+
+    assert len(calls) == 1
+
+# Test that the pipeline alerts only after new rows are stored
+@pytest.mark.asyncio
+async def test_pipeline_run():
+    fuel_service = AsyncMock()
+    alert_service = AsyncMock()
+    fuel_service.run_async.return_value = [{"provider": "ptt", "type": "Diesel", "price": 30.25}]
+    fuel_service.last_report.counts = MagicMock(return_value={"done": 1, "skipped": 6, "failed": 0})
+    alert_service.send_price_change_alert.return_value = 1
+
+    result = await FuelPipeline(fuel_service, alert_service).run()
+
+    assert result["rows"] == 1 and result["changes"] == 1
+    assert result["providers"]["skipped"] == 6
+
+    fuel_service.run_async.side_effect = DatabaseException("Conflict or exist", "Data exists")
+    alert_service.send_price_change_alert.reset_mock()
+
+    result = await FuelPipeline(fuel_service, alert_service).run()
+
+    assert result["rows"] == 0
+    alert_service.send_price_change_alert.assert_not_called()
+
+# Test that a retry after a failed alert still sends it, though the scrape has nothing new
+@pytest.mark.asyncio
+async def test_retry_sends_pending_alert(mocker):
+    mocker.patch("app.services.scheduler.asyncio.sleep", AsyncMock())
+    fuel_service = AsyncMock()
+    alert_service = AsyncMock()
+    fuel_service.run_async.side_effect = [[{"provider": "ptt", "type": "Diesel", "price": 30.25}], []]
+    fuel_service.last_report.counts = MagicMock(return_value={"done": 1, "skipped": 6, "failed": 0})
+    alert_service.send_price_change_alert.side_effect = [Exception("connection reset"), 1]
+    pipeline = FuelPipeline(fuel_service, alert_service)
+    scheduler = PipelineScheduler("0 6 * * *", pipeline.run, max_retries=3, backoff=10)
+
+    run = await scheduler.run_once()
+
+    assert run["status"] == "success" and run["attempts"] == 2
+    assert run["result"]["rows"] == 0 and run["result"]["changes"] == 1
+    assert alert_service.send_price_change_alert.await_count == 2
+    assert pipeline.alert_pending is False
+
+# Test that scheduled runs only happen in the leading worker
+@pytest.mark.asyncio
+async def test_scheduled_run_needs_leadership(mocker):
+    mocker.patch("app.services.scheduler.asyncio.sleep", AsyncMock(side_effect=[None, None, asyncio.CancelledError()]))
+    leader = MagicMock()
+    leader.is_leader.side_effect = [False, True]
+    job = AsyncMock(return_value={"rows": 0})
+    scheduler = PipelineScheduler("* * * * *", job, leader=leader)
+
+    with pytest.raises(asyncio.CancelledError):
+        await scheduler._loop()
+
+    job.assert_awaited_once()
+    assert scheduler.status()["leader"] is True
+    assert scheduler.status()["last_run"]["trigger"] == "schedule"
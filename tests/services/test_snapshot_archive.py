@@ -0,0 +1,50 @@
+import os
+from datetime import datetime
+import gzip
+from app.services.snapshot_archive import SnapshotArchive
+
+# Test that an unchanged page is stored once and indexed once per day
+def test_store_deduplicates(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+
+    first = archive.store("kapook", b"<html>1</html>", fetched_at=datetime(2024, 1, 31, 6, 0))
+    again = archive.store("kapook", b"<html>1</html>", fetched_at=datetime(2024, 1, 31, 12, 0))
+    next_day = archive.store("kapook", b"<html>1</html>", fetched_at=datetime(2024, 2, 1, 6, 0))
+    changed = archive.store("kapook", b"<html>2</html>", fetched_at=datetime(2024, 2, 1, 9, 0))
+
+    assert first == again == next_day != changed
+    assert len(os.listdir(tmp_path / "objects" / first[:2])) >= 1
+    assert archive.load(changed) == b"<html>2</html>"
+    assert list(archive.entries("2024-01-01", "2024-02-29")) == [
+        ("2024-01-31T06:00:00", "kapook", first),
+        ("2024-02-01T06:00:00", "kapook", first),
+        ("2024-02-01T09:00:00", "kapook", changed),
+    ]
+
+# Test that the first snapshot of each day is picked, per source
+def test_daily_snapshots(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    a = archive.store("kapook", b"a", fetched_at=datetime(2024, 12, 31, 6, 0))
+    archive.store("kapook", b"b", fetched_at=datetime(2024, 12, 31, 9, 0))
+    c = archive.store("other", b"c", fetched_at=datetime(2025, 1, 1, 6, 0))
+
+    assert archive.daily_snapshots("2024-12-31", "2025-01-01") == {
+        ("2024-12-31", "kapook"): a,
+        ("2025-01-01", "other"): c,
+    }
+    assert archive.daily_snapshots("2025-01-01", "2025-01-01", source="kapook") == {}
+
+# Test that a reopened archive does not index the same page twice
+def test_reopen(tmp_path):
+    SnapshotArchive(str(tmp_path)).store("kapook", b"a", fetched_at=datetime(2024, 1, 1, 6, 0))
+    SnapshotArchive(str(tmp_path)).store("kapook", b"a", fetched_at=datetime(2024, 1, 1, 7, 0))
+
+    assert len(list(SnapshotArchive(str(tmp_path)).entries("2024-01-01", "2024-01-01"))) == 1
+
+# Test loading a blob by hash, decompressed or as stored
+def test_load(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    digest = archive.store("kapook", b"<html>1</html>")
+
+    assert archive.load(digest) == b"<html>1</html>"
+    assert gzip.decompress(archive.load_compressed(digest)) == b"<html>1</html>"
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from app.services.sources import SOURCE_REGISTRY, FuelSource, HostRateLimiter, KapookSource, build_sources
+
+# Test that the kapook source is registered and built by name
+def test_build_sources():
+    sources = build_sources(["kapook"])
+
+    assert SOURCE_REGISTRY["kapook"] is KapookSource
+    assert isinstance(sources[0], KapookSource)
+    assert sources[0].host == "gasprice.kapook.com"
+
+# Test an unknown source name
+def test_build_sources_unknown():
+    with pytest.raises(ValueError, match="Unknown fuel source"):
+        build_sources(["missing"])
+
+# Test that a source without a parser fails when it is built, not mid-scrape
+def test_source_needs_parse_function():
+    class IncompleteSource(FuelSource):
+        name = "incomplete"
+        url = "https://example.com/prices"
+
+    with pytest.raises(TypeError):
+        IncompleteSource()
+
+# Test that the parse function can be shipped to a worker process
+def test_parse_function_is_picklable():
+    import pickle
+
+    parse = pickle.loads(pickle.dumps(KapookSource().parse_function()))
+
+    with open('./raw/gasprice.html', 'r', encoding='utf-8') as file:
+        result = parse(file.read())
+    assert list(result) == list(KapookSource.class_map)
+
+# Test that requests to the same host are spaced out
+@pytest.mark.asyncio
+async def test_host_rate_limiter():
+    limiter = HostRateLimiter(0.05)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    await asyncio.gather(limiter.wait("a"), limiter.wait("a"), limiter.wait("b"))
+
+    assert loop.time() - start >= 0.05
+    assert loop.time() - start < 0.1
+
+# Test that fetched pages are kept in the snapshot archive
+def test_fetch_archives_page(snapshot_archive, mocker):
+    from app.services.page_fetcher import FetchResult
+    source = KapookSource()
+    mocker.patch.object(source.fetcher, "fetch", return_value=FetchResult(b"<html></html>", True, 200))
+    mocker.patch("app.services.sources.debug", False)
+
+    source.fetch()
+    source.fetch()
+
+    entries = list(snapshot_archive.entries("2000-01-01", "2999-12-31"))
+    assert len(entries) == 1
+    assert snapshot_archive.load(entries[0][2]) == b"<html></html>"
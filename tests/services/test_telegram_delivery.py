@@ -0,0 +1,191 @@
+import asyncio
+import sqlite3
+import httpx
+import pytest
+from app.services import telegram_delivery
+from app.services.telegram_delivery import MessageQueue, TokenBucket, coalesce, split_message
+
+# Test that long messages are split on line breaks within the limit
+def test_split_message():
+    assert split_message("short\n") == ["short\n"]
+    assert split_message("") == [""]
+
+    text = "".join(f"line {i:03d}\n" for i in range(10))  # 9 characters per line
+    parts = split_message(text, limit=20)
+
+    assert parts == [text[i:i + 18] for i in range(0, 90, 18)]
+    assert "".join(split_message("x" * 45, limit=20)) == "x" * 45
+    assert [len(part) for part in split_message("x" * 45, limit=20)] == [20, 20, 5]
+
+# Test that queued messages of a chat are merged while they fit and share a parse mode
+def test_coalesce():
+    rows = [(1, "1", "a" * 5, 0, 0.0, None), (2, "1", "b" * 4, 2, 0.0, None), (3, "1", "c" * 8, 0, 0.0, None),
+            (4, "1", "d", 0, 0.0, "HTML"), (5, "1", "e", 0, 0.0, None)]
+
+    assert list(coalesce(rows, limit=10)) == [
+        ([1, 2], "aaaaa\nbbbb", 2, None), ([3], "cccccccc", 0, None), ([4], "d", 0, "HTML"), ([5], "e", 0, None)]
+
+# Test the token bucket against a fake clock
+def test_token_bucket():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+
+    bucket.take()
+    bucket.take()
+    assert bucket.ready_in() == 0.5
+
+    now[0] = 0.5
+    assert bucket.ready_in() == 0.0
+
+    bucket.pause(3)
+    assert bucket.ready_in() == 3.5
+
+# Test that queued messages survive reopening the queue
+def test_message_queue_persists(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    queue = MessageQueue(path)
+    queue.enqueue([("1", "first"), ("1", "second")])
+    queue.enqueue([("2", "third")])
+    [first, *_] = queue.pending()
+    queue.ack([first[0]])
+    queue.close()
+
+    queue = MessageQueue(path)
+    rows = queue.pending()
+    queue.fail([rows[-1][0]], "400: chat not found")
+
+    assert [(chat_id, text) for _, chat_id, text, _, _, _ in rows] == [("1", "second"), ("2", "third")]
+    assert queue.counts() == {"pending": 1, "failed": 1}
+    queue.close()
+
+# Test that an outbox from before parse modes is migrated, its messages kept as plain text
+def test_message_queue_migrates(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.execute("""CREATE TABLE outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id TEXT NOT NULL,
+        text TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending', error TEXT);""")
+    connection.execute("INSERT INTO outbox (chat_id, text, next_attempt_at) VALUES ('1', 'old (1.5)', 0);")
+    connection.commit()
+    connection.close()
+
+    queue = MessageQueue(path)
+    queue.enqueue([("1", "*new*")], "MarkdownV2")
+
+    assert [(text, parse_mode) for _, _, text, _, _, parse_mode in queue.pending()] == [
+        ("old (1.5)", None), ("*new*", "MarkdownV2")]
+    queue.close()
+
+# Test that each queued message is sent with the parse mode it was queued with
+@pytest.mark.asyncio
+async def test_sender_sends_queued_parse_mode(telegram_sender, fake_bot_api):
+    await telegram_sender.enqueue("1", "plain (1.5)")
+    await telegram_sender.enqueue("1", "*bold*", "MarkdownV2")
+    await telegram_sender.enqueue("1", "plain again")
+
+    assert await telegram_sender.flush() == 0
+    await telegram_sender.aclose()
+
+    assert fake_bot_api.messages == [("1", "plain (1.5)"), ("1", "*bold*"), ("1", "plain again")]
+    assert fake_bot_api.parse_modes == [None, "MarkdownV2", None]
+
+# Test that a flood-control reply holds the chat back for the requested time
+@pytest.mark.asyncio
+async def test_sender_honours_retry_after(telegram_sender, fake_bot_api):
+    fake_bot_api.replies.append((429, {"ok": False, "parameters": {"retry_after": 0.2}}))
+
+    await telegram_sender.enqueue("1", "hello")
+    next_due = await telegram_sender.drain()
+
+    assert fake_bot_api.messages == []
+    assert 0 < next_due
+    [(_, _, _, attempts, _, _)] = telegram_sender.queue.pending()
+    assert attempts == 1
+
+    assert await telegram_sender.flush() == 0
+    await telegram_sender.aclose()
+    assert fake_bot_api.messages == [("1", "hello")]
+
+# Test reading the wait of a 429 reply that may not come from Telegram
+def test_retry_after():
+    assert telegram_delivery.retry_after(httpx.Response(429, json={"parameters": {"retry_after": 3}}), 2.0) == 3.0
+    assert telegram_delivery.retry_after(httpx.Response(429, text="<html>Too Many</html>",
+                                                        headers={"Retry-After": "5"}), 2.0) == 5.0
+    assert telegram_delivery.retry_after(httpx.Response(429, text="Too Many Requests"), 2.0) == 2.0
+    assert telegram_delivery.retry_after(httpx.Response(429, json=["unexpected"]), 2.0) == 2.0
+
+# Test that an unexpected error in one chat counts an attempt there and leaves the other chats alone
+@pytest.mark.asyncio
+async def test_sender_error_in_one_chat(telegram_sender, fake_bot_api, mocker):
+    post = telegram_sender._post
+    failures = []
+
+    async def flaky_post(chat_id, text, parse_mode=None):
+        if chat_id == "1" and not failures:
+            failures.append(chat_id)
+            raise RuntimeError("unexpected reply")
+        return await post(chat_id, text, parse_mode)
+
+    mocker.patch.object(telegram_sender, "_post", flaky_post)
+    telegram_sender.queue.enqueue([("1", "first"), ("2", "second")])  # Drained by hand, no background sender
+
+    assert await telegram_sender.drain() == telegram_sender.backoff
+    [(_, chat_id, _, attempts, _, _)] = telegram_sender.queue.pending()
+    assert (chat_id, attempts) == ("1", 1)
+    assert fake_bot_api.messages == [("2", "second")]
+
+    telegram_sender.start()
+    assert await telegram_sender.flush() == 0
+    await telegram_sender.aclose()
+    assert fake_bot_api.messages == [("2", "second"), ("1", "first")]
+
+# Test that rejected messages are dropped and failing ones give up after max attempts
+@pytest.mark.asyncio
+async def test_sender_failures(telegram_sender, fake_bot_api):
+    telegram_sender.max_attempts = 2
+    fake_bot_api.replies.extend([(400, {"ok": False}), (500, {"ok": False}), (500, {"ok": False})])
+
+    await telegram_sender.enqueue("1", "rejected")
+    await telegram_sender.enqueue("-2", "unavailable")
+    assert await telegram_sender.flush() == 0
+    await telegram_sender.aclose()
+
+    assert fake_bot_api.messages == []
+    assert telegram_sender.queue.counts() == {"pending": 0, "failed": 2}
+
+# Test that parts of a long message go out in order
+@pytest.mark.asyncio
+async def test_sender_splits_long_messages(telegram_sender, fake_bot_api):
+    message = "".join(f"{i:05d} {'x' * 94}\n" for i in range(100))  # 10,000 characters
+
+    assert await telegram_sender.enqueue("1", message) == 3
+    assert await telegram_sender.flush() == 0
+    await telegram_sender.aclose()
+
+    assert all(len(text) <= 4096 for _, text in fake_bot_api.messages)
+    assert "".join(text if text.endswith("\n") else text + "\n" for _, text in fake_bot_api.messages) == message
+
+# Test that a fan-out is sent over a bounded number of chats at once, splitting shared text once
+@pytest.mark.asyncio
+async def test_sender_fan_out_is_bounded(telegram_sender, mocker):
+    in_flight = []
+    peak = []
+
+    async def handle(request):
+        in_flight.append(request)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return httpx.Response(200, json={"ok": True})
+
+    telegram_sender.transport = httpx.MockTransport(handle)
+    telegram_sender.concurrency = 4
+    split = mocker.spy(telegram_delivery, "split_message")
+
+    assert await telegram_sender.enqueue_many([(str(chat_id), "prices") for chat_id in range(20)]) == 20
+    assert await telegram_sender.flush() == 0
+    await telegram_sender.aclose()
+
+    assert len(peak) == 20
+    assert max(peak) == 4
+    assert split.call_count == 1
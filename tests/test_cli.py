@@ -0,0 +1,18 @@
+from datetime import date
+from unittest.mock import patch
+from app import cli
+
+# Test that reparse runs with REPROCESS_WORKERS unless --workers is given
+@patch("app.cli.BackfillService")
+def test_reparse_workers(mock_backfill_service):
+    reparse = mock_backfill_service.return_value.reparse
+    reparse.return_value = {"snapshots": 2, "inserted": 14}
+
+    with patch("app.cli.reprocess_workers", 3):
+        cli.main(["reparse", "--start", "2024-01-01", "--end", "2024-01-31"])
+        cli.main(["reparse", "--start", "2024-01-01", "--end", "2024-01-31", "--workers", "8"])
+
+    assert [c.args for c in reparse.call_args_list] == [
+        (date(2024, 1, 1), date(2024, 1, 31), 3),
+        (date(2024, 1, 1), date(2024, 1, 31), 8),
+    ]
@@ -0,0 +1,56 @@
+import pytest
+from metrics import Counter, Histogram, MetricsRegistry
+
+# Test the Prometheus text rendering of a labelled counter
+def test_counter_render():
+    registry = MetricsRegistry()
+    counter = Counter(registry, 'fuel_rows_parsed', 'Rows parsed', ('provider',))
+
+    counter.inc(3, provider='ptt')
+    counter.inc(provider='ptt')
+    counter.inc(provider='b"c')
+
+    assert counter.value(provider='ptt') == 4
+    assert registry.render() == (
+        '# HELP fuel_rows_parsed Rows parsed\n'
+        '# TYPE fuel_rows_parsed counter\n'
+        'fuel_rows_parsed_total{provider="b\\"c"} 1.0\n'
+        'fuel_rows_parsed_total{provider="ptt"} 4.0\n'
+    )
+
+# Test that histogram buckets are cumulative with sum and count
+def test_histogram_render():
+    registry = MetricsRegistry()
+    histogram = Histogram(registry, 'fetch_seconds', 'Fetch time', buckets=(0.1, 1.0))
+
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.render().splitlines()[2:] == [
+        'fetch_seconds_bucket{le="0.1"} 1',
+        'fetch_seconds_bucket{le="1.0"} 2',
+        'fetch_seconds_bucket{le="+Inf"} 3',
+        'fetch_seconds_sum 5.55',
+        'fetch_seconds_count 3',
+    ]
+
+# Test that nothing is recorded while metrics are disabled
+def test_disabled_registry():
+    registry = MetricsRegistry(enabled=False)
+    counter = Counter(registry, 'requests', 'Requests')
+    histogram = Histogram(registry, 'latency_seconds', 'Latency', ('route',))
+
+    counter.inc()
+    with histogram.time(route='/'):
+        pass
+
+    assert counter.value() == 0
+    assert histogram.count(route='/') == 0
+
+# Test that a label set must match the declared label names
+def test_missing_labels():
+    counter = Counter(MetricsRegistry(), 'requests', 'Requests', ('route',))
+
+    with pytest.raises(ValueError):
+        counter.inc()